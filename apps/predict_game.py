@@ -1,7 +1,11 @@
 from __future__ import annotations
-import argparse, joblib, pathlib
-import numpy as np, polars as pl
+import argparse, pathlib
 from lib.common.settings import load_settings
+from lib.featurization.devig import devig
+from lib.modeling.feature_store import LiveFeatures, model_inputs
+from lib.modeling.fast_predict import load_fast
+from lib.modeling.serve import request
+from lib.utils.team_registry import team_id
 
 
 def main():
@@ -17,24 +21,30 @@ def main():
     league = args.league
     art = pathlib.Path(s.paths["artifacts"]) / league
 
-    # --- Load model + calibrator ---
-    model = joblib.load(art / "model.joblib")
-    calibrator = joblib.load(art / "calibrator.joblib")
+    devig_method = (s.features or {}).get("devig_method", "multiplicative")
 
-    # --- Create a synthetic feature row (pregame) ---
-    # For now we assume market-level features from input odds
-    home_imp = 1 / args.home_price
-    away_imp = 1 / args.away_price
-    vig_spread = (home_imp + away_imp) - 1
-    home_away_ratio = home_imp / away_imp - 1
-    mins_to_start = 30  # static for demo; later you can pull live game start times
+    # --- Resolve both names up front: an unknown team would otherwise score with NaN form ---
+    home_id, away_id = team_id(args.home_team, league), team_id(args.away_team, league)
+    for name, tid in ((args.home_team, home_id), (args.away_team, away_id)):
+        if tid is None:
+            raise SystemExit(f"[predict_game] ❌ '{name}' is not a known {league} team.")
 
-    features = np.array([[home_imp, home_imp / (home_imp + away_imp),
-                          vig_spread, home_away_ratio, mins_to_start]])
-
-    # --- Predict win probability for HOME ---
-    p_raw = model.predict(features[:, :3])  # adjust slice to match training features
-    p_hat = calibrator.predict(p_raw)
+    # --- Predict win probability for HOME: a running prediction server, else in-process ---
+    resp = request({"op": "market", "league": league, "home": args.home_team, "away": args.away_team,
+                    "home_price": args.home_price, "away_price": args.away_price})
+    if resp is not None:
+        if not resp["ok"]:
+            raise SystemExit(f"[predict_game] ❌ {resp['error']}")
+        p_hat = [resp["p"]]
+    else:
+        # Model + calibrator: registry LATEST, compiled to NumPy
+        model = load_fast(art)
+        # Serving row: market features from the two prices plus both teams' current form
+        live = LiveFeatures(s.paths["warehouse"], league, devig_method=devig_method)
+        live.refresh()
+        features = live.game_rows([home_id], [away_id], [args.home_price], [args.away_price])
+        # Columns picked by the manifest's feature names
+        p_hat = model.calibrate(model.predict(model_inputs(features, model.features)))
 
     # --- Derive fair prices + EVs ---
     fair_price_home = 1 / p_hat[0]
@@ -42,11 +52,13 @@ def main():
 
     EV_home = p_hat[0] * (args.home_price - 1) - (1 - p_hat[0])
     EV_away = (1 - p_hat[0]) * (args.away_price - 1) - p_hat[0]
+    market_home = devig([[1 / args.home_price, 1 / args.away_price]], devig_method)[0, 0]
 
     print("\n==============================")
     print(f"🏀  {args.away_team} @ {args.home_team}")
     print("==============================")
     print(f"Model Win Prob (HOME): {p_hat[0]*100:.2f}%")
+    print(f"No-Vig Prob (HOME):    {market_home*100:.2f}% ({devig_method})")
     print(f"Fair Price (HOME):     {fair_price_home:.3f}")
     print(f"Fair Price (AWAY):     {fair_price_away:.3f}")
     print(f"Book Price (HOME):     {args.home_price:.3f}")
@@ -1,54 +1,150 @@
 from __future__ import annotations
+import argparse, os
 import numpy as np, polars as pl
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 from lib.common.settings import Settings
 
 
 RNG = np.random.default_rng(7)
+BOOKS = ["pinnacle", "draftkings", "fanduel", "betmgm", "caesars", "pointsbet", "bet365", "unibet"]
+TOY_SCHEMA = {
+    "ts": pl.Datetime("us", "UTC"), "market_id": pl.Utf8, "runner": pl.Utf8, "odds": pl.Float64,
+    "score_h": pl.Int64, "score_a": pl.Int64, "game_id": pl.Utf8, "book": pl.Utf8,
+}
 
-def simulate_game(game_id: str, start: datetime, ticks: int = 1800, dt_ms: int = 500) -> pl.DataFrame:
-    base_odds = np.array([1.90, 1.90])  # HOME, AWAY
-    rows = []
-    ts = start
-    score_h = score_a = 0
-    for _ in range(ticks):
-        shock = RNG.normal(0, 0.01, size=2)
-        base_odds += (1.90 - base_odds) * 0.02 + shock
-        base_odds = np.clip(base_odds, 1.3, 4.5)
-        if RNG.random() < 0.005:
-            if RNG.random() < 0.5:
-                score_h += 2; base_odds[0] = max(1.2, base_odds[0]-0.1); base_odds[1] = min(6.0, base_odds[1]+0.1)
-            else:
-                score_a += 2; base_odds[0] = min(6.0, base_odds[0]+0.1); base_odds[1] = max(1.2, base_odds[1]-0.1)
-        ts += timedelta(milliseconds=dt_ms)
-        rows.append((ts, "ML", "HOME", float(base_odds[0]), score_h, score_a))
-        rows.append((ts, "ML", "AWAY", float(base_odds[1]), score_h, score_a))
-    return (
-    pl.DataFrame(
-        rows,
-        schema=["ts", "market_id", "runner", "odds", "score_h", "score_a"],
-        orient="row",  # <-- add this
-    )
-    .with_columns(
-        pl.lit(game_id).alias("game_id"),
-        pl.col("ts").dt.replace_time_zone("UTC"),
-    )
-)
+# --- Market dynamics (per tick, logit scale) ---
+REVERSION = 0.02     # pull of the quote noise back towards the fair line
+NOISE_SD = 0.04      # market-wide quote noise
+BOOK_NOISE_SD = 0.015
+SCORE_P = 0.005      # P(basket) per tick
+LEAD_WEIGHT = 0.06   # logit per point of lead at tip-off, grows to 3x by the buzzer
+ODDS_MIN, ODDS_MAX = 1.01, 25.0
+
+
+def _ar1(innov: np.ndarray, phi: float) -> np.ndarray:
+    # x_t = phi * x_{t-1} + e_t along the tick axis: one array op per tick over
+    # every game (and book) at once
+    out = np.empty(innov.shape)
+    acc = np.zeros(innov.shape[:-1])
+    for e, x in zip(np.moveaxis(innov, -1, 0), np.moveaxis(out, -1, 0)):
+        acc = phi * acc + e
+        x[...] = acc
+    return out
+
+
+def simulate_games(
+    game_ids: list[str], starts: list[datetime], books: list[str],
+    ticks: int = 1800, dt_ms: int = 500, rng: np.random.Generator | None = None,
+) -> pl.DataFrame:
+    """Moneyline ticks for many games × books at once; every step is an array op over (games, ticks)."""
+    rng = RNG if rng is None else rng
+    g, b, t = len(game_ids), len(books), ticks
+
+    # Scoring: Bernoulli baskets, split home/away, running score via cumsum
+    basket = rng.random((g, t)) < SCORE_P
+    home_scores = rng.random((g, t)) < 0.5
+    score_h = np.cumsum(basket & home_scores, axis=1) * 2
+    score_a = np.cumsum(basket & ~home_scores, axis=1) * 2
+
+    # Fair home-win logit: pregame line + lead (weighted by game clock) + mean-reverting noise
+    pregame = rng.normal(0.0, 0.6, size=(g, 1))
+    clock = 1.0 + 2.0 * np.arange(t) / max(t - 1, 1)
+    noise = _ar1(rng.normal(0.0, NOISE_SD, size=(g, t)), 1.0 - REVERSION)
+    fair = pregame + LEAD_WEIGHT * clock * (score_h - score_a) + noise
+
+    # Each book quotes the fair line plus its own sticky noise and margin
+    book_noise = _ar1(rng.normal(0.0, BOOK_NOISE_SD, size=(g, b, t)), 0.9)
+    margin = rng.uniform(0.02, 0.06, size=(1, b, 1))
+    p_home = 1.0 / (1.0 + np.exp(-(fair[:, None, :] + book_noise)))
+    odds_h = np.clip(1.0 / (p_home * (1.0 + margin)), ODDS_MIN, ODDS_MAX)
+    odds_a = np.clip(1.0 / ((1.0 - p_home) * (1.0 + margin)), ODDS_MIN, ODDS_MAX)
+
+    # Long layout (game, book, tick, runner) built from flat arrays, no per-row Python
+    start_us = np.array([int(s.timestamp() * 1_000_000) for s in starts], dtype=np.int64)
+    ts = start_us[:, None] + (np.arange(1, t + 1, dtype=np.int64) * dt_ms * 1000)[None, :]
+    n = g * b * t * 2
+
+    def per_game(a: np.ndarray) -> np.ndarray:
+        return np.broadcast_to(a[:, None, :, None], (g, b, t, 2)).reshape(n)
+
+    return pl.DataFrame({
+        "ts": pl.Series(per_game(ts)).cast(pl.Datetime("us")).dt.replace_time_zone("UTC"),
+        "market_id": pl.Series(["ML"], dtype=pl.Utf8).extend_constant("ML", n - 1),
+        "runner": pl.Series(np.tile(np.array(["HOME", "AWAY"]), n // 2)),
+        "odds": np.stack([odds_h, odds_a], axis=-1).reshape(n).round(3),
+        "score_h": per_game(score_h).astype(np.int64),
+        "score_a": per_game(score_a).astype(np.int64),
+        "game_id": pl.Series(game_ids).gather(np.repeat(np.arange(g), b * t * 2)),
+        "book": pl.Series(books).gather(np.tile(np.repeat(np.arange(b), t * 2), g)),
+    }, schema=TOY_SCHEMA)
+
+
+def simulate_game(game_id: str, start: datetime, ticks: int = 1800, dt_ms: int = 500,
+                  books: list[str] | None = None) -> pl.DataFrame:
+    return simulate_games([game_id], [start], books or BOOKS[:1], ticks, dt_ms)
+
+
+def _schedule(first: int, count: int, width: int, t0: datetime) -> tuple[list[str], list[datetime]]:
+    # Twelve tip-offs a day, ten minutes apart
+    idx = range(first, first + count)
+    ids = [f"G{i + 1:0{width}d}" for i in idx]
+    starts = [t0 + timedelta(days=i // 12, minutes=10 * (i % 12 + 1)) for i in idx]
+    return ids, starts
+
+
+def _write_chunk(job: tuple) -> tuple[int, int]:
+    chunk, first, count, width, t0, books, ticks, dt_ms, seed, out_dir = job
+    rng = np.random.default_rng(np.random.SeedSequence([seed, chunk]))
+    ids, starts = _schedule(first, count, width, t0)
+    df = simulate_games(ids, starts, books, ticks, dt_ms, rng).sort(["game_id", "book", "ts", "runner"])
+    # date=<game day>/part-<chunk>.parquet: chunks never share a file, so workers write independently
+    df = df.with_columns(pl.col("ts").dt.date().alias("_day"))
+    for (day,), part in df.partition_by("_day", as_dict=True, include_key=False).items():
+        d = Path(out_dir) / f"date={day}"
+        d.mkdir(parents=True, exist_ok=True)
+        part.write_parquet(d / f"part-{chunk:05d}.parquet")
+    return count, df.height
 
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--games", type=int, default=3)
+    ap.add_argument("--books", type=int, default=1, help=f"Books per game (max {len(BOOKS)})")
+    ap.add_argument("--ticks", type=int, default=1800)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk", type=int, default=50, help="Games per worker task")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out_dir", default=None,
+                    help="Write hive-partitioned parquet here instead of <raw>/toy_ticks.parquet")
+    args = ap.parse_args()
+
     s = Settings.load()
-    Path(s.raw_dir).mkdir(parents=True, exist_ok=True)
+    books = BOOKS[: max(1, min(args.books, len(BOOKS)))]
     t0 = datetime.now(timezone.utc).replace(microsecond=0)
-    df = pl.concat([
-        simulate_game("G001", t0 + timedelta(minutes=10)),
-        simulate_game("G002", t0 + timedelta(minutes=20)),
-        simulate_game("G003", t0 + timedelta(minutes=30)),
-    ]).sort(["game_id","ts","runner"])
-    out = Path(s.raw_dir) / "toy_ticks.parquet"
-    df.write_parquet(out)
-    print(f"Wrote {out} rows={df.height} games={df.select(pl.col('game_id')).n_unique()}")
+    width = max(3, len(str(args.games)))
+
+    if args.out_dir is None:
+        Path(s.raw_dir).mkdir(parents=True, exist_ok=True)
+        ids, starts = _schedule(0, args.games, width, t0)
+        df = simulate_games(ids, starts, books, args.ticks).sort(["game_id", "ts", "runner"])
+        out = Path(s.raw_dir) / "toy_ticks.parquet"
+        df.write_parquet(out)
+        print(f"Wrote {out} rows={df.height} games={df.select(pl.col('game_id')).n_unique()}")
+        return
+
+    jobs = [
+        (c, first, min(args.chunk, args.games - first), width, t0, books, args.ticks, 500, args.seed, args.out_dir)
+        for c, first in enumerate(range(0, args.games, args.chunk))
+    ]
+    if args.workers <= 1:
+        results = list(map(_write_chunk, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(_write_chunk, jobs))
+    games, rows = sum(g for g, _ in results), sum(n for _, n in results)
+    print(f"[make_toy_raw] Wrote {args.out_dir} rows={rows:,} games={games:,} books={len(books)} chunks={len(jobs)}")
 
 if __name__ == "__main__":
     main()
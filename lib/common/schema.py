@@ -0,0 +1,103 @@
+from __future__ import annotations
+import os, pathlib
+import polars as pl
+from lib.utils.team_registry import from_nba_stats_id
+
+# Warehouse column types. Every ingest writer passes its frame through
+# conform(df, TABLE) just before writing, so a column has the same compact
+# type in every file: Enum for closed sets, Categorical for open
+# low-cardinality strings (books, markets, team names), registry UInt16 team
+# IDs, UInt32 game keys, and Float32 for prices and box-score numbers
+# (decimal odds carry 3-4 significant digits; Float32 keeps 7). Code that
+# does arithmetic on prices upcasts to Float64 first.
+RUNNER = pl.Enum(["HOME", "AWAY", "DRAW"])
+TEAM_ID = pl.UInt16
+GAME_KEY = pl.UInt32
+PRICE = pl.Float32
+
+TICKS = {
+    "ts_utc": pl.Datetime("us"), "book": pl.Categorical, "market": pl.Categorical, "runner": RUNNER,
+    "price_decimal": PRICE, "home_team_id": TEAM_ID, "away_team_id": TEAM_ID,
+}
+SCHEDULE = {
+    "game_id": pl.Utf8, "game_key": GAME_KEY, "league": pl.Categorical, "season": pl.UInt16,
+    "home_team": pl.Categorical, "away_team": pl.Categorical, "venue": pl.Categorical,
+    "home_team_id": TEAM_ID, "away_team_id": TEAM_ID,
+}
+RESULTS = {
+    "game_id": pl.Utf8, "game_key": GAME_KEY, "final_home_score": pl.Int16, "final_away_score": pl.Int16,
+    "winner": pl.Categorical,
+}
+# nba_api GAME_IDs (e.g. 22400123) are already integers and fit the game-key type
+TEAM_STATS = {
+    "game_id": GAME_KEY, "date": pl.Date, "season": pl.Categorical,
+    "home_team_id": TEAM_ID, "away_team_id": TEAM_ID,
+    "PTS_home": pl.Float32, "PTS_away": pl.Float32, "FG_PCT_home": pl.Float32, "FG_PCT_away": pl.Float32,
+    "home_win": pl.Int8, "margin": pl.Float32, "fg_diff": pl.Float32,
+}
+# nba_api LeagueDashTeamStats season totals (lib.ingest.nba_current_stats)
+CURRENT_TEAM_STATS = {
+    "TEAM_ID": TEAM_ID, "TEAM_NAME": pl.Categorical, "GP": pl.UInt8,
+    "FG_PCT": pl.Float32, "REB": pl.Float32, "AST": pl.Float32, "PLUS_MINUS": pl.Float32,
+}
+LIVE_ODDS = {
+    "home_team": pl.Categorical, "away_team": pl.Categorical, "home_team_id": TEAM_ID, "away_team_id": TEAM_ID,
+    "book": pl.Categorical, "home_odds": PRICE, "away_odds": PRICE,
+}
+LIVE_MARKETS = {
+    "event_id": pl.Categorical, "sport_key": pl.Categorical, "home_team": pl.Categorical, "away_team": pl.Categorical,
+    "home_team_id": TEAM_ID, "away_team_id": TEAM_ID, "book": pl.Categorical, "market": pl.Categorical,
+    "outcome": pl.Categorical, "runner": pl.Categorical, "price": PRICE, "point": pl.Float32,
+}
+
+
+def _cast(name: str, src: pl.DataType, dtype: pl.DataType) -> pl.Expr:
+    c = pl.col(name)
+    if src == dtype:
+        return c
+    if dtype == TEAM_ID and src.is_integer():
+        # team_stats arrives with nba_api TEAM_IDs (1610612xxx); the registry ID fits in 16 bits
+        return pl.when(c > 65535).then(from_nba_stats_id(c)).otherwise(c).cast(TEAM_ID)
+    if dtype == pl.Date and src == pl.Utf8:
+        # "2022-12-22" or "2022-12-22 00:00:00"
+        return c.str.slice(0, 10).str.to_date("%Y-%m-%d")
+    return c.cast(dtype)
+
+
+def conform(df: pl.DataFrame | pl.LazyFrame, table: dict[str, pl.DataType]) -> pl.DataFrame | pl.LazyFrame:
+    """Cast the columns of `df` that `table` declares; undeclared columns pass through."""
+    schema = df.collect_schema()
+    return df.with_columns(_cast(c, schema[c], t) for c, t in table.items() if c in schema)
+
+
+def conforms(schema: pl.Schema | dict, table: dict[str, pl.DataType]) -> bool:
+    return all(schema[c] == t for c, t in table.items() if c in schema)
+
+
+# --- game surrogate keys ---
+# Vendor game IDs are free strings ("G001", "401584793", ...). Each league
+# maps them to dense UInt32 keys in <warehouse>/<LEAGUE>/game_keys.parquet;
+# the map is append-only, so a game keeps its key across re-ingests.
+GAME_KEYS_NAME = "game_keys.parquet"
+
+
+def game_keys(wh: str | pathlib.Path, game_ids: pl.Series) -> pl.DataFrame:
+    """(game_id, game_key) for every ID in `game_ids`, assigning keys to new ones."""
+    path = pathlib.Path(wh) / GAME_KEYS_NAME
+    known = pl.read_parquet(path) if path.exists() else pl.DataFrame(schema={"game_id": pl.Utf8, "game_key": GAME_KEY})
+    ids = game_ids.cast(pl.Utf8).drop_nulls().unique(maintain_order=True).to_frame("game_id")
+    new = ids.join(known, on="game_id", how="anti")
+    if new.height:
+        start = 0 if known.is_empty() else int(known["game_key"].max()) + 1
+        new = new.with_columns((pl.int_range(pl.len(), dtype=pl.Int64) + start).cast(GAME_KEY).alias("game_key"))
+        known = pl.concat([known, new])
+        tmp = path.with_suffix(".tmp")
+        known.write_parquet(tmp)
+        os.replace(tmp, path)
+    return ids.join(known, on="game_id", how="left")
+
+
+def with_game_key(df: pl.DataFrame, wh: str | pathlib.Path) -> pl.DataFrame:
+    keys = game_keys(wh, df["game_id"])
+    return df.drop("game_key", strict=False).with_columns(pl.col("game_id").cast(pl.Utf8)).join(
+        keys, on="game_id", how="left")
@@ -11,6 +11,12 @@ class Settings:
     decisions: dict
     lgbm: dict | None = None
     features: dict | None = None
+    leagues: list | None = None
+    books: list | None = None
+    markets: list | None = None
+    poller: dict | None = None
+    tuning: dict | None = None
+    serve: dict | None = None
 
     @classmethod
     def load(cls, path: str | Path = "config/default.yaml") -> "Settings":
@@ -48,13 +54,25 @@ class Settings:
         decisions = cfg.get("decisions", {"pregame_offset_min": 30})
         lgbm = cfg.get("lgbm", {})                # ✅ new
         features = cfg.get("features", {})        # ✅ optional new
+        leagues = cfg.get("leagues", ["NBA"])
+        books = cfg.get("books", [])
+        markets = cfg.get("markets", ["moneyline"])
+        poller = cfg.get("poller", {})
+        tuning = cfg.get("tuning", {})
+        serve = cfg.get("serve", {})
 
         return Settings(
             paths=paths,
             betting=betting,
             decisions=decisions,
             lgbm=lgbm,
-            features=features
+            features=features,
+            leagues=leagues,
+            books=books,
+            markets=markets,
+            poller=poller,
+            tuning=tuning,
+            serve=serve,
         )
 
     # ------------ Back-compat properties (Week-1 code expects these) ------------
@@ -1,53 +1,13 @@
 from __future__ import annotations
-import argparse, pathlib, json, joblib
-import numpy as np, polars as pl
+import argparse, pathlib, json
+import numpy as np, pandas as pd, polars as pl
 from lib.common.settings import load_settings
+from lib.ingest.tick_store import scan_ticks
+from lib.modeling.registry import load_model
 
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--league", default="NBA")
-    ap.add_argument("--ev_threshold", type=float, default=None)
-    ap.add_argument("--kelly_fraction", type=float, default=None)
-    args = ap.parse_args()
-
-    s = load_settings()
-    league = args.league
-    wh = pathlib.Path(s.paths["warehouse"]) / league
-    art = pathlib.Path(s.paths["artifacts"]) / league
-    rep = pathlib.Path(s.paths["reports"]) / league
-    rep.mkdir(parents=True, exist_ok=True)
-
-    # --- Load model + calibrator ---
-    model = joblib.load(art / "model.joblib")
-    calibrator = joblib.load(art / "calibrator.joblib")
-
-    # --- Load features/labels ---
-    df = pl.read_parquet(wh / "labels.parquet").to_pandas()
-    feature_cols = ["imp_prob_mean", "imp_prob_vigadj", "vig_spread"]
-
-    X, y = df[feature_cols].values, df["y"].values
-    game_ids = df["game_id"].values
-    runners = df["runner"].values
-
-    # --- Model predictions ---
-    p_raw = model.predict(X)
-    p_hat = calibrator.predict(p_raw)
-    df["p_hat"] = p_hat
-
-    # --- Merge best book price ---
-    ticks = pl.read_parquet(wh / "ticks.parquet").to_pandas()
-    ticks_best = (
-        ticks.sort_values(["game_id", "book", "runner", "ts_utc"])
-        .groupby(["game_id", "runner"], as_index=False)
-        .agg({"price_decimal": "max"})
-        .rename(columns={"price_decimal": "P"})
-    )
-    df = df.merge(ticks_best, on=["game_id", "runner"], how="left")
-
-    # --- Compute EV + fractional-Kelly stake ---
-    ev_thresh = args.ev_threshold or s.betting.get("ev_threshold", 0.01)
-    kelly_frac = args.kelly_fraction or s.betting.get("kelly_fraction", 0.25)
+def simulate(df: pd.DataFrame, ev_thresh: float, kelly_frac: float) -> tuple[pd.DataFrame, dict]:
+    """Sequential fractional-Kelly betting over `df` (needs p_hat, P, y); returns signals + summary."""
     bankroll = 1000.0
     stakes, pnl, evs = [], [], []
 
@@ -86,11 +46,93 @@ def main():
         "ROI": roi,
         "start_bankroll": 1000.0,
     }
+    return df, report
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--league", default="NBA")
+    ap.add_argument("--ev_threshold", type=float, default=None)
+    ap.add_argument("--kelly_fraction", type=float, default=None)
+    ap.add_argument("--grid", action="store_true",
+                    help="Backtest every decision offset in labels_grid.parquet (build_labels --decision_grid)")
+    args = ap.parse_args()
+
+    s = load_settings()
+    league = args.league
+    wh = pathlib.Path(s.paths["warehouse"]) / league
+    art = pathlib.Path(s.paths["artifacts"]) / league
+    rep = pathlib.Path(s.paths["reports"]) / league
+    rep.mkdir(parents=True, exist_ok=True)
+
+    # --- Load model + calibrator (registry LATEST) ---
+    model = load_model(art)
+
+    # --- Load features/labels ---
+    df = pl.read_parquet(wh / ("labels_grid.parquet" if args.grid else "labels.parquet")).to_pandas()
+    # The manifest's feature schema, not a copy of train's column list
+    X, y = df[model.features].values, df["y"].values
+    game_ids = df["game_id"].values
+    runners = df["runner"].values
+
+    # --- Model predictions ---
+    p_raw = model.predict(X)
+    p_hat = model.calibrate(p_raw)
+    df["p_hat"] = p_hat
+
+    # --- Merge best book price ---
+    # Only the partitions of games we actually score are read
+    ticks = (
+        scan_ticks(s.paths["warehouse"], league, game_ids=df["game_id"].astype(str).unique().tolist())
+        .select([pl.col(["game_id", "book", "runner"]).cast(pl.Utf8), "ts_utc", pl.col("price_decimal").cast(pl.Float64)])
+        .collect()
+    )
+    if args.grid:
+        # Offsets only differ in what was on the board at decision time: each
+        # book's last price at or before decision_ts, best across books.
+        decisions = (
+            pl.from_pandas(df[["decision_offset_min", "game_id", "runner", "decision_ts"]])
+            .with_columns(pl.col("game_id").cast(pl.Utf8)).unique()
+        )
+        ticks_best = (
+            decisions.join(ticks.select(["game_id", "runner", "book"]).unique(), on=["game_id", "runner"])
+            .sort("decision_ts")
+            .join_asof(ticks.sort("ts_utc"), left_on="decision_ts", right_on="ts_utc",
+                       by=["game_id", "runner", "book"], strategy="backward", check_sortedness=False)
+            .group_by(["decision_offset_min", "game_id", "runner"])
+            .agg(pl.col("price_decimal").max().alias("P"))
+            .to_pandas()
+        )
+        df = df.astype({"game_id": str}).merge(ticks_best, on=["decision_offset_min", "game_id", "runner"], how="left")
+    else:
+        ticks_best = (
+            ticks.to_pandas().sort_values(["game_id", "book", "runner", "ts_utc"])
+            .groupby(["game_id", "runner"], as_index=False)
+            .agg({"price_decimal": "max"})
+            .rename(columns={"price_decimal": "P"})
+        )
+        df = df.merge(ticks_best, on=["game_id", "runner"], how="left")
+
+    # --- Compute EV + fractional-Kelly stake ---
+    ev_thresh = args.ev_threshold or s.betting.get("ev_threshold", 0.01)
+    kelly_frac = args.kelly_fraction or s.betting.get("kelly_fraction", 0.25)
+    if args.grid:
+        # One independent bankroll per decision offset
+        parts, by_offset = [], {}
+        for offset, part in df.groupby("decision_offset_min", sort=True):
+            part, by_offset[str(offset)] = simulate(part.reset_index(drop=True), ev_thresh, kelly_frac)
+            parts.append(part)
+        df = pd.concat(parts, ignore_index=True)
+        best = max(by_offset, key=lambda k: by_offset[k]["ROI"])
+        report = {"by_offset": by_offset, "best_offset": best}
+    else:
+        df, report = simulate(df, ev_thresh, kelly_frac)
 
     # --- Write outputs ---
-    signals_path = wh / "signals.parquet"
+    suffix = "_grid" if args.grid else ""
+    signals_path = wh / f"signals{suffix}.parquet"
     pl.from_pandas(df).write_parquet(signals_path)
-    with open(rep / "backtest.json", "w") as f:
+    with open(rep / f"backtest{suffix}.json", "w") as f:
         json.dump(report, f, indent=2)
 
     print(f"[backtest] wrote {signals_path}")
@@ -1,58 +1,100 @@
 from __future__ import annotations
-import argparse, pathlib, polars as pl
+import argparse, datetime as dt, pathlib, time, polars as pl
+from typing import Sequence
 from lib.common.settings import load_settings
+from lib.ingest.manifest import SourceManifest
+from lib.featurization.devig import QUOTE_KEYS, fair_prob_expr
+from lib.featurization.team_form import FORM_COLS, game_results, join_form, registry_team_id, team_form
+from lib.ingest.tick_store import game_fingerprints, scan_ticks
+
+PAIR = ["home_team_id", "away_team_id"]
+# team_stats dates are the US slate date; a tip (or in-play quote) before 06:00 Eastern
+# belongs to the previous night's slate
+SLATE_TZ = "America/New_York"
+SLATE_ROLLOVER = dt.timedelta(hours=6)
+
+
+def compute_features(ticks: pl.DataFrame, stats: pl.DataFrame, form: pl.DataFrame | None = None,
+                     devig_method: str = "multiplicative", schedule: pl.DataFrame | None = None) -> pl.DataFrame:
+    """Feature rows (one per game × runner) for exactly the games present in `ticks`."""
+    print("[build_features] Joining point-in-time team form + results")
+    return feature_plan(ticks.lazy(), stats.lazy(), form=None if form is None else form.lazy(),
+                        devig_method=devig_method, schedule=None if schedule is None else schedule.lazy()).collect()
+
+
+def slate_date(col: str, dtype: pl.DataType) -> pl.Expr:
+    """UTC timestamp column → the US slate date team_stats files the game under."""
+    c = pl.col(col)
+    if getattr(dtype, "time_zone", None) is None:
+        c = c.dt.replace_time_zone("UTC")
+    return (c.dt.convert_time_zone(SLATE_TZ) - SLATE_ROLLOVER).dt.date()
+
+
+def resolve_games(ticks: pl.LazyFrame, stats: pl.LazyFrame, form: pl.LazyFrame,
+                  schedule: pl.LazyFrame | None = None) -> pl.LazyFrame:
+    """Each tick game → its slate date and both teams' form before it, plus its team_stats result.
+
+    The date comes from the scheduled start (`schedule`, or a start_time_utc column on
+    the ticks), else the game's last quote. Games without a final result yet keep
+    their row with a null margin, so upcoming and in-play games can be scored.
+    """
+    schema = ticks.collect_schema()
+    start = "start_time_utc" if "start_time_utc" in schema else "ts_utc"
+    games = ticks.group_by(["game_id", *PAIR]).agg(pl.col(start).max().alias("_start"))
+    start_dtype = schema[start]
+    if schedule is not None:
+        sched = schedule.select(pl.col("game_id").cast(schema["game_id"]),
+                                pl.col("start_time_utc").cast(start_dtype).alias("_scheduled"))
+        games = games.join(sched, on="game_id", how="left").with_columns(
+            pl.coalesce("_scheduled", "_start").alias("_start")).drop("_scheduled")
+    games = games.with_columns(slate_date("_start", start_dtype).alias("game_date")).drop("_start")
+    results = game_results(stats).unique([*PAIR, "game_date"], keep="last")
+    games = join_form(games.join(results, on=[*PAIR, "game_date"], how="left"), form, on="game_date")
+    # home minus away, from the home side; AWAY rows flip the sign
+    return games.with_columns([
+        (pl.col(f"home_{c}") - pl.col(f"away_{c}")).alias(c) for c in FORM_COLS
+    ]).select(["game_id", *PAIR, "season", "game_date", "margin", *FORM_COLS])
+
+
+def feature_plan(ticks: pl.LazyFrame, stats: pl.LazyFrame, snapshot_cols: Sequence[str] = (),
+                 form: pl.LazyFrame | None = None, devig_method: str = "multiplicative",
+                 schedule: pl.LazyFrame | None = None) -> pl.LazyFrame:
+    """compute_features as a lazy plan. `snapshot_cols` (e.g. ts_utc, mins_to_start)
+    are carried through as extra keys: one row per game × runner × snapshot instead of per game.
+    `devig_method` (lib.featurization.devig) strips each book quote's margin for imp_prob_vigadj.
+    `label` is null for games without a result; training filters on it, scoring doesn't."""
+    game_keys = ["game_id", *snapshot_cols, *PAIR]
+
+    # Compute implied probabilities (team IDs on the registry, whatever the tick source)
+    ticks = ticks.with_columns([
+        (1.0 / pl.col("price_decimal").cast(pl.Float64)).alias("imp_prob"), registry_team_id("home_team_id"), registry_team_id("away_team_id"),
+        # fair probability within each (game, ts, book) quote
+        fair_prob_expr(devig_method, QUOTE_KEYS).alias("fair_prob"),
+    ])
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--league", default="NBA")
-    args = ap.parse_args()
-    s = load_settings()
-
-    wh = pathlib.Path(s.paths["warehouse"]) / args.league
-    wh.mkdir(parents=True, exist_ok=True)
-
-    ticks_path = wh / "ticks.parquet"
-    stats_path = wh / "team_stats.parquet"
-    if not ticks_path.exists() or not stats_path.exists():
-        raise FileNotFoundError("ticks.parquet or team_stats.parquet missing")
-
-    print(f"[build_features] 🚀 Building features for {args.league}")
-
-    ticks = pl.read_parquet(ticks_path)
-    stats = pl.read_parquet(stats_path)
-
-    # Compute implied probabilities
-    ticks = ticks.with_columns((1.0 / pl.col("price_decimal")).alias("imp_prob"))
-
-    # Aggregate implied probs per game and runner
-    agg = (
+    # Aggregate implied probs per game and runner, pivoted HOME/AWAY in the
+    # same pass (one aggregation; no self-join of the aggregate)
+    joined = (
         ticks
-        .group_by(["game_id", "runner", "home_team_id", "away_team_id"])
+        .group_by(game_keys)
         .agg([
-            pl.mean("imp_prob").alias("imp_prob_mean"),
-            pl.max("price_decimal").alias("price_best"),
+            pl.col("imp_prob").filter(pl.col("runner") == "HOME").mean().alias("home_p"),
+            pl.col("imp_prob").filter(pl.col("runner") == "AWAY").mean().alias("away_p"),
+            pl.col("fair_prob").filter(pl.col("runner") == "HOME").mean().alias("home_fair"),
+            pl.col("fair_prob").filter(pl.col("runner") == "AWAY").mean().alias("away_fair"),
         ])
+        .filter(pl.col("home_p").is_not_null() & pl.col("away_p").is_not_null())
     )
 
-    # Pivot HOME/AWAY to compute vig + ratios
-    home = agg.filter(pl.col("runner") == "HOME").rename({"imp_prob_mean": "home_p"})
-    away = agg.filter(pl.col("runner") == "AWAY").rename({"imp_prob_mean": "away_p"})
-
-    joined = home.join(away, on=["game_id", "home_team_id", "away_team_id"], how="inner", suffix="_away")
+    # vig + ratios
     joined = joined.with_columns([
         (pl.col("home_p") + pl.col("away_p") - 1.0).alias("vig_spread"),
         ((pl.col("home_p") / pl.col("away_p")) - 1.0).alias("home_away_ratio"),
     ])
 
-    # --- Join with team stats on team IDs + season ---
-    print("[build_features] Joining with team_stats for margin + fg_diff")
-    df = joined.join(
-        stats.select([
-            "season", "home_team_id", "away_team_id", "margin", "fg_diff", "home_win"
-        ]),
-        on=["home_team_id", "away_team_id"],
-        how="left",
-    )
+    # --- Point-in-time team form + the game's own result, per game (not per pair) ---
+    games = resolve_games(ticks, stats, form if form is not None else team_form(stats), schedule)
+    df = joined.join(games, on=["game_id", *PAIR], how="inner")
 
     # --- Add target label (1 if home win else 0) ---
     df = df.with_columns([
@@ -61,22 +103,23 @@ def main():
 
     # --- Expand back to HOME/AWAY runner rows ---
     features_home = df.select([
-        "game_id", "home_team_id", "away_team_id",
+        *game_keys, "game_date",
         pl.lit("HOME").alias("runner"),
         pl.col("home_p").alias("imp_prob_mean"),
+        pl.col("home_fair").alias("imp_prob_vigadj"),
         pl.col("vig_spread"),
         pl.col("home_away_ratio"),
-        pl.col("margin"), pl.col("fg_diff"), pl.col("label")
+        *FORM_COLS, pl.col("label")
     ])
 
     features_away = df.select([
-        "game_id", "home_team_id", "away_team_id",
+        *game_keys, "game_date",
         pl.lit("AWAY").alias("runner"),
         pl.col("away_p").alias("imp_prob_mean"),
+        pl.col("away_fair").alias("imp_prob_vigadj"),
         pl.col("vig_spread"),
         pl.col("home_away_ratio"),
-        (-pl.col("margin")).alias("margin"),  # inverse perspective
-        (-pl.col("fg_diff")).alias("fg_diff"),
+        *(-pl.col(c) for c in FORM_COLS),  # inverse perspective
         (1 - pl.col("label")).alias("label")
     ])
 
@@ -86,14 +129,100 @@ def main():
         (pl.col("imp_prob_mean") > 0)
         & (pl.col("imp_prob_mean") <= 1)
         & (pl.col("vig_spread") < 0.3)
-        & (pl.col("margin").is_not_null())
     )
+    return features
+
+
+def update_features(wh_root: str | pathlib.Path, league: str,
+                    dates: tuple[dt.date | None, dt.date | None] = (None, None), full: bool = False,
+                    devig_method: str = "multiplicative") -> tuple[pl.DataFrame, list[str], list[str]] | None:
+    """Bring <warehouse>/<league>/features.parquet up to date with the tick store.
+
+    Recomputes only the games whose ticks changed (all of them when team_stats,
+    team_form or the schedule did) and drops games whose ticks vanished. Returns
+    (features, recomputed game IDs, dropped game IDs), or None when nothing changed.
+    """
+    wh = pathlib.Path(wh_root) / league
+    wh.mkdir(parents=True, exist_ok=True)
+
+    stats_path = wh / "team_stats.parquet"
+    if not stats_path.exists():
+        raise FileNotFoundError("team_stats.parquet missing")
+    # team_form.parquet (lib.featurization.team_form) if built, else derived from team_stats here
+    form_path = wh / "team_form.parquet"
+    # schedule.parquet (lib.ingest.nba_schedule) dates games by their scheduled start
+    schedule_path = wh / "schedule.parquet"
+    inputs = [stats_path] + [p for p in (form_path, schedule_path) if p.exists()]
 
     out_path = wh / "features.parquet"
-    out_path.unlink(missing_ok=True)
-    features.write_parquet(out_path)
+    stats = pl.read_parquet(stats_path)
+    form = pl.read_parquet(form_path) if form_path.exists() else None
+    schedule = pl.read_parquet(schedule_path) if schedule_path.exists() else None
+    bounded = any(d is not None for d in dates)
+
+    # Per-game fingerprints of the tick inputs decide what gets recomputed;
+    # a new team_stats/team_form/schedule changes every game's joins, so it forces all,
+    # as does a features.parquet missing any of the newer columns.
+    manifest = SourceManifest(wh, "build_features")
+    seen = manifest.data.setdefault("build_features.games", {})
+    if full or not out_path.exists() or not {*FORM_COLS, "imp_prob_vigadj", "game_date"} <= set(pl.read_parquet_schema(out_path)):
+        manifest.reset()
+        seen.clear()
+    stats_changed = bool(manifest.changed(inputs))
+    if stats_changed and bounded:
+        print("[build_features] team_stats changed; ignoring date bounds and recomputing every game")
+        dates, bounded = (None, None), False
+    # Games with ticks in the date bounds, each fingerprinted over all of its partitions
+    fps = game_fingerprints(wh_root, league, dates=dates)
+    todo = sorted(fps) if stats_changed else sorted(g for g, fp in fps.items() if seen.get(g) != fp)
+    # Games whose ticks disappeared are dropped (a date-bounded run can't tell)
+    gone = [] if bounded else sorted(g for g in seen if g not in fps)
+    if not todo and not gone:
+        manifest.save()
+        print(f"[build_features] ✅ {len(fps)} games unchanged; {out_path} is current")
+        return None
+
+    # Game IDs prune whole tick-store partitions before any file is read; a
+    # recomputed game is read across every date partition it spans
+    ticks = scan_ticks(wh_root, league, game_ids=todo).collect()
+    features = compute_features(ticks, stats, form, devig_method, schedule)
+    if out_path.exists() and not stats_changed:
+        old = pl.read_parquet(out_path)
+        features = pl.concat([
+            old.filter(~pl.col("game_id").cast(pl.Utf8).is_in(todo + gone)), features,
+        ], how="diagonal_relaxed")
+    tmp = out_path.with_suffix(".tmp")
+    features.write_parquet(tmp)
+    tmp.replace(out_path)
+
+    for g in todo:
+        seen[g] = fps[g]
+    for g in gone:
+        seen.pop(g, None)
+    manifest.mark(inputs)
+    manifest.save()
+    return features, todo, gone
 
-    print(f"[build_features] ✅ wrote {out_path} rows={features.height}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--league", default="NBA")
+    ap.add_argument("--start_date", type=dt.date.fromisoformat, default=None, help="Only games with ticks on/after YYYY-MM-DD")
+    ap.add_argument("--end_date", type=dt.date.fromisoformat, default=None, help="Only games with ticks on/before YYYY-MM-DD")
+    ap.add_argument("--full", action="store_true", help="Recompute every game")
+    args = ap.parse_args()
+    s = load_settings()
+
+    print(f"[build_features] 🚀 Building features for {args.league}")
+    t0 = time.perf_counter()
+    out = update_features(s.paths["warehouse"], args.league, (args.start_date, args.end_date), args.full,
+                          (s.features or {}).get("devig_method", "multiplicative"))
+    if out is None:
+        return
+    features, todo, gone = out
+    print(f"[build_features] ✅ recomputed {len(todo)} games, dropped {len(gone)} "
+          f"in {time.perf_counter() - t0:.3f}s → {pathlib.Path(s.paths['warehouse']) / args.league / 'features.parquet'} "
+          f"rows={features.height}")
     print(features.head(10))
 
 if __name__ == "__main__":
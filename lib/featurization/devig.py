@@ -0,0 +1,167 @@
+from __future__ import annotations
+from typing import Sequence
+import numpy as np, polars as pl
+
+# Vig removal for one market quote: the k outcome prices a book shows at one
+# moment (k = 2 for moneyline, 3 with a draw). The kernels take an (n, k)
+# array of raw implied probabilities 1/price, NaN where an outcome is missing,
+# and return fair probabilities summing to 1 per row; every iteration is a
+# whole-array step, never a Python loop over quotes.
+METHODS = ("multiplicative", "power", "shin")
+QUOTE_KEYS = ["game_id", "ts_utc", "book"]
+
+
+def overround(p: np.ndarray) -> np.ndarray:
+    return np.nansum(p, axis=1) - 1.0
+
+
+def multiplicative(p: np.ndarray) -> np.ndarray:
+    """Scale every outcome by the same factor: p_i / sum(p)."""
+    return p / np.nansum(p, axis=1, keepdims=True)
+
+
+def power(p: np.ndarray, iters: int = 30, tol: float = 1e-12) -> np.ndarray:
+    """p_i ** k with k solving sum(p_i ** k) = 1 (Newton; longshots lose more of the margin).
+
+    Rows without a root (an outcome quoted at 1/price >= 1) fall back to multiplicative.
+    """
+    logp = np.log(p)
+    k = np.ones((len(p), 1))
+    live = np.arange(len(p))
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):  # rootless rows are replaced below
+        for _ in range(iters):
+            lp = logp[live]
+            pk = np.exp(k[live] * lp)
+            f = np.nansum(pk, axis=1, keepdims=True) - 1.0
+            k[live] -= f / np.nansum(pk * lp, axis=1, keepdims=True)
+            live = live[np.abs(f[:, 0]) >= tol]
+            if not len(live):
+                break
+        fair = np.exp(k * logp)
+    bad = ~(np.abs(np.nansum(fair, axis=1) - 1.0) < 1e-9)
+    fair[bad] = multiplicative(p[bad])
+    return fair
+
+
+def shin_z(p: np.ndarray, iters: int = 50, tol: float = 1e-13) -> np.ndarray:
+    """Shin's insider-trading share z per row, as an (n, 1) column.
+
+    Two-outcome rows use the closed form; wider rows solve sum(fair_i(z)) = 1
+    by Newton from z = 0. Rows with no root (a single price implying > 1) stop
+    at the iteration cap and are left to shin()'s final normalisation.
+    """
+    s = np.nansum(p, axis=1, keepdims=True)
+    k = np.sum(~np.isnan(p), axis=1, keepdims=True)
+    z = np.zeros_like(s)
+
+    two = (k == 2)[:, 0]
+    if two.any():
+        p2 = p[two]
+        s2 = s[two]
+        # the two present outcomes, wherever they sit in the row
+        hi, lo = np.nanmax(p2, axis=1, keepdims=True), np.nanmin(p2, axis=1, keepdims=True)
+        d2 = (hi - lo) ** 2
+        z[two] = (s2 - 1.0) * (d2 - s2) / (s2 * (d2 - 1.0))
+
+    wide = (k > 2)[:, 0]
+    if wide.any():
+        q = p[wide] ** 2 / s[wide]
+        zw = np.zeros((len(q), 1))
+        live = np.arange(len(q))  # rows still iterating; converged ones drop out
+        for _ in range(iters):
+            ql, zl = q[live], zw[live]
+            r = np.sqrt(zl * zl + 4.0 * (1.0 - zl) * ql)
+            g = np.nansum((r - zl) / (2.0 * (1.0 - zl)), axis=1, keepdims=True) - 1.0
+            dr = (zl - 2.0 * ql) / r
+            dg = np.nansum(((dr - 1.0) * (1.0 - zl) + (r - zl)) / (2.0 * (1.0 - zl) ** 2), axis=1, keepdims=True)
+            zw[live] = np.clip(zl - g / dg, 0.0, 0.999)
+            live = live[np.abs(g[:, 0]) >= tol]
+            if not len(live):
+                break
+        z[wide] = zw
+    return np.where(s > 1.0, z, 0.0)
+
+
+def _shin_fair(q: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (np.sqrt(z * z + 4.0 * (1.0 - z) * q) - z) / (2.0 * (1.0 - z))
+
+
+def shin(p: np.ndarray) -> np.ndarray:
+    """Shin (1993) fair probabilities; falls back to p / sum(p) for rows without overround."""
+    z = shin_z(p)
+    fair = _shin_fair(p * p / np.nansum(p, axis=1, keepdims=True), z)
+    # normalising removes the solver's last ~1e-13 of error
+    return fair / np.nansum(fair, axis=1, keepdims=True)
+
+
+KERNELS = {"multiplicative": multiplicative, "power": power, "shin": shin}
+
+
+def devig(p: np.ndarray, method: str = "multiplicative") -> np.ndarray:
+    if method not in KERNELS:
+        raise ValueError(f"unknown de-vig method {method!r}; expected one of {METHODS}")
+    p = np.asarray(p, dtype=np.float64)
+    return KERNELS[method](p)
+
+
+# --- long tick frames (one row per outcome) ---
+
+def quote_matrix(quote_idx: np.ndarray, outcome_idx: np.ndarray, values: np.ndarray,
+                 n_quotes: int, n_outcomes: int) -> np.ndarray:
+    m = np.full((n_quotes, n_outcomes), np.nan)
+    m[quote_idx, outcome_idx] = values
+    return m
+
+
+def fair_probs(df: pl.DataFrame, method: str = "multiplicative", keys: Sequence[str] = QUOTE_KEYS,
+               outcome: str = "runner", price: str = "price_decimal") -> pl.Series:
+    """Fair probability for every row of a long quotes frame, de-vigged within its `keys` quote.
+
+    Quotes missing an outcome present elsewhere in the frame are scaled over the
+    outcomes they do have; single-outcome quotes come back null.
+    """
+    keys = list(keys)
+    idx = df.select(
+        pl.struct(keys).rank("dense").cast(pl.Int64).alias("q") - 1,
+        pl.col(outcome).rank("dense").cast(pl.Int64).alias("o") - 1,
+        (1.0 / pl.col(price).cast(pl.Float64)).alias("p"),
+        pl.len().over(keys).alias("n"),
+    )
+    q, o = idx["q"].to_numpy(), idx["o"].to_numpy()
+    m = quote_matrix(q, o, idx["p"].to_numpy(), int(q.max()) + 1 if len(q) else 0, int(o.max()) + 1 if len(o) else 0)
+    fair = devig(m, method)[q, o]
+    return pl.Series("fair_prob", np.where(idx["n"].to_numpy() > 1, fair, np.nan)).fill_nan(None)
+
+
+def fair_prob_expr(method: str = "multiplicative", keys: Sequence[str] = QUOTE_KEYS,
+                   outcome: str = "runner", price: str = "price_decimal") -> pl.Expr:
+    """fair_probs as an expression, for lazy plans. Multiplicative is native Polars;
+    power/Shin hand the whole column to the NumPy kernels in one batch."""
+    keys = list(keys)
+    imp = 1.0 / pl.col(price).cast(pl.Float64)
+    if method == "multiplicative":
+        return pl.when(pl.len().over(keys) > 1).then(imp / imp.sum().over(keys)).alias("fair_prob")
+    cols = [*keys, outcome, price]
+    return pl.struct(cols).map_batches(
+        lambda s: fair_probs(s.struct.unnest(), method, keys, outcome, price),
+        return_dtype=pl.Float64,
+    ).alias("fair_prob")
+
+
+def consensus(df: pl.DataFrame | pl.LazyFrame, method: str = "multiplicative",
+              keys: Sequence[str] = ("game_id", "ts_utc"), book: str = "book",
+              outcome: str = "runner", price: str = "price_decimal") -> pl.DataFrame | pl.LazyFrame:
+    """Cross-book consensus per (keys, outcome): mean of each book's fair probability,
+    renormalised to sum to 1, with the best price and the number of books quoting."""
+    keys = list(keys)
+    per_book = df.with_columns(fair_prob_expr(method, [*keys, book], outcome, price))
+    return (
+        per_book.group_by([*keys, outcome])
+        .agg([
+            pl.col("fair_prob").mean().alias("consensus_prob"),
+            pl.col(price).max().alias("best_price"),
+            pl.col("fair_prob").count().alias("n_books"),
+        ])
+        .with_columns((pl.col("consensus_prob") / pl.col("consensus_prob").sum().over(keys)).alias("consensus_prob"))
+        .sort([*keys, outcome])
+    )
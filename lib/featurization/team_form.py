@@ -0,0 +1,101 @@
+from __future__ import annotations
+import argparse, pathlib, time, polars as pl
+from lib.common.settings import load_settings
+from lib.utils.team_registry import from_nba_stats_id
+
+# Rolling last-N team form, point in time. Each row is one team's form over
+# its last N games *including* the game played on `date`, and becomes usable
+# from the next day (`asof_date`), so a backward as-of join on a game's date
+# only ever sees strictly earlier games.
+DEFAULT_FORM_GAMES = 10
+FORM_COLS = ["form_margin", "form_fg_diff", "form_win_rate"]
+
+
+def registry_team_id(col: str) -> pl.Expr:
+    """Team ID column → registry ID; team_stats carries nba_api TEAM_IDs (1610612xxx)."""
+    c = pl.col(col)
+    return pl.when(c > 65535).then(from_nba_stats_id(c.cast(pl.Int64))).otherwise(c).cast(pl.UInt16).alias(col)
+
+
+def _game_date() -> pl.Expr:
+    # GAME_DATE / GAME_DATE_EST arrive as strings ("2022-12-22" or "2022-12-22 00:00:00")
+    return pl.col("date").cast(pl.Utf8).str.slice(0, 10).str.to_date("%Y-%m-%d").alias("game_date")
+
+
+def game_results(stats: pl.LazyFrame) -> pl.LazyFrame:
+    """team_stats → one row per game on registry team IDs with a parsed game_date."""
+    return stats.select([
+        "season", _game_date(), registry_team_id("home_team_id"), registry_team_id("away_team_id"),
+        "margin", "fg_diff", "home_win",
+    ]).drop_nulls(["game_date", "home_team_id", "away_team_id"])
+
+
+def team_games(stats: pl.LazyFrame) -> pl.LazyFrame:
+    """One row per team per game, from that team's side (margin, fg_diff, win)."""
+    games = game_results(stats)
+    home = games.select([
+        pl.col("home_team_id").alias("team_id"), "game_date",
+        "margin", "fg_diff", (pl.col("margin") > 0).cast(pl.Float64).alias("win"),
+    ])
+    away = games.select([
+        pl.col("away_team_id").alias("team_id"), "game_date",
+        -pl.col("margin"), -pl.col("fg_diff"), (pl.col("margin") < 0).cast(pl.Float64).alias("win"),
+    ])
+    return pl.concat([home, away], how="vertical_relaxed")
+
+
+def team_form(stats: pl.LazyFrame, n: int = DEFAULT_FORM_GAMES) -> pl.LazyFrame:
+    """Per team and game date: mean margin / fg_diff / win rate over the last `n` games up to it."""
+    roll = {"window_size": n, "min_samples": 1}
+    return (
+        team_games(stats)
+        .sort(["team_id", "game_date"])
+        .select([
+            "team_id", "game_date",
+            (pl.col("game_date") + pl.duration(days=1)).alias("asof_date"),
+            pl.col("margin").rolling_mean(**roll).over("team_id").alias("form_margin"),
+            pl.col("fg_diff").rolling_mean(**roll).over("team_id").alias("form_fg_diff"),
+            pl.col("win").rolling_mean(**roll).over("team_id").alias("form_win_rate"),
+            pl.int_range(1, pl.len() + 1).clip(upper_bound=n).over("team_id").alias("form_games"),
+        ])
+    )
+
+
+def join_form(games: pl.LazyFrame, form: pl.LazyFrame, on: str = "game_date") -> pl.LazyFrame:
+    """Attach home_/away_ form as of each game's `on` date (strictly earlier games only)."""
+    form = form.select(["team_id", "asof_date", *FORM_COLS, "form_games"]).sort("asof_date")
+    games = games.sort(on)
+    for side in ("home", "away"):
+        games = games.join_asof(
+            form.rename({c: f"{side}_{c}" for c in [*FORM_COLS, "form_games"]}),
+            left_on=on, right_on="asof_date", by_left=f"{side}_team_id", by_right="team_id",
+            strategy="backward", check_sortedness=False,
+        ).drop("asof_date")
+    return games
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--league", default="NBA")
+    ap.add_argument("--games", type=int, default=None, help="Form window (last N games); features.form_games")
+    args = ap.parse_args()
+    s = load_settings()
+
+    wh = pathlib.Path(s.paths["warehouse"]) / args.league
+    stats_path = wh / "team_stats.parquet"
+    if not stats_path.exists():
+        raise FileNotFoundError("team_stats.parquet missing")
+    n = args.games or (s.features or {}).get("form_games", DEFAULT_FORM_GAMES)
+
+    t0 = time.perf_counter()
+    form = team_form(pl.scan_parquet(stats_path), n).collect()
+    out_path = wh / "team_form.parquet"
+    tmp = out_path.with_suffix(".tmp")
+    form.write_parquet(tmp)
+    tmp.replace(out_path)
+    print(f"[team_form] ✅ last-{n} form for {form['team_id'].n_unique()} teams → {out_path} "
+          f"rows={form.height} in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
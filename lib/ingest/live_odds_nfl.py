@@ -1,6 +1,7 @@
 import os
-import requests
 import polars as pl
+from lib.common.schema import LIVE_ODDS, conform
+from lib.ingest.odds_poller import PollerConfig, poll
 
 ODDS_API_KEY = os.getenv("ODDS_API_KEY")
 if not ODDS_API_KEY:
@@ -9,50 +10,11 @@ if not ODDS_API_KEY:
 def fetch_live_odds():
     print("[live_odds_nfl] 🔄 Fetching DraftKings/FanDuel NFL odds...")
 
-    url = "https://api.the-odds-api.com/v4/sports/americanfootball_nfl/odds"
-    params = {
-        "apiKey": ODDS_API_KEY,
-        "regions": "us",
-        "markets": "h2h",
-        "oddsFormat": "decimal",
-    }
-
-    try:
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as e:
-        print(f"[live_odds_nfl] ⚠️ Failed to fetch live data: {e}")
-        data = []
-
-    rows = []
-    for g in data:
-        home = g.get("home_team")
-        away = g.get("away_team")
-        if not home or not away:
-            continue
-
-        for book in g.get("bookmakers", []):
-            if book["key"] in ["draftkings", "fanduel"]:
-                markets = book.get("markets", [])
-                if not markets:
-                    continue
-                outcomes = markets[0].get("outcomes", [])
-                if len(outcomes) != 2:
-                    continue
-
-                home_price = next((o["price"] for o in outcomes if o["name"] == home), None)
-                away_price = next((o["price"] for o in outcomes if o["name"] == away), None)
-                if home_price is None or away_price is None:
-                    continue
-
-                rows.append({
-                    "home_team": home,
-                    "away_team": away,
-                    "book": book["key"],
-                    "home_odds": home_price,
-                    "away_odds": away_price,
-                })
+    cfg = PollerConfig.from_settings(
+        leagues=["NFL"], books=["draftkings", "fanduel"], markets=["moneyline"], api_key=ODDS_API_KEY,
+    )
+    frames = poll(cfg)
+    rows = frames["NFL"].to_dicts() if "NFL" in frames else []
 
     if not rows:
         print("[live_odds_nfl] ⚠️ No live NFL odds found. Using fallback mock data...")
@@ -68,7 +30,7 @@ def fetch_live_odds():
         ]
 
     df = pl.DataFrame(rows)
-    df.write_parquet("data/warehouse/NFL/live_odds.parquet")
+    conform(df, LIVE_ODDS).write_parquet("data/warehouse/NFL/live_odds.parquet")
     print(f"✅ Saved {len(df)} NFL odds → data/warehouse/NFL/live_odds.parquet")
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+from __future__ import annotations
+import hashlib, json, os, pathlib
+import polars as pl
+from lib.common.schema import conform, with_game_key
+
+# Per-league record of which vendor files each ingest stage has already parsed:
+#   <warehouse>/<LEAGUE>/_manifest.json = {stage: {file name: {size, mtime_ns, sha256}}}
+MANIFEST_NAME = "_manifest.json"
+
+
+def file_sha256(path: pathlib.Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class SourceManifest:
+    def __init__(self, wh: str | pathlib.Path, stage: str):
+        self.path = pathlib.Path(wh) / MANIFEST_NAME
+        self.stage = stage
+        self.data = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.entries = self.data.setdefault(stage, {})
+
+    def changed(self, paths: list[pathlib.Path]) -> list[pathlib.Path]:
+        """New or modified sources. Size+mtime match skips hashing; a touched
+        file whose content hash is unchanged is refreshed in place and skipped.
+        Entries for sources no longer in `paths` are forgotten, so a file that
+        is removed and later restored is parsed again."""
+        names = {p.name for p in paths}
+        for name in [n for n in self.entries if n not in names]:
+            del self.entries[name]
+        out = []
+        for p in sorted(paths):
+            st = p.stat()
+            prev = self.entries.get(p.name)
+            if prev and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns:
+                continue
+            digest = file_sha256(p)
+            if prev and prev["sha256"] == digest:
+                prev.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+                continue
+            out.append(p)
+        return out
+
+    def mark(self, paths: list[pathlib.Path]) -> None:
+        for p in paths:
+            st = p.stat()
+            self.entries[p.name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": file_sha256(p)}
+
+    def reset(self) -> None:
+        self.entries.clear()
+
+    def save(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.data, indent=2, sort_keys=True))
+        os.replace(tmp, self.path)
+
+
+def upsert_parquet(out_path: pathlib.Path, new: pl.DataFrame, key: list[str],
+                   schema: dict[str, pl.DataType] | None = None) -> pl.DataFrame:
+    """Replace rows of `out_path` whose `key` appears in `new`, append the rest.
+
+    With a `schema` (lib.common.schema table) both sides are conformed first,
+    so a file written before the compact types is migrated on its next upsert;
+    a schema with game_key gets keys from the league's map next to `out_path`.
+    """
+    new = new.unique(subset=key, keep="last", maintain_order=True)
+    if schema is not None:
+        new = conform(new, schema)
+    if out_path.exists():
+        old = pl.read_parquet(out_path)
+        if schema is not None:
+            old = conform(old, schema)
+        new = pl.concat([old.join(new.select(key), on=key, how="anti"), new], how="diagonal_relaxed")
+    if schema is not None and "game_key" in schema:
+        new = with_game_key(new, out_path.parent)
+    tmp = out_path.with_suffix(".tmp")
+    new.write_parquet(tmp)
+    os.replace(tmp, out_path)
+    return new
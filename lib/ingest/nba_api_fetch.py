@@ -1,46 +1,180 @@
 from __future__ import annotations
-import sys, time, pathlib
+import argparse, datetime as dt, hashlib, json, pathlib, sys, time, uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable
 import polars as pl
-from nba_api.stats.endpoints import leaguegamefinder
 from lib.common.settings import load_settings
 
+# (endpoint name, params) → frame. The default goes to stats.nba.com through
+# nba_api; tests and offline runs pass their own.
+Fetch = Callable[[str, dict], pl.DataFrame]
+
+ENDPOINT = "leaguegamefinder"
+KEEP_COLS = [
+    "GAME_DATE", "SEASON_ID", "GAME_ID", "TEAM_ID", "TEAM_ABBREVIATION",
+    "TEAM_NAME", "MATCHUP", "WL", "PTS", "FG_PCT", "FG3_PCT", "FT_PCT",
+    "REB", "AST",
+]
+NBA_API_CLASSES = {"leaguegamefinder": "LeagueGameFinder"}
+
+
+def season_str(start_year: int) -> str:
+    return f"{start_year}-{(start_year + 1) % 100:02d}"
+
+
+def current_season(today: dt.date | None = None) -> int:
+    # Seasons tip off in October; before that the previous season is current
+    today = today or dt.date.today()
+    return today.year if today.month >= 10 else today.year - 1
+
+
+# SEASON_ID = season type digit + start year: 1 preseason, 2 regular season,
+# 3 All-Star, 4 playoffs, 5 play-in
+COMPETITIVE_SEASON_TYPES = [2, 4, 5]
+
+
+def season_params(start_year: int) -> dict:
+    return {"season_nullable": season_str(start_year), "league_id_nullable": "00"}
+
+
+def call_nba_api(endpoint: str, params: dict, timeout: float = 60) -> pl.DataFrame:
+    from nba_api.stats import endpoints  # imported lazily: heavy, and optional for cached/offline runs
+
+    cls = getattr(getattr(endpoints, endpoint), NBA_API_CLASSES[endpoint])
+    return pl.from_pandas(cls(**params, timeout=timeout).get_data_frames()[0])
+
+
+class ResponseCache:
+    """One parquet per (endpoint, params) under <root>/<endpoint>/<hash>.parquet."""
+
+    def __init__(self, root: str | pathlib.Path):
+        self.root = pathlib.Path(root)
+
+    def path(self, endpoint: str, params: dict) -> pathlib.Path:
+        key = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+        return self.root / endpoint / f"{key}.parquet"
+
+    def get(self, endpoint: str, params: dict) -> pl.DataFrame | None:
+        p = self.path(endpoint, params)
+        return pl.read_parquet(p) if p.exists() else None
+
+    def put(self, endpoint: str, params: dict, df: pl.DataFrame) -> None:
+        p = self.path(endpoint, params)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+        df.write_parquet(tmp)
+        tmp.replace(p)
+        p.with_suffix(".json").write_text(json.dumps(
+            {"endpoint": endpoint, "params": params, "fetched_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+             "rows": df.height}, indent=2))
+
+
+def fetch_season(season: int, cache: ResponseCache, fetch: Fetch = call_nba_api,
+                 refresh: bool = False, retries: int = 2, backoff_s: float = 2.0) -> tuple[pl.DataFrame, bool]:
+    """One season's games, from the cache unless `refresh`. Returns (frame, came_from_cache)."""
+    params = season_params(season)
+    if not refresh:
+        hit = cache.get(ENDPOINT, params)
+        if hit is not None:
+            return hit, True
+    for attempt in range(retries + 1):
+        try:
+            df = fetch(ENDPOINT, params)
+            break
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff_s * 2 ** attempt)
+    df = df.select(KEEP_COLS)
+    cache.put(ENDPOINT, params, df)
+    return df, False
+
+
+def fetch_history(
+    seasons: Iterable[int], cache: ResponseCache, fetch: Fetch = call_nba_api,
+    refresh: Iterable[int] = (), workers: int = 3, retries: int = 2, backoff_s: float = 2.0,
+) -> tuple[dict[int, pl.DataFrame], dict[int, Exception]]:
+    """Per-season requests with at most `workers` in flight.
+
+    Each season is cached as soon as it lands, so a failed run keeps every
+    finished season and the next run resumes with only the missing ones.
+    """
+    refresh = set(refresh)
+    done: dict[int, pl.DataFrame] = {}
+    failed: dict[int, Exception] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(fetch_season, season, cache, fetch, season in refresh, retries, backoff_s): season
+            for season in seasons
+        }
+        for fut in as_completed(futures):
+            season = futures[fut]
+            try:
+                df, cached = fut.result()
+            except Exception as e:
+                failed[season] = e
+                stale = cache.get(ENDPOINT, season_params(season))
+                if stale is not None:
+                    # a failed refresh still has last run's copy to fall back on
+                    done[season] = stale
+                print(f"[nba_api_fetch] ⚠️ {season_str(season)} failed: {e!r}"
+                      + (" (keeping cached copy)" if stale is not None else ""))
+                continue
+            done[season] = df
+            print(f"[nba_api_fetch] {season_str(season)} rows={df.height} ({'cache' if cached else 'api'})")
+    return done, failed
+
+
+def to_modern(frames: Iterable[pl.DataFrame]) -> pl.DataFrame:
+    """nba_games_modern.csv layout: regular season, play-in and playoffs, plus helpers."""
+    df = pl.concat(list(frames), how="vertical_relaxed")
+    return (
+        df.filter((pl.col("SEASON_ID").cast(pl.Int32) // 10000).is_in(COMPETITIVE_SEASON_TYPES))
+        .with_columns([
+            (pl.col("GAME_DATE").str.strptime(pl.Date, "%Y-%m-%d")).alias("date"),
+            (pl.col("WL") == "W").cast(pl.Int8).alias("team_win"),
+        ])
+        .sort(["GAME_DATE", "GAME_ID", "TEAM_ID"])
+    )
+
 
 def main():
-    print("[nba_api_fetch] 🚀 Fetching modern NBA game data (2021–present)")
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--league", default="NBA")
+    ap.add_argument("--min_season", type=int, default=2020, help="First season start year (2020 = 2020-21)")
+    ap.add_argument("--max_season", type=int, default=None, help="Defaults to the current season")
+    ap.add_argument("--workers", type=int, default=3, help="Concurrent season requests")
+    ap.add_argument("--refresh_all", action="store_true", help="Ignore cached past seasons")
+    args = ap.parse_args()
+
     s = load_settings()
     league = "NBA"
     vendors = pathlib.Path(s.paths["vendors"]) / league / "raw"
     vendors.mkdir(parents=True, exist_ok=True)
+    cache = ResponseCache(pathlib.Path(s.paths["vendors"]) / league / "_cache" / "nba_api")
 
-    print("[nba_api_fetch] Querying API… this can take ~1–2 minutes.")
-    gamefinder = leaguegamefinder.LeagueGameFinder(
-        season_nullable=None,  # all seasons
-        league_id_nullable="00"  # NBA
-    )
-    games = gamefinder.get_data_frames()[0]
-
-    # Keep essential columns only
-    df = pl.from_pandas(games)[
-        [
-            "GAME_DATE", "SEASON_ID", "GAME_ID", "TEAM_ID", "TEAM_ABBREVIATION",
-            "TEAM_NAME", "MATCHUP", "WL", "PTS", "FG_PCT", "FG3_PCT", "FT_PCT",
-            "REB", "AST"
-        ]
-    ]
-
-    # Filter seasons >= 2020–21 (ID 22020 and up)
-    df = df.filter(pl.col("SEASON_ID").cast(pl.Int32) >= 22020)
-
-    # Add helper columns
-    df = df.with_columns([
-        (pl.col("GAME_DATE").str.strptime(pl.Date, "%Y-%m-%d")).alias("date"),
-        (pl.col("WL") == "W").cast(pl.Int8).alias("team_win")
-    ])
+    current = current_season()
+    seasons = list(range(args.min_season, (args.max_season or current) + 1))
+    # Finished seasons never change; only the one in progress is re-requested
+    refresh = seasons if args.refresh_all else [x for x in seasons if x >= current]
+    print(f"[nba_api_fetch] 🚀 {season_str(seasons[0])}…{season_str(seasons[-1])}: "
+          f"{len(seasons)} seasons, refreshing {[season_str(x) for x in refresh]}")
+
+    t0 = time.perf_counter()
+    done, failed = fetch_history(seasons, cache, refresh=refresh, workers=args.workers)
+    if not done:
+        print("[nba_api_fetch] ❌ nothing fetched")
+        sys.exit(1)
 
+    df = to_modern(done[x] for x in sorted(done))
     out_path = vendors / "nba_games_modern.csv"
-    out_path.unlink(missing_ok=True)
-    df.write_csv(out_path)
-    print(f"[nba_api_fetch] ✅ wrote {out_path} rows={df.height}")
+    tmp = out_path.with_suffix(".csv.tmp")
+    df.write_csv(tmp)
+    tmp.replace(out_path)
+    print(f"[nba_api_fetch] ✅ wrote {out_path} rows={df.height} in {time.perf_counter() - t0:.1f}s")
+    if failed:
+        print(f"[nba_api_fetch] ⚠️ missing {[season_str(x) for x in sorted(failed)]}; rerun to resume")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
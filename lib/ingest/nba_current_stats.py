@@ -1,5 +1,6 @@
 from nba_api.stats.endpoints import leaguedashteamstats
 import polars as pl
+from lib.common.schema import CURRENT_TEAM_STATS, conform
 
 def fetch_nba_team_stats():
     stats = leaguedashteamstats.LeagueDashTeamStats(
@@ -11,7 +12,7 @@ def fetch_nba_team_stats():
         "TEAM_ID","TEAM_NAME","GP","FG_PCT","REB","AST","PLUS_MINUS"
     ]]
 
-    df = pl.from_pandas(stats)
+    df = conform(pl.from_pandas(stats), CURRENT_TEAM_STATS)
     df.write_parquet("data/warehouse/NBA/current_team_stats.parquet")
     print("[nba_current_stats] ✅ wrote current_team_stats.parquet rows=", len(df))
 
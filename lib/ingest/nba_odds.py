@@ -1,10 +1,13 @@
 from __future__ import annotations
 import argparse, pathlib, polars as pl
 from lib.common.settings import load_settings
+from lib.ingest.manifest import SourceManifest
+from lib.ingest.tick_store import append_ticks, compact_in_background, store_root
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--league", default="NBA")
+    ap.add_argument("--full", action="store_true", help="Re-parse every source file")
     args = ap.parse_args()
     s = load_settings()
 
@@ -17,6 +20,15 @@ def main():
         print(f"[nba_odds] WARN: no odds*.csv files found in {vendors}")
         return
 
+    manifest = SourceManifest(wh, "nba_odds")
+    if args.full:
+        manifest.reset()
+    csv_files = manifest.changed(csv_files)
+    if not csv_files:
+        manifest.save()
+        print("[nba_odds] no new or changed odds files")
+        return
+
     dfs = []
     for f in csv_files:
         df = pl.read_csv(f, try_parse_dates=False, schema_overrides={"ts_utc": pl.Utf8})
@@ -55,15 +67,16 @@ def main():
             & (pl.col("runner").is_in(["HOME", "AWAY"]))
         )
         .select(["ts_utc", "game_id", "book", "market", "runner", "price_decimal"])
-        .unique(subset=["ts_utc", "game_id", "book", "runner"])
-        .sort(["game_id", "ts_utc", "book", "runner"])
     )
 
-
-    out_path = wh / "ticks.parquet"
-    out_path.unlink(missing_ok=True)
-    df.write_parquet(out_path)
-    print(f"[nba_odds] wrote {out_path} rows={df.height}")
+    # Append-only: new part files per (date, game) partition; dedup + sort
+    # happen per partition during compaction, never over the full history.
+    written = append_ticks(df, s.paths["warehouse"], args.league)
+    manifest.mark(csv_files)
+    manifest.save()
+    compact_in_background(s.paths["warehouse"], args.league)
+    print(f"[nba_odds] parsed {len(csv_files)} files, appended rows={df.height} to {len(written)} partitions "
+          f"under {store_root(s.paths['warehouse'])}")
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,13 @@
 from __future__ import annotations
 import argparse, pathlib, polars as pl
+from lib.common.schema import RESULTS
 from lib.common.settings import load_settings
+from lib.ingest.manifest import SourceManifest, upsert_parquet
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--league", default="NBA")
+    ap.add_argument("--full", action="store_true", help="Re-parse every source file")
     args = ap.parse_args()
     s = load_settings()
 
@@ -18,6 +21,15 @@ def main():
               "game_id, final_home_score, final_away_score, (optional) winner")
         return
 
+    manifest = SourceManifest(wh, "nba_results")
+    if args.full:
+        manifest.reset()
+        (wh / "results.parquet").unlink(missing_ok=True)
+    if not manifest.changed([src]):
+        manifest.save()
+        print(f"[nba_results] {src.name} unchanged; skipping")
+        return
+
     df = pl.read_csv(src)
     if "winner" not in df.columns:
         df = df.with_columns([
@@ -26,8 +38,10 @@ def main():
     df = df.select(["game_id","final_home_score","final_away_score","winner"]).with_columns([
         pl.col("game_id").cast(pl.Utf8), pl.col("winner").cast(pl.Utf8)
     ])
-    df.write_parquet(wh / "results.parquet")
-    print(f"[nba_results] wrote {wh/'results.parquet'} rows={df.height}")
+    out = upsert_parquet(wh / "results.parquet", df, key=["game_id"], schema=RESULTS)
+    manifest.mark([src])
+    manifest.save()
+    print(f"[nba_results] merged {df.height} rows into {wh/'results.parquet'} rows={out.height}")
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,14 @@
 from __future__ import annotations
 import argparse, pathlib, polars as pl
+from lib.common.schema import SCHEDULE
 from lib.common.settings import load_settings
+from lib.ingest.manifest import SourceManifest, upsert_parquet
+from lib.utils.team_registry import team_ids
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--league", default="NBA")
+    ap.add_argument("--full", action="store_true", help="Re-parse every source file")
     args = ap.parse_args()
     s = load_settings()
 
@@ -18,6 +22,15 @@ def main():
               "game_id, league, season, date_utc, start_time_utc, home_team, away_team, venue")
         return
 
+    manifest = SourceManifest(wh, "nba_schedule")
+    if args.full:
+        manifest.reset()
+        (wh / "schedule.parquet").unlink(missing_ok=True)
+    if not manifest.changed([src]):
+        manifest.save()
+        print(f"[nba_schedule] {src.name} unchanged; skipping")
+        return
+
     df = pl.read_csv(src, try_parse_dates=True)
 
     # Ensure types without using .str. on a temporal column
@@ -25,9 +38,16 @@ def main():
         pl.col("game_id").cast(pl.Utf8),
         pl.col("start_time_utc").cast(pl.Datetime),  # safe if already datetime or string
     ])
+    # Registry IDs so downstream joins are on integers, not abbreviations
+    df = df.with_columns([
+        team_ids(df["home_team"], args.league).alias("home_team_id"),
+        team_ids(df["away_team"], args.league).alias("away_team_id"),
+    ])
 
-    df.write_parquet(wh / "schedule.parquet")
-    print(f"[nba_schedule] wrote {wh/'schedule.parquet'} rows={df.height}")
+    out = upsert_parquet(wh / "schedule.parquet", df, key=["game_id"], schema=SCHEDULE)
+    manifest.mark([src])
+    manifest.save()
+    print(f"[nba_schedule] merged {df.height} rows into {wh/'schedule.parquet'} rows={out.height}")
 
 if __name__ == "__main__":
     main()
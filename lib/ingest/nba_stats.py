@@ -1,10 +1,110 @@
 from __future__ import annotations
-import sys, os, pathlib
+import argparse, sys, os, pathlib
 import polars as pl
+from lib.common.schema import TEAM_STATS
 from lib.common.settings import load_settings
+from lib.ingest.manifest import SourceManifest, upsert_parquet
+
+# Declared schemas: no inference pass, no ignore_errors, and scan_csv only
+# materializes the projected columns.
+LEGACY_SCHEMA = {
+    "GAME_DATE_EST": pl.Utf8, "GAME_ID": pl.Int64, "GAME_STATUS_TEXT": pl.Utf8,
+    "HOME_TEAM_ID": pl.Int64, "VISITOR_TEAM_ID": pl.Int64, "SEASON": pl.Int32,
+    "TEAM_ID_home": pl.Int64, "PTS_home": pl.Float64, "FG_PCT_home": pl.Float64,
+    "FT_PCT_home": pl.Float64, "FG3_PCT_home": pl.Float64, "AST_home": pl.Float64,
+    "REB_home": pl.Float64, "TEAM_ID_away": pl.Int64, "PTS_away": pl.Float64,
+    "FG_PCT_away": pl.Float64, "FT_PCT_away": pl.Float64, "FG3_PCT_away": pl.Float64,
+    "AST_away": pl.Float64, "REB_away": pl.Float64, "HOME_TEAM_WINS": pl.Int8,
+}
+MODERN_SCHEMA = {
+    "GAME_DATE": pl.Utf8, "SEASON_ID": pl.Int32, "GAME_ID": pl.Int64, "TEAM_ID": pl.Int64,
+    "TEAM_ABBREVIATION": pl.Utf8, "TEAM_NAME": pl.Utf8, "MATCHUP": pl.Utf8, "WL": pl.Utf8,
+    "PTS": pl.Float64, "FG_PCT": pl.Float64, "FG3_PCT": pl.Float64, "FT_PCT": pl.Float64,
+    "REB": pl.Float64, "AST": pl.Float64, "date": pl.Utf8, "team_win": pl.Int8,
+}
+OUTPUT_COLS = [
+    "game_id", "date", "season", "home_team_id", "away_team_id",
+    "PTS_home", "PTS_away", "FG_PCT_home", "FG_PCT_away", "home_win",
+]
+
+
+def _season_filter(season_start: pl.Expr, seasons: tuple[int | None, int | None]) -> pl.Expr:
+    lo, hi = seasons
+    expr = pl.lit(True)
+    if lo is not None:
+        expr = expr & (season_start >= lo)
+    if hi is not None:
+        expr = expr & (season_start <= hi)
+    return expr
+
+
+def legacy_plan(path: pathlib.Path, seasons: tuple[int | None, int | None]) -> pl.LazyFrame:
+    # SEASON is the season's start year (2003 = 2003-04)
+    return (
+        pl.scan_csv(path, schema=LEGACY_SCHEMA)
+        .filter(_season_filter(pl.col("SEASON"), seasons))
+        .select([
+            pl.col("GAME_ID").alias("game_id"),
+            pl.col("GAME_DATE_EST").alias("date"),
+            pl.col("SEASON").cast(pl.Utf8).alias("season"),
+            pl.col("TEAM_ID_home").alias("home_team_id"),
+            pl.col("TEAM_ID_away").alias("away_team_id"),
+            "PTS_home", "PTS_away", "FG_PCT_home", "FG_PCT_away",
+            pl.col("HOME_TEAM_WINS").alias("home_win"),
+        ])
+    )
+
+
+def modern_plan(path: pathlib.Path, seasons: tuple[int | None, int | None]) -> pl.LazyFrame:
+    # One row per team per game; SEASON_ID = <season type digit><start year>.
+    # "BOS vs. NYK" is the home row, "NYK @ BOS" the away row.
+    lf = (
+        pl.scan_csv(path, schema=MODERN_SCHEMA)
+        .filter(_season_filter(pl.col("SEASON_ID") % 10000, seasons))
+        .select(["GAME_ID", "GAME_DATE", "SEASON_ID", "TEAM_ID", "MATCHUP", "PTS", "FG_PCT", "team_win"])
+    )
+    home = lf.filter(pl.col("MATCHUP").str.contains(" vs. ", literal=True)).select([
+        pl.col("GAME_ID").alias("game_id"),
+        pl.col("GAME_DATE").alias("date"),
+        pl.col("SEASON_ID").cast(pl.Utf8).alias("season"),
+        pl.col("TEAM_ID").alias("home_team_id"),
+        pl.col("PTS").alias("PTS_home"),
+        pl.col("FG_PCT").alias("FG_PCT_home"),
+        pl.col("team_win").alias("home_win"),
+    ])
+    away = lf.filter(pl.col("MATCHUP").str.contains(" @ ", literal=True)).select([
+        pl.col("GAME_ID").alias("game_id"),
+        pl.col("TEAM_ID").alias("away_team_id"),
+        pl.col("PTS").alias("PTS_away"),
+        pl.col("FG_PCT").alias("FG_PCT_away"),
+    ])
+    return home.join(away, on="game_id", how="inner").select(OUTPUT_COLS)
+
+
+# Source file → lazy plan builder. New vendor files (e.g. play-by-play
+# rollups) register here with their own schema.
+SOURCES = {
+    "nba_games.csv": legacy_plan,
+    "nba_games_modern.csv": modern_plan,
+}
+
+
+def build_plan(paths: list[pathlib.Path], seasons=(None, None)) -> pl.LazyFrame:
+    plans = [SOURCES[p.name](p, seasons).select(OUTPUT_COLS) for p in paths]
+    return pl.concat(plans, how="vertical_relaxed").with_columns([
+        (pl.col("PTS_home") - pl.col("PTS_away")).alias("margin"),
+        (pl.col("FG_PCT_home") - pl.col("FG_PCT_away")).alias("fg_diff"),
+    ])
 
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--league", default="NBA")
+    ap.add_argument("--full", action="store_true", help="Re-parse every source file")
+    ap.add_argument("--min_season", type=int, default=None, help="First season start year to keep (e.g. 2005)")
+    ap.add_argument("--max_season", type=int, default=None, help="Last season start year to keep")
+    args = ap.parse_args()
+
     print("[nba_stats] 🚀 Merging historical + modern NBA data (2005–2025)")
     s = load_settings()
     league = "NBA"
@@ -12,96 +112,35 @@ def main():
     vendors = pathlib.Path(s.paths["vendors"]) / league / "raw"
     wh = pathlib.Path(s.paths["warehouse"]) / league
     wh.mkdir(parents=True, exist_ok=True)
+    out_path = wh / "team_stats.parquet"
 
-    legacy = vendors / "nba_games.csv"
-    modern = vendors / "nba_games_modern.csv"
-
-    dfs = []
-
-    # --- Load legacy data (2005–2020) ---
-    if legacy.exists():
-        print(f"[nba_stats] Loading legacy file: {legacy.name}")
-        try:
-            df_old = pl.read_csv(
-                legacy,
-                infer_schema_length=20000,
-                ignore_errors=True
-            ).select([
-                pl.col("GAME_DATE_EST").alias("date"),
-                pl.col("SEASON").alias("season"),
-                pl.col("TEAM_ID_home").alias("home_team_id"),
-                pl.col("TEAM_ID_away").alias("away_team_id"),
-                pl.col("PTS_home").cast(pl.Float64),
-                pl.col("PTS_away").cast(pl.Float64),
-                pl.col("FG_PCT_home").cast(pl.Float64),
-                pl.col("FG_PCT_away").cast(pl.Float64),
-                pl.col("HOME_TEAM_WINS").cast(pl.Int8).alias("home_win")
-            ])
-            dfs.append(df_old)
-        except Exception as e:
-            print(f"[nba_stats] ⚠️ Error loading legacy file: {e}")
-
-    # --- Load modern data (2021–2025) ---
-    if modern.exists():
-        print(f"[nba_stats] Loading modern file: {modern.name}")
-        try:
-            df_new = pl.read_csv(
-                modern,
-                infer_schema_length=20000,
-                ignore_errors=True
-            )
-
-            # Map home/away teams per matchup
-            # Split by "vs." or "@" to infer home/away
-            df_home = df_new.filter(pl.col("MATCHUP").str.contains("vs.")).rename({
-                "TEAM_ID": "home_team_id",
-                "PTS": "PTS_home",
-                "FG_PCT": "FG_PCT_home",
-                "team_win": "home_win"
-            })
-            df_away = df_new.filter(pl.col("MATCHUP").str.contains("@")).rename({
-                "TEAM_ID": "away_team_id",
-                "PTS": "PTS_away",
-                "FG_PCT": "FG_PCT_away"
-            })
-
-            # Join home + away by GAME_ID
-            df_joined = df_home.join(
-                df_away,
-                on="GAME_ID",
-                how="inner",
-                suffix="_away"
-            ).select([
-                pl.col("GAME_DATE").alias("date"),
-                (pl.col("SEASON_ID").cast(pl.Utf8)).alias("season"),
-                "home_team_id",
-                "away_team_id",
-                "PTS_home",
-                "PTS_away",
-                "FG_PCT_home",
-                "FG_PCT_away",
-                "home_win"
-            ])
-            dfs.append(df_joined)
-        except Exception as e:
-            print(f"[nba_stats] ⚠️ Error loading modern file: {e}")
-
-    if not dfs:
+    sources = [vendors / name for name in SOURCES if (vendors / name).exists()]
+    if not sources and not out_path.exists():
         print("[nba_stats] ❌ No NBA data found. Exiting.")
         sys.exit(1)
 
-    df = pl.concat(dfs, how="vertical_relaxed")
+    # Only sources that are new or changed since the last run get parsed;
+    # their games replace any existing rows with the same game_id.
+    manifest = SourceManifest(wh, "nba_stats")
+    if args.full:
+        manifest.reset()
+        out_path.unlink(missing_ok=True)
+    todo = manifest.changed(sources)
+    if not todo:
+        manifest.save()
+        print("[nba_stats] no new or changed source files; team_stats.parquet is current")
+        return
 
-    # --- Derived features ---
-    df = df.with_columns([
-        (pl.col("PTS_home") - pl.col("PTS_away")).alias("margin"),
-        (pl.col("FG_PCT_home") - pl.col("FG_PCT_away")).alias("fg_diff")
-    ])
+    print(f"[nba_stats] Scanning {[p.name for p in todo]}")
+    df = build_plan(todo, (args.min_season, args.max_season)).collect(engine="streaming")
 
-    out_path = wh / "team_stats.parquet"
-    out_path.unlink(missing_ok=True)
-    df.write_parquet(out_path)
-    print(f"[nba_stats] ✅ wrote {out_path} rows={df.height}")
+    # Registry team IDs, Date, Float32 box scores (lib.common.schema)
+    merged = upsert_parquet(out_path, df, key=["game_id"], schema=TEAM_STATS)
+    if args.min_season is None and args.max_season is None:
+        # A season-bounded run only ingested part of each file
+        manifest.mark(todo)
+    manifest.save()
+    print(f"[nba_stats] ✅ merged {df.height} rows → {out_path} rows={merged.height}")
     print("[nba_stats] 🏁 Done.")
 
 
@@ -2,14 +2,15 @@ from __future__ import annotations
 import pathlib
 import polars as pl
 import numpy as np
+from lib.common.schema import TICKS, conform
 from lib.common.settings import load_settings
+from lib.ingest.tick_store import append_ticks, compact_in_background, store_root
 
 def main():
     s = load_settings()
     league = "NBA"
     wh = pathlib.Path(s.paths["warehouse"]) / league
     stats_path = wh / "team_stats.parquet"
-    out_path = wh / "ticks.parquet"
 
     if not stats_path.exists():
         raise FileNotFoundError(f"{stats_path} not found. Run nba_stats.py first.")
@@ -21,7 +22,7 @@ def main():
     # Parse the date column safely
     if df["date"].dtype != pl.Datetime:
         df = df.with_columns([
-            pl.col("date").cast(pl.Utf8).str.strptime(pl.Datetime, "%Y-%m-%d", strict=False)
+            pl.col("date").cast(pl.Utf8).str.slice(0, 10).str.strptime(pl.Datetime, "%Y-%m-%d", strict=False)
         ])
 
     # Simulate implied home win probability using historical margin
@@ -29,10 +30,11 @@ def main():
         (1 / (1 + np.exp(-pl.col("margin") / 10))).alias("p_home")
     ])
 
-    # Add synthetic odds records for both HOME and AWAY
+    # Add synthetic odds records for both HOME and AWAY, one game_id per stats game
+    # (not per season, which lumped a whole season's games into one)
     ticks_home = df.select([
         pl.col("date").alias("ts_utc"),
-        pl.col("season").cast(pl.Utf8).alias("game_id"),
+        pl.col("game_id").cast(pl.Utf8),
         pl.lit("pinnacle").alias("book"),
         pl.lit("moneyline").alias("market"),
         pl.lit("HOME").alias("runner"),
@@ -43,7 +45,7 @@ def main():
 
     ticks_away = df.select([
         pl.col("date").alias("ts_utc"),
-        pl.col("season").cast(pl.Utf8).alias("game_id"),
+        pl.col("game_id").cast(pl.Utf8),
         pl.lit("pinnacle").alias("book"),
         pl.lit("moneyline").alias("market"),
         pl.lit("AWAY").alias("runner"),
@@ -53,13 +55,16 @@ def main():
     ])
 
     ticks = pl.concat([ticks_home, ticks_away], how="vertical_relaxed")
-    ticks = ticks.sort(["game_id", "ts_utc", "runner"])
+    ticks = conform(ticks.sort(["game_id", "ts_utc", "runner"]), TICKS)
 
-    # Save output
-    out_path.unlink(missing_ok=True)
-    ticks.write_parquet(out_path)
+    # Into the partitioned tick store like vendor odds (scan_ticks ignores the legacy
+    # ticks.parquet once any partition exists); a rerun's identical ticks are
+    # deduplicated by compaction
+    written = append_ticks(ticks, s.paths["warehouse"], league)
+    compact_in_background(s.paths["warehouse"], league)
 
-    print(f"[nba_ticks_from_stats] ✅ wrote synthetic ticks → {out_path} rows={ticks.height}")
+    print(f"[nba_ticks_from_stats] ✅ appended synthetic ticks rows={ticks.height} to {len(written)} partitions "
+          f"under {store_root(s.paths['warehouse'])}")
     print(ticks.head(10))
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+from __future__ import annotations
+import io
+import polars as pl, pyarrow as pa, pyarrow.compute as pc
+from lib.utils.team_registry import canonical_names, team_ids
+
+# Odds API /v4/sports/{sport}/odds payload, decoded straight into Arrow
+# columns by Polars' native JSON reader (no Python dict per event/outcome)
+# and flattened level by level on the Arrow list offsets.
+OUTCOME = pl.Struct({"name": pl.Utf8, "price": pl.Float64, "point": pl.Float64})
+MARKET = pl.Struct({"key": pl.Utf8, "last_update": pl.Utf8, "outcomes": pl.List(OUTCOME)})
+BOOKMAKER = pl.Struct({"key": pl.Utf8, "last_update": pl.Utf8, "markets": pl.List(MARKET)})
+EVENT_SCHEMA = {
+    "id": pl.Utf8,
+    "sport_key": pl.Utf8,
+    "commence_time": pl.Utf8,
+    "home_team": pl.Utf8,
+    "away_team": pl.Utf8,
+    "bookmakers": pl.List(BOOKMAKER),
+}
+LONG_SCHEMA = {
+    "event_id": pl.Utf8,
+    "sport_key": pl.Utf8,
+    "commence_time": pl.Datetime("us", "UTC"),
+    "home_team": pl.Utf8,
+    "away_team": pl.Utf8,
+    "home_team_id": pl.UInt16,
+    "away_team_id": pl.UInt16,
+    "book": pl.Utf8,
+    "market": pl.Utf8,
+    "last_update": pl.Datetime("us", "UTC"),
+    "outcome": pl.Utf8,
+    "runner": pl.Utf8,
+    "price": pl.Float64,
+    "point": pl.Float64,
+}
+WIDE_SCHEMA = {
+    "home_team": pl.Utf8, "away_team": pl.Utf8,
+    "home_team_id": pl.UInt16, "away_team_id": pl.UInt16, "book": pl.Utf8,
+    "home_odds": pl.Float64, "away_odds": pl.Float64,
+}
+
+
+def _flatten(lists: pa.Array) -> tuple[pa.Array, pl.Series]:
+    # Zero-copy view of a list column's children plus each child's parent row
+    return pc.list_flatten(lists), pl.Series(pc.list_parent_indices(lists)).cast(pl.UInt32)
+
+
+def parse_events(payload: bytes) -> pl.DataFrame:
+    """One row per (event, bookmaker, market, outcome), every book and market kept.
+
+    `runner` is HOME/AWAY when the outcome names a team (after alias
+    normalization), DRAW for a draw, otherwise the raw outcome name
+    (e.g. Over/Under on totals).
+    """
+    events = pl.read_json(io.BytesIO(payload), schema=EVENT_SCHEMA)
+    if events.is_empty():
+        return pl.DataFrame(schema=LONG_SCHEMA)
+
+    # Walk the nested lists on the Arrow buffers: flattening is an offset
+    # slice, so only the leaf columns we keep are ever copied.
+    bookmakers = events.get_column("bookmakers").to_arrow()
+    if isinstance(bookmakers, pa.ChunkedArray):
+        bookmakers = bookmakers.combine_chunks()
+    books, event_of_book = _flatten(bookmakers)
+    markets, book_of_market = _flatten(pc.struct_field(books, "markets"))
+    outcomes, market_of_outcome = _flatten(pc.struct_field(markets, "outcomes"))
+    book_of_outcome = book_of_market.gather(market_of_outcome)
+
+    # Team spellings resolve through the registry once per distinct name
+    evt = events.select(
+        pl.col("id").alias("event_id"), "sport_key",
+        pl.col("commence_time").str.to_datetime(time_zone="UTC", strict=False),
+        canonical_names(events["home_team"]), canonical_names(events["away_team"]),
+        team_ids(events["home_team"]).alias("home_team_id"),
+        team_ids(events["away_team"]).alias("away_team_id"),
+    )
+    mkt = pl.DataFrame({
+        "market": pl.Series(pc.struct_field(markets, "key")),
+        "last_update": pl.Series(pc.struct_field(markets, "last_update")),
+    }).with_columns(pl.col("last_update").str.to_datetime(time_zone="UTC", strict=False))
+
+    df = pl.concat([
+        evt[event_of_book.gather(book_of_outcome)],
+        pl.DataFrame({"book": pl.Series(pc.struct_field(books, "key")).gather(book_of_outcome)}),
+        mkt[market_of_outcome],
+        pl.DataFrame({
+            "outcome": pl.Series(pc.struct_field(outcomes, "name")),
+            "price": pl.Series(pc.struct_field(outcomes, "price")),
+            "point": pl.Series(pc.struct_field(outcomes, "point")),
+        }),
+    ], how="horizontal").filter(pl.col("price").is_not_null())
+
+    return df.with_columns(canonical_names(df["outcome"])).with_columns(
+        pl.when(pl.col("outcome") == pl.col("home_team")).then(pl.lit("HOME"))
+        .when(pl.col("outcome") == pl.col("away_team")).then(pl.lit("AWAY"))
+        .when(pl.col("outcome") == "Draw").then(pl.lit("DRAW"))
+        .otherwise(pl.col("outcome"))
+        .alias("runner")
+    ).select(list(LONG_SCHEMA))
+
+
+def moneyline_wide(long: pl.DataFrame, books: list[str] | None = None) -> pl.DataFrame:
+    """Long h2h rows → one HOME/AWAY row per (event, book), the live_odds.parquet shape."""
+    df = long.filter(pl.col("market") == "h2h")
+    if books:
+        df = df.filter(pl.col("book").is_in(books))
+    return (
+        df.group_by(["event_id", "home_team", "away_team", "home_team_id", "away_team_id", "book"],
+                    maintain_order=True)
+        .agg(
+            pl.col("price").filter(pl.col("runner") == "HOME").first().alias("home_odds"),
+            pl.col("price").filter(pl.col("runner") == "AWAY").first().alias("away_odds"),
+        )
+        .drop_nulls(["home_odds", "away_odds"])
+        .select(list(WIDE_SCHEMA))
+        .cast(WIDE_SCHEMA)
+    )
+
+
+def odds_frame(payload: bytes, books: list[str] | None = None) -> pl.DataFrame:
+    return moneyline_wide(parse_events(payload), books)
@@ -0,0 +1,220 @@
+from __future__ import annotations
+import argparse, asyncio, os, pathlib, random, time
+from dataclasses import dataclass, field
+import httpx, polars as pl
+from lib.common.schema import LIVE_MARKETS, LIVE_ODDS, conform
+from lib.common.settings import Settings, load_settings
+from lib.ingest.odds_parser import moneyline_wide, odds_frame, parse_events
+
+# League → Odds API sport key, config market name → Odds API market key
+SPORT_KEYS = {
+    "NBA": "basketball_nba",
+    "NFL": "americanfootball_nfl",
+    "MLB": "baseball_mlb",
+    "NHL": "icehockey_nhl",
+}
+MARKET_KEYS = {"moneyline": "h2h", "spread": "spreads", "total": "totals"}
+DEFAULT_BASE_URL = "https://api.the-odds-api.com"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class PollerConfig:
+    leagues: list[str]
+    books: list[str]
+    markets: list[str]
+    api_key: str | None = None
+    base_url: str = DEFAULT_BASE_URL
+    regions: str = "us"
+    timeout_s: float = 10.0
+    connect_timeout_s: float = 3.0
+    timeouts: dict[str, float] = field(default_factory=dict)
+    max_retries: int = 3
+    backoff_base_s: float = 0.25
+    backoff_max_s: float = 4.0
+    rate_per_s: float = 5.0
+    burst: int = 5
+    max_connections: int = 20
+
+    @classmethod
+    def from_settings(cls, s: Settings | None = None, **overrides) -> "PollerConfig":
+        s = s or load_settings()
+        p = dict(s.poller or {})
+        p.pop("interval_s", None)
+        if os.getenv("ODDS_API_BASE_URL"):
+            # e.g. a local lib.ingest.replay server
+            p["base_url"] = os.environ["ODDS_API_BASE_URL"]
+        cfg = dict(
+            leagues=[l for l in (s.leagues or []) if l in SPORT_KEYS],
+            books=list(s.books or []),
+            markets=list(s.markets or ["moneyline"]),
+            api_key=os.getenv("ODDS_API_KEY"),
+            **p,
+        )
+        cfg.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**cfg)
+
+    def timeout_for(self, league: str) -> httpx.Timeout:
+        read = float(self.timeouts.get(league, self.timeout_s))
+        return httpx.Timeout(read, connect=self.connect_timeout_s)
+
+
+class RateLimiter:
+    """Token bucket shared by every request the poller issues."""
+
+    def __init__(self, rate_per_s: float, burst: int):
+        self.rate = float(rate_per_s)
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+
+def endpoint_for(cfg: PollerConfig, league: str) -> tuple[str, dict]:
+    url = f"{cfg.base_url.rstrip('/')}/v4/sports/{SPORT_KEYS[league]}/odds"
+    params = {
+        "apiKey": cfg.api_key or "",
+        "markets": ",".join(MARKET_KEYS.get(m, m) for m in cfg.markets),
+        "oddsFormat": "decimal",
+    }
+    # bookmakers= takes precedence over regions= on the Odds API
+    if cfg.books:
+        params["bookmakers"] = ",".join(cfg.books)
+    else:
+        params["regions"] = cfg.regions
+    return url, params
+
+
+async def fetch_league(client: httpx.AsyncClient, limiter: RateLimiter,
+                       cfg: PollerConfig, league: str) -> bytes:
+    url, params = endpoint_for(cfg, league)
+    for attempt in range(cfg.max_retries + 1):
+        await limiter.acquire()
+        try:
+            resp = await client.get(url, params=params, timeout=cfg.timeout_for(league))
+            if resp.status_code not in RETRY_STATUS:
+                resp.raise_for_status()
+                return resp.content
+            err: Exception = httpx.HTTPStatusError(
+                f"HTTP {resp.status_code}", request=resp.request, response=resp
+            )
+        except httpx.TransportError as e:
+            err = e
+        if attempt == cfg.max_retries:
+            raise err
+        # Full jitter: sleep U(0, min(cap, base * 2^attempt))
+        await asyncio.sleep(random.uniform(0, min(cfg.backoff_max_s, cfg.backoff_base_s * 2 ** attempt)))
+    raise RuntimeError("unreachable")
+
+
+def make_client(cfg: PollerConfig) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=cfg.max_connections,
+        max_keepalive_connections=cfg.max_connections,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(cfg.timeout_s, connect=cfg.connect_timeout_s))
+
+
+async def poll_once(cfg: PollerConfig, client: httpx.AsyncClient | None = None,
+                    limiter: RateLimiter | None = None) -> dict[str, bytes | Exception]:
+    """Fetch every configured league concurrently; failures are returned, not raised."""
+    limiter = limiter or RateLimiter(cfg.rate_per_s, cfg.burst)
+    own_client = client is None
+    client = client or make_client(cfg)
+    try:
+        payloads = await asyncio.gather(
+            *(fetch_league(client, limiter, cfg, lg) for lg in cfg.leagues),
+            return_exceptions=True,
+        )
+    finally:
+        if own_client:
+            await client.aclose()
+    return dict(zip(cfg.leagues, payloads))
+
+
+async def poll_forever(cfg: PollerConfig, interval_s: float, on_snapshot) -> None:
+    """Poll on a fixed cadence over one keep-alive session; `on_snapshot(league, payload)`."""
+    limiter = RateLimiter(cfg.rate_per_s, cfg.burst)
+    async with make_client(cfg) as client:
+        while True:
+            t0 = time.monotonic()
+            snap = await poll_once(cfg, client=client, limiter=limiter)
+            for league, payload in snap.items():
+                on_snapshot(league, payload)
+            await asyncio.sleep(max(0.0, interval_s - (time.monotonic() - t0)))
+
+
+def poll(cfg: PollerConfig | None = None) -> dict[str, pl.DataFrame]:
+    """Blocking helper: one concurrent refresh of every league, parsed to frames."""
+    cfg = cfg or PollerConfig.from_settings()
+    out = {}
+    for league, payload in asyncio.run(poll_once(cfg)).items():
+        if isinstance(payload, Exception):
+            print(f"[odds_poller] ⚠️ {league} failed: {payload!r}")
+            continue
+        out[league] = odds_frame(payload, cfg.books)
+    return out
+
+
+def write_snapshot(wh_root: str | pathlib.Path, league: str, df: pl.DataFrame,
+                   name: str = "live_odds.parquet", schema: dict = LIVE_ODDS) -> pathlib.Path:
+    out_dir = pathlib.Path(wh_root) / league
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_path = out_dir / name
+    conform(df, schema).write_parquet(out_path)
+    return out_path
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--leagues", default=None, help="Comma list; defaults to config leagues")
+    ap.add_argument("--books", default=None, help="Comma list; defaults to config books")
+    ap.add_argument("--base_url", default=None)
+    ap.add_argument("--interval", type=float, default=None, help="Seconds between polls (0 = once)")
+    args = ap.parse_args()
+    s = load_settings()
+
+    cfg = PollerConfig.from_settings(
+        s,
+        leagues=args.leagues.split(",") if args.leagues else None,
+        books=args.books.split(",") if args.books else None,
+        base_url=args.base_url,
+    )
+    if not cfg.api_key and cfg.base_url == DEFAULT_BASE_URL:
+        raise EnvironmentError("❌ Missing ODDS_API_KEY. Run: export ODDS_API_KEY='your_api_key_here'")
+    interval = args.interval if args.interval is not None else float((s.poller or {}).get("interval_s", 0))
+
+    def on_snapshot(league, payload):
+        if isinstance(payload, Exception):
+            print(f"[odds_poller] ⚠️ {league} failed: {payload!r}")
+            return
+        # Every book/market/outcome in long form, plus the wide moneyline view
+        long = parse_events(payload)
+        write_snapshot(s.paths["warehouse"], league, long, "live_markets.parquet", LIVE_MARKETS)
+        df = moneyline_wide(long, cfg.books)
+        out = write_snapshot(s.paths["warehouse"], league, df)
+        print(f"[odds_poller] {league}: {long.height} outcomes, {df.height} moneyline rows → {out}")
+
+    if interval <= 0:
+        t0 = time.perf_counter()
+        for league, payload in asyncio.run(poll_once(cfg)).items():
+            on_snapshot(league, payload)
+        print(f"[odds_poller] refreshed {len(cfg.leagues)} leagues in {time.perf_counter() - t0:.2f}s")
+    else:
+        print(f"[odds_poller] 🔄 polling {cfg.leagues} every {interval:.0f}s")
+        asyncio.run(poll_forever(cfg, interval, on_snapshot))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+from __future__ import annotations
+import argparse, asyncio, json, pathlib, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np, polars as pl
+from lib.common.settings import load_settings
+from lib.ingest.odds_poller import SPORT_KEYS
+from lib.ingest.tick_store import scan_ticks
+from lib.utils.team_registry import NBA, TEAM_NAMES
+
+# Replays recorded ticks in timestamp order, either as an async iterator
+# (in-process consumers) or behind a local HTTP server that answers like the
+# Odds API /v4/sports/{sport}/odds endpoint, so the poller, live_odds and
+# demo_bets can be load-tested without network access:
+#
+#   python -m lib.ingest.replay --source data/raw/toy_ticks.parquet --speed 10
+#   ODDS_API_KEY=x ODDS_API_BASE_URL=http://127.0.0.1:8765 python -m lib.ingest.live_odds
+TICK_COLS = ["ts_utc", "game_id", "book", "runner", "price_decimal"]
+
+
+def load_ticks(source: str | pathlib.Path | None = None, league: str = "NBA") -> pl.DataFrame:
+    """Warehouse ticks (store or a ticks.parquet) or make_toy_raw output, as TICK_COLS sorted by time."""
+    if source is None:
+        lf = scan_ticks(load_settings().paths["warehouse"], league)
+    else:
+        source = pathlib.Path(source)
+        lf = (pl.scan_parquet(source / "**" / "*.parquet", hive_partitioning=True)
+              if source.is_dir() else pl.scan_parquet(source))
+    cols = lf.collect_schema().names()
+    if "ts_utc" not in cols:
+        # make_toy_raw layout: ts/odds, book only on multi-book runs
+        lf = lf.rename({"ts": "ts_utc", "odds": "price_decimal"})
+    if "book" not in cols:
+        lf = lf.with_columns(pl.lit("toy").alias("book"))
+    return (
+        lf.filter(pl.col("runner").is_in(["HOME", "AWAY"]))
+        .select([
+            pl.col("ts_utc").dt.replace_time_zone(None).dt.replace_time_zone("UTC"),
+            pl.col("game_id").cast(pl.Utf8), pl.col("book").cast(pl.Utf8),
+            pl.col("runner").cast(pl.Utf8), pl.col("price_decimal").cast(pl.Float64),
+        ])
+        .sort("ts_utc", maintain_order=True)
+        .collect()
+    )
+
+
+def assign_teams(game_ids: list[str], schedule: pl.DataFrame | None = None) -> dict[str, tuple[str, str]]:
+    """game_id → (home, away) canonical names: from the schedule's team IDs, else a fixed rotation."""
+    teams: dict[str, tuple[str, str]] = {}
+    if schedule is not None and {"home_team_id", "away_team_id"} <= set(schedule.columns):
+        for g, h, a in schedule.select("game_id", "home_team_id", "away_team_id").drop_nulls().iter_rows():
+            teams[str(g)] = (TEAM_NAMES[h], TEAM_NAMES[a])
+    names = [t[0] for t in NBA]
+    for k, g in enumerate(g for g in game_ids if g not in teams):
+        teams[g] = (names[(2 * k) % len(names)], names[(2 * k + 1) % len(names)])
+    return teams
+
+
+class TickReplay:
+    """Latest price per (game, book) as of the replay clock, updated batch by batch.
+
+    Every tick sharing a timestamp is one batch. Batch boundaries, (game, book)
+    slots and HOME/AWAY masks are computed once up front, so advancing the
+    clock is a couple of fancy-indexed array writes.
+    """
+
+    def __init__(self, ticks: pl.DataFrame, teams: dict[str, tuple[str, str]] | None = None):
+        self.ticks = ticks
+        ts = ticks["ts_utc"].dt.epoch("us").to_numpy()
+        self._bounds = np.r_[0, np.flatnonzero(np.diff(ts)) + 1, len(ts)]
+        self._ts = ts
+
+        pairs = ticks.select("game_id", "book")
+        self.slots = pairs.unique(maintain_order=True)
+        slot = pairs.join(self.slots.with_row_index("slot"), on=["game_id", "book"], how="left")["slot"]
+        self._slot = slot.to_numpy()
+        self._home = (ticks["runner"] == "HOME").to_numpy()
+        self._price = ticks["price_decimal"].to_numpy()
+
+        games = self.slots["game_id"].unique(maintain_order=True).to_list()
+        self.teams = teams or assign_teams(games)
+        first = ticks.group_by("game_id").agg(pl.col("ts_utc").min())
+        self.commence = dict(zip(first["game_id"], first["ts_utc"].dt.strftime("%Y-%m-%dT%H:%M:%SZ")))
+
+        self._lock = threading.Lock()
+        self._version = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Rewind to before the first tick (nothing quoted)."""
+        n = self.slots.height
+        with self._lock:
+            self.home_price = np.full(n, np.nan)
+            self.away_price = np.full(n, np.nan)
+            self.updated_us = np.zeros(n, dtype=np.int64)
+            self.emitted = 0
+            self.clock_us = 0
+            self.done = False
+            self._version += 1
+            self._cache: dict[tuple, bytes] = {}
+
+    @property
+    def n_batches(self) -> int:
+        return len(self._bounds) - 1
+
+    def _apply(self, i: int, j: int) -> None:
+        slot, home, price = self._slot[i:j], self._home[i:j], self._price[i:j]
+        with self._lock:
+            self.home_price[slot[home]] = price[home]
+            self.away_price[slot[~home]] = price[~home]
+            self.updated_us[slot] = self._ts[i]
+            self.emitted = j
+            self.clock_us = int(self._ts[i])
+            self._version += 1
+
+    async def stream(self, speed: float = 1.0):
+        """Yield each timestamp's batch of ticks; `speed` ≤ 0 replays as fast as possible."""
+        fast = speed <= 0 or not np.isfinite(speed)
+        t0_wall, t0_data = time.perf_counter(), self._ts[0] if len(self._ts) else 0
+        for b in range(self.n_batches):
+            i, j = int(self._bounds[b]), int(self._bounds[b + 1])
+            if fast:
+                await asyncio.sleep(0)
+            else:
+                # Schedule against the first tick, so sleep overshoot never accumulates
+                due = t0_wall + (self._ts[i] - t0_data) / 1e6 / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self._apply(i, j)
+            yield self.ticks.slice(i, j - i)
+        self.done = True
+
+    async def run(self, speed: float = 1.0) -> None:
+        async for _ in self.stream(speed):
+            pass
+
+    def payload(self, sport_key: str, books: list[str] | None = None) -> bytes:
+        """Odds API-shaped JSON for every (game, book) quoted so far; cached until the clock moves."""
+        with self._lock:
+            key = (self._version, sport_key, tuple(books or ()))
+            if key in self._cache:
+                return self._cache[key]
+            home, away, upd = self.home_price.copy(), self.away_price.copy(), self.updated_us.copy()
+        quoted = ~(np.isnan(home) | np.isnan(away))
+        if books:
+            quoted &= self.slots["book"].is_in(books).to_numpy()
+        events: dict[str, dict] = {}
+        stamps = pl.Series(upd[quoted]).cast(pl.Datetime("us")).dt.strftime("%Y-%m-%dT%H:%M:%SZ").to_list()
+        idx = np.flatnonzero(quoted)
+        for k, s, stamp in zip(idx, self.slots[idx].iter_rows(), stamps):
+            game, book = s
+            h, a = self.teams[game]
+            evt = events.setdefault(game, {
+                "id": game, "sport_key": sport_key, "commence_time": self.commence[game],
+                "home_team": h, "away_team": a, "bookmakers": [],
+            })
+            evt["bookmakers"].append({
+                "key": book, "title": book.title(), "last_update": stamp,
+                "markets": [{"key": "h2h", "last_update": stamp, "outcomes": [
+                    {"name": h, "price": float(home[k])}, {"name": a, "price": float(away[k])},
+                ]}],
+            })
+        body = json.dumps(list(events.values())).encode()
+        with self._lock:
+            self._cache = {key: body}
+        return body
+
+    def status(self) -> dict:
+        return {"emitted": self.emitted, "total": self.ticks.height, "done": self.done,
+                "clock_us": self.clock_us, "slots": self.slots.height}
+
+
+def serve(replay: TickReplay, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the Odds API stand-in on a daemon thread; port 0 picks a free one."""
+    sports = {v: k for k, v in SPORT_KEYS.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            if url.path == "/replay/status":
+                body, status = json.dumps(replay.status()).encode(), 200
+            elif len(parts) == 4 and parts[:2] == ["v4", "sports"] and parts[3] == "odds" and parts[2] in sports:
+                q = parse_qs(url.query)
+                books = q["bookmakers"][0].split(",") if "bookmakers" in q else None
+                body, status = replay.payload(parts[2], books), 200
+            else:
+                body, status = b'{"message": "unknown endpoint"}', 404
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer((host, port), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, name="replay-http", daemon=True).start()
+    return srv
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--league", default="NBA")
+    ap.add_argument("--source", default=None, help="ticks parquet file/dir; defaults to the league's tick store")
+    ap.add_argument("--speed", type=float, default=1.0, help="Replay speed-up (0 = as fast as possible)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--loop", action="store_true", help="Start over when the ticks run out")
+    args = ap.parse_args()
+    s = load_settings()
+
+    ticks = load_ticks(args.source, args.league)
+    sched_path = pathlib.Path(s.paths["warehouse"]) / args.league / "schedule.parquet"
+    schedule = pl.read_parquet(sched_path) if sched_path.exists() else None
+    teams = assign_teams(ticks["game_id"].unique(maintain_order=True).to_list(), schedule)
+
+    replay = TickReplay(ticks, teams)
+    srv = serve(replay, args.host, args.port)
+    print(f"[replay] {ticks.height:,} ticks, {replay.n_batches:,} timestamps, {replay.slots.height} game×book "
+          f"slots at {args.speed:g}x → http://{args.host}:{srv.server_port}/v4/sports/{SPORT_KEYS[args.league]}/odds")
+    try:
+        while True:
+            t0 = time.perf_counter()
+            asyncio.run(replay.run(args.speed))
+            print(f"[replay] ✅ replayed in {time.perf_counter() - t0:.2f}s")
+            if not args.loop:
+                break
+            replay.reset()
+        input("[replay] serving the final snapshot; press Enter to stop\n")
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
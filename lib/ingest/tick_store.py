@@ -0,0 +1,235 @@
+from __future__ import annotations
+import argparse, bisect, contextlib, datetime as dt, fcntl, hashlib, pathlib, threading, time, uuid
+import polars as pl
+from lib.common.schema import TICKS, conform, conforms
+from lib.common.settings import load_settings
+
+# Hive layout: <warehouse>/ticks/league=NBA/date=2025-10-04/game_id=G001/part-*.parquet
+# New ticks only ever add part files; compaction rewrites one partition at a time.
+#
+# Concurrency: appends write dot-prefixed temp files (invisible to the
+# part-*.parquet globs) and publish them with replace() while holding the
+# league's lock, and compaction takes its listing under the same lock, so any
+# part it did not list is newer than every part it did. The merged file is
+# named after the newest merged part; parts at or below it are superseded and
+# hidden from scans at once, but only deleted GRACE_S after the merge, so a
+# scan that listed them just before still finds its files.
+PARTITION_SCHEMA = {"league": pl.Utf8, "date": pl.Date, "game_id": pl.Utf8}
+TICK_KEY = ["ts_utc", "game_id", "book", "runner"]
+SORT_KEY = ["ts_utc", "book", "runner"]
+COMPACTED = "compacted"
+GRACE_S = 300.0
+
+
+def store_root(wh_root: str | pathlib.Path) -> pathlib.Path:
+    return pathlib.Path(wh_root) / "ticks"
+
+
+def _part_name(ns: int | None = None, tag: str | None = None) -> str:
+    # Names sort in append order, so "keep last" dedup sees the newest tick last.
+    return f"part-{ns or time.time_ns():020d}-{tag or uuid.uuid4().hex[:8]}.parquet"
+
+
+def _part_ns(path: pathlib.Path) -> int:
+    return int(path.name.split("-")[1])
+
+
+def _is_compacted(path: pathlib.Path) -> bool:
+    return path.stem.endswith(f"-{COMPACTED}")
+
+
+@contextlib.contextmanager
+def _league_lock(root: pathlib.Path):
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def live_parts(part_dir: pathlib.Path) -> list[pathlib.Path]:
+    """The partition's readable part files: the newest merged file and the parts appended after it."""
+    parts = sorted(part_dir.glob("part-*.parquet"))
+    merged = [p for p in parts if _is_compacted(p)]
+    if not merged:
+        return parts
+    return [p for p in parts if _part_ns(p) > _part_ns(merged[-1]) or p == merged[-1]]
+
+
+def append_ticks(df: pl.DataFrame, wh_root: str | pathlib.Path, league: str) -> list[pathlib.Path]:
+    """Write `df` as one new part file per (date, game_id) partition it touches."""
+    if df.is_empty():
+        return []
+    df = conform(df, TICKS).with_columns(pl.col("ts_utc").dt.date().alias("date"), pl.col("game_id").cast(pl.Utf8))
+    root = store_root(wh_root) / f"league={league}"
+    staged = []
+    for (date, game_id), part in df.partition_by(["date", "game_id"], as_dict=True).items():
+        part_dir = root / f"date={date.isoformat()}" / f"game_id={game_id}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        tmp = part_dir / f".part-{uuid.uuid4().hex[:8]}.tmp"
+        part.drop(["date", "game_id"]).write_parquet(tmp)
+        staged.append(tmp)
+    # Named under the lock, so a compaction never misses a part older than its newest merged one
+    with _league_lock(root):
+        ns = time.time_ns()
+        written = [tmp.replace(tmp.parent / _part_name(ns)) for tmp in staged]
+    return written
+
+
+def partitions(wh_root: str | pathlib.Path, league: str) -> list[pathlib.Path]:
+    root = store_root(wh_root) / f"league={league}"
+    return sorted(p for p in root.glob("date=*/game_id=*") if p.is_dir())
+
+
+def store_parts(wh_root: str | pathlib.Path, league: str) -> list[pathlib.Path]:
+    """Every live part file of the league, in partition then append order."""
+    return [f for p in partitions(wh_root, league) for f in live_parts(p)]
+
+
+def compact_partition(part_dir: pathlib.Path, grace_s: float = GRACE_S) -> int:
+    """Merge a partition's live part files into one, deduped, sorted and
+    conformed to the tick schema, and delete parts superseded more than
+    `grace_s` ago. Returns files merged."""
+    _collect_superseded(part_dir, grace_s)
+    with _league_lock(part_dir.parent.parent):
+        parts = live_parts(part_dir)
+    if not parts or (len(parts) == 1 and conforms(pl.read_parquet_schema(parts[0]), TICKS)):
+        return 0
+    df = (
+        # parts written before the compact schema are cast on the way through
+        pl.concat([conform(pl.read_parquet(p), TICKS) for p in parts], how="diagonal_relaxed")
+        .unique(subset=[c for c in TICK_KEY if c != "game_id"], keep="last", maintain_order=True)
+        .sort(SORT_KEY)
+    )
+    # Publishing under the newest merged part's timestamp supersedes exactly
+    # the listed parts; parts appended since sort after it and stay live.
+    tmp = part_dir / f".compact-{uuid.uuid4().hex[:8]}.tmp"
+    df.write_parquet(tmp)
+    tmp.replace(part_dir / _part_name(_part_ns(parts[-1]), COMPACTED))
+    return len(parts)
+
+
+def _collect_superseded(part_dir: pathlib.Path, grace_s: float) -> None:
+    """Delete parts whose superseding merged file was published over `grace_s` ago."""
+    parts = sorted(part_dir.glob("part-*.parquet"))
+    merged = [p for p in parts if _is_compacted(p)]
+    if not merged:
+        return
+    merged_ns = [_part_ns(p) for p in merged]
+    published = {m: m.stat().st_mtime for m in merged}
+    cutoff = time.time() - grace_s
+    for p in parts:
+        if p == merged[-1] or _part_ns(p) > merged_ns[-1]:
+            continue
+        # the first merged file at or after p's timestamp is the one that replaced it
+        i = bisect.bisect_left(merged_ns, _part_ns(p))
+        if merged[i] == p:
+            i += 1
+        if published[merged[i]] < cutoff:
+            p.unlink(missing_ok=True)
+
+
+def compact(wh_root: str | pathlib.Path, league: str, grace_s: float = GRACE_S) -> int:
+    return sum(compact_partition(p, grace_s) for p in partitions(wh_root, league))
+
+
+def compact_in_background(wh_root: str | pathlib.Path, league: str) -> threading.Thread:
+    """Start a compaction pass without blocking the caller (the process waits for it on exit)."""
+    t = threading.Thread(target=compact, args=(wh_root, league), name=f"compact-{league}")
+    t.start()
+    return t
+
+
+def scan_ticks(
+    wh_root: str | pathlib.Path,
+    league: str,
+    dates: tuple[dt.date | None, dt.date | None] | None = None,
+    game_ids: list[str] | None = None,
+) -> pl.LazyFrame:
+    """Lazy scan of a league's ticks; date/game filters prune whole partitions.
+
+    Falls back to the legacy single-file <warehouse>/<LEAGUE>/ticks.parquet when
+    the store has no partitions for the league yet.
+    """
+    root = store_root(wh_root) / f"league={league}"
+    if parts := store_parts(wh_root, league):
+        # An explicit file list, so parts superseded by a compaction are never read twice
+        lf = pl.scan_parquet(parts, hive_partitioning=True, hive_schema=PARTITION_SCHEMA).drop("league")
+    else:
+        legacy = pathlib.Path(wh_root) / league / "ticks.parquet"
+        if not legacy.exists():
+            raise FileNotFoundError(f"no ticks for {league} under {root} or {legacy}")
+        lf = pl.scan_parquet(legacy).with_columns(pl.col("ts_utc").dt.date().alias("date"))
+
+    if dates is not None:
+        start, end = dates
+        if start is not None:
+            lf = lf.filter(pl.col("date") >= start)
+        if end is not None:
+            lf = lf.filter(pl.col("date") <= end)
+    if game_ids is not None:
+        lf = lf.filter(pl.col("game_id").cast(pl.Utf8).is_in(list(game_ids)))
+    return lf
+
+
+def game_fingerprints(
+    wh_root: str | pathlib.Path,
+    league: str,
+    dates: tuple[dt.date | None, dt.date | None] | None = None,
+) -> dict[str, str]:
+    """game_id → digest of the game's tick inputs, without reading any ticks.
+
+    In the store this hashes each game's part-file names, sizes and mtimes (new
+    ticks always add or rewrite a part file). The legacy single file has no
+    per-game files, so its rows are hashed per game instead. With `dates`, every
+    game with ticks in the range is fingerprinted over all of its ticks: the
+    partitions are UTC dates, so one game's quotes can straddle two of them.
+    """
+    start, end = dates or (None, None)
+    parts = store_parts(wh_root, league)
+    if not parts:
+        lf = scan_ticks(wh_root, league)
+        if dates is not None:
+            touched = scan_ticks(wh_root, league, dates=dates).select(pl.col("game_id").cast(pl.Utf8).unique())
+            lf = lf.filter(pl.col("game_id").cast(pl.Utf8).is_in(touched.collect()["game_id"].to_list()))
+        cols = [c for c in lf.collect_schema().names() if c != "date"]
+        fp = lf.group_by(pl.col("game_id").cast(pl.Utf8)).agg(
+            pl.len().alias("n"), pl.struct(cols).hash(7).sum().alias("h")
+        ).collect()
+        return {g: f"{n}:{h:x}" for g, n, h in fp.iter_rows()}
+
+    by_game: dict[str, list[pathlib.Path]] = {}
+    touched = set()
+    for p in parts:
+        day = dt.date.fromisoformat(p.parent.parent.name.split("=", 1)[1])
+        game_id = p.parent.name.split("=", 1)[1]
+        by_game.setdefault(game_id, []).append(p)
+        if not ((start and day < start) or (end and day > end)):
+            touched.add(game_id)
+    digests = {}
+    for game_id in sorted(touched):
+        h = hashlib.sha1()
+        for p in by_game[game_id]:
+            st = p.stat()
+            h.update(f"{p.parent.parent.name}/{p.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+        digests[game_id] = h.hexdigest()
+    return digests
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--league", default="NBA")
+    args = ap.parse_args()
+    s = load_settings()
+
+    t0 = time.perf_counter()
+    removed = compact(s.paths["warehouse"], args.league)
+    n = len(partitions(s.paths["warehouse"], args.league))
+    print(f"[tick_store] compacted {args.league}: {removed} part files merged across {n} partitions "
+          f"in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
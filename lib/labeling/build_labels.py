@@ -1,12 +1,118 @@
 from __future__ import annotations
-import argparse, pathlib, polars as pl
+import argparse, pathlib, time, polars as pl
+from typing import Sequence, TypeVar
 from lib.common.settings import load_settings
+from lib.featurization.build_features import feature_plan
+from lib.featurization.team_form import FORM_COLS
+from lib.ingest.tick_store import scan_ticks
+
+KEYS = ["game_id", "runner"]
+KEEP_COLS = [
+    "decision_offset_min", "decision_ts", "game_id", "runner",
+    "imp_prob_mean", "imp_prob_vigadj",
+    "vig_spread", "home_away_ratio", "mins_to_start", *FORM_COLS,
+    "y", "source"
+]
+Frame = TypeVar("Frame", pl.DataFrame, pl.LazyFrame)
+
+
+def decision_snapshots(feats: Frame, offset_min: float | Sequence[float]) -> Frame:
+    """One feature row per (game, runner[, offset]): the last quote at least `offset_min` before start.
+
+    "primary" rows come from a forward as-of join on mins_to_start (the smallest
+    mins_to_start >= offset). Keys with no quote that early fall back to their
+    earliest quote (largest mins_to_start), flagged "fallback". A sequence of
+    offsets is handled in the same single join (keys × offsets on the left) and
+    adds a decision_offset_min column. Works on a DataFrame or inside a lazy plan.
+    """
+    grid = not isinstance(offset_min, (int, float))
+    offsets = pl.DataFrame({"decision_offset_min": list(offset_min) if grid else [offset_min]})
+    lazy = isinstance(feats, pl.LazyFrame)
+    if lazy:
+        # A lazy plan's row order isn't stable across branches, so picks are joined
+        # back on (keys, quote time) rather than a row index, and `feats` is cached
+        offsets = offsets.lazy()
+        feats = feats.with_columns(pl.col("mins_to_start").cast(pl.Float64).alias("_row")).cache()
+    else:
+        feats = feats.with_row_index("_row")
+    quotes = feats.select([*KEYS, pl.col("mins_to_start").cast(pl.Float64), "_row"]).sort("mins_to_start")
+    keys = (
+        feats.select(KEYS).unique()
+        .join(offsets, how="cross")
+        .with_columns(pl.col("decision_offset_min").cast(pl.Float64).alias("mins_to_start"))
+    )
+
+    primary = keys.sort("mins_to_start").join_asof(
+        quotes, on="mins_to_start", by=KEYS, strategy="forward", check_sortedness=False,
+    )
+    fallback = quotes.group_by(KEYS).agg(pl.col("_row").sort_by("mins_to_start").last().alias("_fallback"))
+    picked = primary.join(fallback, on=KEYS, how="left").select([
+        *(KEYS if lazy else []), "decision_offset_min",
+        pl.coalesce("_row", "_fallback").alias("_row"),
+        pl.when(pl.col("_row").is_not_null()).then(pl.lit("primary")).otherwise(pl.lit("fallback")).alias("source"),
+    ])
+    out = feats.join(picked, on=[*KEYS, "_row"] if lazy else "_row", how="inner").drop("_row")
+    return out if grid else out.drop("decision_offset_min")
+
+
+def attach_labels(snaps: Frame, results: Frame) -> Frame:
+    """Decision snapshots → label rows: winner flag `y`, decision_ts, KEEP_COLS order."""
+    labels = snaps.join(
+        results.select(["game_id", "winner"]),
+        on="game_id",
+        how="left",
+    ).with_columns([
+        (pl.col("runner") == pl.col("winner")).cast(pl.Int8).alias("y"),
+        pl.col("ts_utc").alias("decision_ts")
+    ])
+    cols = labels.collect_schema().names()
+    labels = labels.select([c for c in KEEP_COLS if c in cols])
+    return labels.sort([c for c in ("decision_offset_min", "game_id", "runner") if c in cols])
+
+
+def snapshot_ticks(ticks: pl.LazyFrame, schedule: pl.LazyFrame) -> pl.LazyFrame:
+    """Pregame ticks with mins_to_start (and team IDs, when the vendor ticks lack them) from the schedule."""
+    sched = schedule.select([
+        pl.col("game_id").cast(pl.Utf8), "start_time_utc",
+        pl.col("home_team_id").alias("_home_team_id"), pl.col("away_team_id").alias("_away_team_id"),
+    ])
+    have = ticks.collect_schema().names()
+    return (
+        ticks.with_columns(pl.col("game_id").cast(pl.Utf8))
+        .join(sched, on="game_id", how="inner")
+        .with_columns([
+            pl.coalesce([*(["home_team_id"] if "home_team_id" in have else []), "_home_team_id"]).alias("home_team_id"),
+            pl.coalesce([*(["away_team_id"] if "away_team_id" in have else []), "_away_team_id"]).alias("away_team_id"),
+            ((pl.col("start_time_utc") - pl.col("ts_utc")).dt.total_seconds() / 60.0).alias("mins_to_start"),
+        ])
+        .filter(pl.col("mins_to_start") >= 0)
+        .drop(["_home_team_id", "_away_team_id"])
+    )
+
+
+def label_plan(ticks: pl.LazyFrame, schedule: pl.LazyFrame, stats: pl.LazyFrame, results: pl.LazyFrame,
+               offset_min: float | Sequence[float], form: pl.LazyFrame | None = None,
+               devig_method: str = "multiplicative") -> tuple[pl.LazyFrame, pl.LazyFrame]:
+    """ticks → implied probs → HOME/AWAY pivot → stats join → decision snapshot → labels, unexecuted.
+
+    Returns (per-snapshot features, labels); the labels plan contains the
+    features plan, so both can be sunk together with the shared part run once.
+    """
+    ticks = snapshot_ticks(ticks, schedule).join(results.select("game_id"), on="game_id", how="semi")
+    feats = feature_plan(ticks, stats, snapshot_cols=["ts_utc", "mins_to_start"], form=form, devig_method=devig_method)
+    return feats, attach_labels(decision_snapshots(feats, offset_min), results)
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--league", default="NBA")
     ap.add_argument("--decision_offset_min", type=int, default=None)
+    ap.add_argument("--decision_grid", default=None,
+                    help="Comma list of offsets (e.g. 5,15,30,60,120) → labels_grid.parquet in one pass")
+    ap.add_argument("--from_ticks", action="store_true",
+                    help="Build labels straight from the tick store as one streaming lazy plan (no features.parquet)")
+    ap.add_argument("--write_features", action="store_true",
+                    help="With --from_ticks, also sink the per-snapshot features to snapshot_features.parquet")
     args = ap.parse_args()
     s = load_settings()
 
@@ -16,6 +122,42 @@ def main():
     features_path = wh / "features.parquet"
     results_path = wh / "results.parquet"
 
+    if args.decision_grid:
+        offset_min = sorted({int(x) for x in args.decision_grid.split(",")})
+        print(f"[build_labels] using decision grid {offset_min} min")
+    else:
+        offset_min = args.decision_offset_min or s.decisions["pregame_offset_min"]
+        print(f"[build_labels] using decision offset {offset_min} min")
+
+    # The grid is long format: one block per decision offset
+    out_path = wh / ("labels_grid.parquet" if args.decision_grid else "labels.parquet")
+
+    if args.from_ticks:
+        inputs = [wh / "schedule.parquet", wh / "team_stats.parquet", results_path]
+        missing = [p.name for p in inputs if not p.exists()]
+        if missing:
+            raise FileNotFoundError(f"Missing {missing} for --from_ticks")
+        t0 = time.perf_counter()
+        form_path = wh / "team_form.parquet"
+        feats, labels = label_plan(scan_ticks(s.paths["warehouse"], args.league),
+                                   *(pl.scan_parquet(p) for p in inputs), offset_min,
+                                   form=pl.scan_parquet(form_path) if form_path.exists() else None,
+                                   devig_method=(s.features or {}).get("devig_method", "multiplicative"))
+        # Sunk to a temp file: the plan may still be reading the old labels' inputs
+        tmp = out_path.with_suffix(".tmp")
+        sinks = [labels.sink_parquet(tmp, lazy=True)]
+        if args.write_features:
+            sinks.append(feats.sink_parquet(wh / "snapshot_features.parquet", lazy=True))
+        pl.collect_all(sinks, engine="streaming")
+        rows = pl.scan_parquet(tmp).select(pl.len()).collect().item()
+        if rows == 0:
+            tmp.unlink()
+            raise RuntimeError("No decision snapshots found")
+        tmp.replace(out_path)
+        print(f"[build_labels] wrote {out_path} rows={rows} from ticks in {time.perf_counter() - t0:.2f}s"
+              + (f" (+ {wh / 'snapshot_features.parquet'})" if args.write_features else ""))
+        return
+
     if not features_path.exists() or not results_path.exists():
         raise FileNotFoundError("Missing features or results parquet files")
 
@@ -23,62 +165,15 @@ def main():
     feats = pl.read_parquet(features_path)
     results = pl.read_parquet(results_path)
 
-    offset_min = args.decision_offset_min or s.decisions["pregame_offset_min"]
-    print(f"[build_labels] using decision offset {offset_min} min")
-
-    # --- Join features with nearest snapshot before start_time_utc - offset ---
-    # Compute decision_ts for each game
-    games = (
-        results.select(["game_id"])
-        .join(feats.select(["game_id"]).unique(), on="game_id", how="inner")
-        .unique()
-    )
-
-    snapshots = []
-    for g in games["game_id"]:
-        f = feats.filter(pl.col("game_id") == g)
-        start_time = f["mins_to_start"].min()  # since mins_to_start decreases as we approach start
-        # decision point is start_time - offset, but we just find closest <= offset
-        f_target = (
-            f.filter(pl.col("mins_to_start") >= offset_min)
-            .sort("mins_to_start", descending=False)
-        )
-        if f_target.height == 0:
-            # fallback to last quote before start
-            f_target = f.sort("mins_to_start").tail(1)
-            source = "fallback"
-        else:
-            f_target = f_target.head(1)
-            source = "primary"
-
-        f_target = f_target.with_columns(pl.lit(source).alias("source"))
-        snapshots.append(f_target)
-
-    if not snapshots:
+    # --- Decision snapshot per (game, runner), only for games with a result ---
+    feats = feats.join(results.select("game_id").unique(), on="game_id", how="semi")
+    labels = decision_snapshots(feats, offset_min)
+    if labels.height == 0:
         raise RuntimeError("No decision snapshots found")
-    labels = pl.concat(snapshots, how="vertical_relaxed")
 
-    # --- Attach winner label ---
-    labels = labels.join(
-        results.select(["game_id", "winner"]),
-        on="game_id",
-        how="left",
-    ).with_columns([
-        (pl.col("runner") == pl.col("winner")).cast(pl.Int8).alias("y"),
-        pl.col("ts_utc").alias("decision_ts")
-    ])
+    # --- Attach winner label, clean and order ---
+    labels = attach_labels(labels, results)
 
-    # --- Clean and order ---
-    keep_cols = [
-        "decision_ts", "game_id", "runner",
-        "imp_prob_mean", "imp_prob_vigadj",
-        "vig_spread", "home_away_ratio", "mins_to_start",
-        "y", "source"
-    ]
-    labels = labels.select([c for c in keep_cols if c in labels.columns])
-    labels = labels.sort(["game_id", "runner"])
-
-    out_path = wh / "labels.parquet"
     out_path.unlink(missing_ok=True)
     labels.write_parquet(out_path)
 
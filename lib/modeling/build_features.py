@@ -3,36 +3,51 @@ from pathlib import Path
 import polars as pl
 from lib.common.settings import Settings
 
-def main():
-    s = Settings.load()
-    raw_path = Path(s.raw_dir) / "toy_ticks.parquet"
-    df = pl.read_parquet(raw_path)
+DEFAULT_WINDOWS = (5, 10, 20)
+DEFAULT_VOL_WINDOWS = (10,)
 
-    # sort and set grouping keys
-    df = df.sort(["game_id", "runner", "ts"])
-    by_keys = ["game_id", "runner"]
 
-    # odds-based features
+def feature_windows(s: Settings) -> tuple[list[int], list[int]]:
+    feats = s.features or {}
+    return (list(feats.get("count_windows", DEFAULT_WINDOWS)),
+            list(feats.get("vol_windows", DEFAULT_VOL_WINDOWS)))
+
+
+def batch_features(df: pl.DataFrame, windows=DEFAULT_WINDOWS, vol_windows=DEFAULT_VOL_WINDOWS) -> pl.DataFrame:
+    """Rolling odds features over a whole tick table (the reference for streaming_features)."""
+    # multi-book toy data (make_toy_raw --books N) keeps each book's series separate
+    by_keys = ["game_id", "runner"] + (["book"] if "book" in df.columns else [])
+    df = df.sort([*by_keys, "ts"])
+
+    # odds-based features; diff is per key so a series never starts from another's last tick
     feats = (
         df.with_columns([
             pl.col("odds").cast(pl.Float64).alias("odds"),
-            (pl.col("odds").diff().fill_null(0)).alias("odds_diff"),
+            (pl.col("odds").diff().over(by_keys).fill_null(0)).alias("odds_diff"),
             (1.0 / pl.col("odds")).alias("implied_p"),
         ])
-        .with_columns([
-            pl.col("odds").rolling_mean(window_size=5).over(by_keys).alias("odds_ma_5"),
-            pl.col("odds").rolling_mean(window_size=10).over(by_keys).alias("odds_ma_10"),
-            pl.col("odds").rolling_mean(window_size=20).over(by_keys).alias("odds_ma_20"),
-            pl.col("odds_diff").rolling_std(window_size=10).over(by_keys).alias("odds_vol_10"),
-        ])
+        .with_columns(
+            [pl.col("odds").rolling_mean(window_size=w).over(by_keys).alias(f"odds_ma_{w}") for w in windows]
+            + [pl.col("odds_diff").rolling_std(window_size=w).over(by_keys).alias(f"odds_vol_{w}")
+               for w in vol_windows]
+        )
     )
 
     keep_cols = [
-        "ts","game_id","market_id","runner",
+        "ts","game_id","market_id","runner",*by_keys[2:],
         "odds","odds_diff","implied_p",
-        "odds_ma_5","odds_ma_10","odds_ma_20","odds_vol_10"
+        *[f"odds_ma_{w}" for w in windows], *[f"odds_vol_{w}" for w in vol_windows],
     ]
-    feats = feats.select(keep_cols)
+    return feats.select(keep_cols)
+
+
+def main():
+    s = Settings.load()
+    raw_path = Path(s.raw_dir) / "toy_ticks.parquet"
+    df = pl.read_parquet(raw_path)
+
+    windows, vol_windows = feature_windows(s)
+    feats = batch_features(df, windows, vol_windows)
 
     out_path = Path(s.warehouse_features)
     out_path.parent.mkdir(parents=True, exist_ok=True)
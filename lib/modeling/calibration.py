@@ -0,0 +1,140 @@
+from __future__ import annotations
+import os, time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np, lightgbm as lgb
+from sklearn.isotonic import IsotonicRegression
+from sklearn.model_selection import StratifiedKFold
+
+# Out-of-fold training. Every fold's booster is fit in its own process with
+# early stopping on its held-out part; those held-out predictions (OOF)
+# cover each row exactly once, and the isotonic calibrator is fit on them,
+# so calibration costs no extra boosting runs. The artifact is the fold
+# boosters averaged (or one refit on all rows at their mean best iteration).
+NUM_BOOST_ROUND = 300
+EARLY_STOPPING = 30
+
+_X: np.ndarray | None = None
+_y: np.ndarray | None = None
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray) -> None:
+    # The data crosses to each worker once, not once per fold
+    global _X, _y
+    _X, _y = X, y
+
+
+def _fit_fold(tr: np.ndarray, va: np.ndarray, params: dict, num_boost_round: int, early_stopping: int) -> tuple:
+    t0 = time.perf_counter()
+    dtrain = lgb.Dataset(_X[tr], _y[tr], free_raw_data=True)
+    dval = lgb.Dataset(_X[va], _y[va], reference=dtrain)
+    booster = lgb.train(params, dtrain, num_boost_round, valid_sets=[dval],
+                        callbacks=[lgb.early_stopping(early_stopping, verbose=False)])
+    p = booster.predict(_X[va], num_iteration=booster.best_iteration)
+    # Boosters pickle as their model string; smaller than the live object
+    return booster.model_to_string(num_iteration=booster.best_iteration), p, booster.best_iteration, time.perf_counter() - t0
+
+
+class FoldEnsemble:
+    """Mean P(label=1) over boosters; `predict(X)` returns probabilities, as scoring expects."""
+
+    def __init__(self, boosters: list[lgb.Booster]):
+        self.boosters = boosters
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        return np.mean([b.predict(X) for b in self.boosters], axis=0)
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = self.predict(X)
+        return np.column_stack([1.0 - p, p])
+
+    def __getstate__(self):
+        return {"models": [b.model_to_string() for b in self.boosters]}
+
+    def __setstate__(self, state):
+        self.boosters = [lgb.Booster(model_str=m) for m in state["models"]]
+
+
+class Calibrator:
+    """Isotonic map from raw model probability to calibrated probability.
+
+    `predict(p_raw)` calibrates probabilities; `predict_proba(X)` runs the
+    attached model first, for callers that hold feature rows instead.
+    """
+
+    def __init__(self, iso: IsotonicRegression, model: FoldEnsemble | None = None):
+        self.iso = iso
+        self.model = model
+
+    def predict(self, p_raw) -> np.ndarray:
+        return self.iso.predict(np.asarray(p_raw, dtype=np.float64).ravel())
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.model is None:
+            raise ValueError("Calibrator has no model attached; use predict(p_raw)")
+        p = self.predict(self.model.predict(X))
+        return np.column_stack([1.0 - p, p])
+
+
+def fit_isotonic(p: np.ndarray, y: np.ndarray) -> IsotonicRegression:
+    return IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(p, y)
+
+
+@dataclass
+class OOFResult:
+    models: list[str]       # fold booster model strings
+    oof: np.ndarray         # held-out P(label=1) per row (NaN if never held out)
+    fold_of: np.ndarray     # fold index per row (-1: training-only rows)
+    best_iters: list[int]
+    fold_seconds: list[float]
+
+    def ensemble(self) -> FoldEnsemble:
+        return FoldEnsemble([lgb.Booster(model_str=m) for m in self.models])
+
+    @property
+    def held(self) -> np.ndarray:
+        """Rows with an out-of-fold prediction (walk-forward leaves the first block out)."""
+        return self.fold_of >= 0
+
+    def cross_calibrated(self, y: np.ndarray, forward: bool = False) -> np.ndarray:
+        """OOF probabilities calibrated by an isotonic fit on the *other* folds only: an
+        honest estimate of the calibrated model's quality (the final fit uses every fold).
+        `forward` fits each fold on earlier folds only; the first fold stays uncalibrated."""
+        out = self.oof.copy()
+        for f in np.unique(self.fold_of[self.held]):
+            held = self.fold_of == f
+            fit_on = self.held & ((self.fold_of < f) if forward else ~held)
+            if fit_on.any():
+                out[held] = fit_isotonic(self.oof[fit_on], y[fit_on]).predict(self.oof[held])
+        return out
+
+
+def train_oof(X: np.ndarray, y: np.ndarray, params: dict, n_splits: int = 5, n_jobs: int | None = None,
+              num_boost_round: int = NUM_BOOST_ROUND, early_stopping: int = EARLY_STOPPING,
+              seed: int = 42) -> OOFResult:
+    """Stratified k-fold boosting, folds in parallel processes (n_jobs=1 runs them inline)."""
+    X, y = np.ascontiguousarray(X, dtype=np.float64), np.asarray(y)
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed).split(X, y))
+    n_jobs = min(n_splits, n_jobs or os.cpu_count() or 1)
+    # Split the cores between concurrent folds instead of oversubscribing them
+    params = {**params, "n_jobs": max(1, (os.cpu_count() or 1) // n_jobs), "verbose": -1}
+    args = [(tr, va, params, num_boost_round, early_stopping) for tr, va in folds]
+
+    if n_jobs == 1:
+        _init_worker(X, y)
+        results = [_fit_fold(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(n_jobs, initializer=_init_worker, initargs=(X, y)) as ex:
+            results = list(ex.map(_fit_fold, *zip(*args)))
+
+    oof, fold_of = np.empty(len(y)), np.empty(len(y), dtype=np.int16)
+    for f, ((_, va), (_, p, _, _)) in enumerate(zip(folds, results)):
+        oof[va], fold_of[va] = p, f
+    return OOFResult([r[0] for r in results], oof, fold_of, [r[2] for r in results], [r[3] for r in results])
+
+
+def refit(X: np.ndarray, y: np.ndarray, params: dict, num_boost_round: int) -> FoldEnsemble:
+    """One booster on every row at a fixed round count (e.g. the folds' mean best iteration)."""
+    booster = lgb.train({**params, "verbose": -1}, lgb.Dataset(np.asarray(X, dtype=np.float64), y), num_boost_round)
+    return FoldEnsemble([booster])
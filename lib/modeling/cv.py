@@ -0,0 +1,137 @@
+from __future__ import annotations
+import hashlib, os, pathlib, time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np, lightgbm as lgb
+from lib.featurization.team_form import FORM_COLS
+from lib.modeling.calibration import EARLY_STOPPING, NUM_BOOST_ROUND, FoldEnsemble, OOFResult
+from lib.modeling.ratings import season_of
+
+# Walk-forward CV over one binned LightGBM Dataset. The feature matrix is
+# binned once, saved as a LightGBM binary keyed by a hash of the data and
+# the binning params, and every fold (and the final refit) trains on a
+# subset() of it, which reuses the bin mappers instead of re-binning. Fold k
+# validates on time block k+1 after training on every earlier block, so its
+# score is what the model would have done going forward.
+FEATURE_COLS = ["imp_prob_mean", "imp_prob_vigadj", "vig_spread", "home_away_ratio", *FORM_COLS]
+
+# Defaults under config lgbm.params (and any tuned best layered over that)
+PARAMS = dict(
+    objective="binary",
+    metric="binary_logloss",
+    boosting_type="gbdt",
+    learning_rate=0.05,
+    num_leaves=64,
+    min_data_in_leaf=50,
+    feature_fraction=0.9,
+    bagging_fraction=0.8,
+    bagging_freq=5,
+    verbose=-1,
+    n_jobs=-1,
+    random_state=42,
+)
+
+# Params that shape the binned Dataset itself; anything else can vary per
+# fold or per trial without invalidating the cache.
+DATASET_PARAMS = ("max_bin", "min_data_in_bin", "bin_construct_sample_cnt", "use_missing",
+                  "zero_as_missing", "linear_tree", "seed", "random_state")
+
+
+def base_params(lgbm_cfg: dict | None) -> dict:
+    """PARAMS overlaid with config `lgbm.params` and `lgbm.random_state`."""
+    lgbm_cfg = lgbm_cfg or {}
+    return {**PARAMS, **(lgbm_cfg.get("params") or {}), "random_state": lgbm_cfg.get("random_state", PARAMS["random_state"])}
+
+
+def dataset_params(params: dict) -> dict:
+    # feature_pre_filter off: min_data_in_leaf may differ from the one the bins were built with
+    return {**{k: params[k] for k in DATASET_PARAMS if k in params}, "feature_pre_filter": False, "verbose": -1}
+
+
+def time_blocks(dates: np.ndarray, n_blocks: int, by: str = "season") -> np.ndarray:
+    """Block index per row, in time order: one block per season, or n_blocks equal date ranges."""
+    days = np.asarray(dates).astype("datetime64[D]")
+    if by == "season":
+        seasons = season_of(days)
+        return np.searchsorted(np.unique(seasons), seasons)
+    if by == "date":
+        uniq = np.unique(days)
+        edges = uniq[np.linspace(0, len(uniq), n_blocks + 1).astype(int)[1:-1]]
+        return np.searchsorted(edges, days, side="right")
+    raise ValueError(f"unknown walk-forward block {by!r}; expected 'season' or 'date'")
+
+
+def walk_forward_folds(dates: np.ndarray, n_splits: int = 5, by: str = "season") -> list[tuple[np.ndarray, np.ndarray]]:
+    """Expanding-window folds: the last `n_splits` blocks are each validated on everything before them."""
+    block = time_blocks(dates, n_splits + 1, by)
+    n_blocks = int(block.max()) + 1
+    if n_blocks < 2:
+        raise ValueError("walk-forward CV needs at least two time blocks")
+    return [(np.flatnonzero(block < b), np.flatnonzero(block == b))
+            for b in range(max(1, n_blocks - n_splits), n_blocks)]
+
+
+def dataset_key(X: np.ndarray, y: np.ndarray, feature_names: list[str], params: dict) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((X.shape, X.dtype.str, feature_names, sorted(dataset_params(params).items()))).encode())
+    h.update(np.ascontiguousarray(X).data)
+    h.update(np.ascontiguousarray(y).data)
+    return h.hexdigest()
+
+
+def dataset_path(cache_dir: str | pathlib.Path, X: np.ndarray, y: np.ndarray, feature_names: list[str],
+                 params: dict) -> pathlib.Path:
+    return pathlib.Path(cache_dir) / f"{dataset_key(X, y, feature_names, params)}.bin"
+
+
+def cached_dataset(X: np.ndarray, y: np.ndarray, feature_names: list[str], params: dict,
+                   cache_dir: str | pathlib.Path | None = None) -> tuple[lgb.Dataset, bool]:
+    """Constructed Dataset for (X, y), loaded from `<cache_dir>/<key>.bin` when present.
+    Returns (dataset, cache hit)."""
+    dparams = dataset_params(params)
+    path = None
+    if cache_dir is not None:
+        path = dataset_path(cache_dir, X, y, feature_names, params)
+        if path.exists():
+            return lgb.Dataset(str(path), params=dparams).construct(), True
+    ds = lgb.Dataset(X, y, feature_name=feature_names, params=dparams, free_raw_data=True).construct()
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        ds.save_binary(str(tmp))
+        tmp.replace(path)
+    return ds, False
+
+
+def train_walk_forward(X: np.ndarray, y: np.ndarray, dates: np.ndarray, params: dict, dataset: lgb.Dataset,
+                       n_splits: int = 5, by: str = "season", jobs: int | None = None, threads: int | None = None,
+                       num_boost_round: int = NUM_BOOST_ROUND, early_stopping: int = EARLY_STOPPING) -> OOFResult:
+    """Fit every walk-forward fold on subsets of `dataset`, `jobs` folds at a time sharing `threads`
+    cores. Rows in the first (train-only) block keep fold_of = -1 and a NaN oof."""
+    folds = walk_forward_folds(dates, n_splits, by)
+    threads = threads or os.cpu_count() or 1
+    jobs = max(1, min(len(folds), jobs or threads))
+    params = {**params, "n_jobs": max(1, threads // jobs), "verbose": -1}
+    # Subsets are built up front on this thread; training releases the GIL
+    subsets = [(dataset.subset(tr).construct(), dataset.subset(va).construct()) for tr, va in folds]
+
+    def fit(k: int) -> tuple:
+        t0 = time.perf_counter()
+        dtrain, dval = subsets[k]
+        booster = lgb.train(params, dtrain, num_boost_round, valid_sets=[dval],
+                            callbacks=[lgb.early_stopping(early_stopping, verbose=False)])
+        p = booster.predict(X[folds[k][1]], num_iteration=booster.best_iteration)
+        return booster.model_to_string(num_iteration=booster.best_iteration), p, booster.best_iteration, time.perf_counter() - t0
+
+    with ThreadPoolExecutor(jobs) as ex:
+        results = list(ex.map(fit, range(len(folds))))
+
+    oof, fold_of = np.full(len(y), np.nan), np.full(len(y), -1, dtype=np.int16)
+    for f, ((_, va), (_, p, _, _)) in enumerate(zip(folds, results)):
+        oof[va], fold_of[va] = p, f
+    return OOFResult([r[0] for r in results], oof, fold_of, [r[2] for r in results], [r[3] for r in results])
+
+
+def refit_dataset(dataset: lgb.Dataset, params: dict, num_boost_round: int, threads: int | None = None) -> FoldEnsemble:
+    """Final booster on the whole cached Dataset (no re-binning)."""
+    params = {**params, "n_jobs": threads or os.cpu_count() or 1, "verbose": -1}
+    return FoldEnsemble([lgb.train(params, dataset, num_boost_round)])
@@ -1,8 +1,9 @@
 # lib/modeling/eval.py
 from __future__ import annotations
 from duckdb import df
-import argparse, pathlib, joblib, pandas as pd, numpy as np
+import argparse, pathlib, pandas as pd, numpy as np
 from lib.common.settings import load_settings
+from lib.modeling.registry import load_model
 
 def implied_prob_from_odds(odds: float) -> float:
     """Convert American odds to implied probability."""
@@ -26,27 +27,10 @@ def main():
 
     if not feats_path.exists():
         raise FileNotFoundError(f"{feats_path} missing — run make features first.")
-    if not (art_dir / "model.joblib").exists():
-        raise FileNotFoundError(f"Trained model not found in {art_dir}")
-
     print(f"[eval] 🚀 Evaluating {league} model...")
     df = pd.read_parquet(feats_path)
-    model = joblib.load(art_dir / "model.joblib")
-    cal = joblib.load(art_dir / "calibrator.joblib")
-
-    feature_cols = ["imp_prob_mean", "vig_spread", "home_away_ratio"]
-    X = df[feature_cols].to_numpy()
-
-    raw_probs = model.predict_proba(X)[:, 1]
-
-# Handle calibrated model correctly — use first calibrated submodel
-    try:
-        calibrated_probs = cal.calibrated_classifiers_[0].calibrators_[1].predict(raw_probs.reshape(-1, 1))
-    except Exception:
-    # fallback if different calibration structure
-        calibrated_probs = raw_probs  # use raw if calibration not compatible
-
-    df["model_prob"] = calibrated_probs
+    model = load_model(art_dir)  # FileNotFoundError if nothing is registered
+    df["model_prob"] = model.predict_proba(df[model.features])[:, 1]
 
     # Simulate moneyline odds (placeholder if not present)
     if "odds_home" not in df.columns:
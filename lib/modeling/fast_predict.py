@@ -0,0 +1,194 @@
+from __future__ import annotations
+import pathlib
+from functools import lru_cache
+import numpy as np
+from lib.modeling.registry import MANIFEST, model_dir, read_version
+
+# Scoring without lightgbm or sklearn, QuickScorer style. Every tree's
+# leaves are numbered left to right and each split gets a bitmask that clears
+# the leaves of its left subtree; a row's exit leaf is the lowest bit left
+# after AND-ing the masks of the splits it fails (x > threshold). For one
+# feature, the splits failed by x are exactly those with a threshold below
+# x, so per feature we precompute, for each of its sorted unique thresholds,
+# the running AND of masks per tree. Scoring a batch is one searchsorted per
+# feature, one table gather per feature, an AND, a lowest-set-bit and a leaf
+# value gather: no per-node branching. NaN (and zero, for zero_as_missing
+# splits) get their own table rows following LightGBM's missing rules. The
+# isotonic calibrator is a single threshold table applied with np.interp.
+ZERO_THRESHOLD = 1e-35   # LightGBM kZeroThreshold
+ALL_LEAVES = np.uint64(2**64 - 1)
+CHUNK_CELLS = 1 << 17    # rows x trees x words per pass: the mask block stays around 1 MiB
+# 2**k mod 67 is distinct for k < 64, so this maps a single set bit to its index
+BIT_INDEX = np.zeros(67, np.intp)
+BIT_INDEX[[pow(2, k, 67) for k in range(64)]] = np.arange(64)
+
+
+def _parse_model(text: str) -> tuple[float, list[dict]]:
+    """(sigmoid, trees) from a LightGBM model string; a tree is a dict of its array fields."""
+    header, *blocks = text.split("\nTree=")
+    fields = dict(line.split("=", 1) for line in header.splitlines() if "=" in line)
+    objective = fields.get("objective", "").split()
+    if not objective or objective[0] != "binary":
+        raise ValueError(f"only binary objectives compile, got {fields.get('objective')!r}")
+    if "average_output" in header:
+        raise ValueError("random-forest (average_output) models are not supported")
+    sigmoid = float(next((o.split(":")[1] for o in objective[1:] if o.startswith("sigmoid:")), 1.0))
+    trees = []
+    for block in blocks:
+        block = block.split("\nend of trees")[0]
+        tree = dict(line.split("=", 1) for line in block.splitlines()[1:] if "=" in line)
+        if int(tree.get("num_cat", 0)) or int(tree.get("is_linear", 0)):
+            raise ValueError("categorical and linear trees are not supported")
+        trees.append(tree)
+    return sigmoid, trees
+
+
+def _arr(tree: dict, key: str, dtype) -> np.ndarray:
+    return np.array(tree[key].split(), dtype=dtype) if tree.get(key) else np.empty(0, dtype)
+
+
+class CompiledModel:
+    """Registry model compiled to NumPy; same `predict` / `calibrate` / `predict_proba` as registry.Model."""
+
+    def __init__(self, texts: list[str], x_thresholds: np.ndarray, y_thresholds: np.ndarray, manifest: dict):
+        self.manifest = manifest
+        self.x_thresholds, self.y_thresholds = x_thresholds, y_thresholds
+        trees, sigmoids, starts = [], [], []
+        for text in texts:
+            sigmoid, parsed = _parse_model(text)
+            sigmoids.append(sigmoid)
+            starts.append(len(trees))
+            trees += parsed
+        n_trees = len(trees)
+        self.words = words = -(-max(int(t["num_leaves"]) for t in trees) // 64)
+
+        # Every split of every tree: feature, threshold, decision type, tree, leaf mask
+        self.leaf_value = np.zeros((n_trees, words * 64))
+        cols = {"f": [np.empty(0, np.intp)], "thr": [np.empty(0)], "dt": [np.empty(0, np.int64)],
+                "tree": [np.empty(0, np.intp)], "mask": [np.empty((0, words), np.uint64)]}
+        for t, tree in enumerate(trees):
+            values = _arr(tree, "leaf_value", np.float64)
+            if len(values) < 2:
+                self.leaf_value[t, 0] = values[0]
+                continue
+            masks, order = _split_masks(tree, words)
+            self.leaf_value[t, : len(values)] = values[order]
+            cols["f"].append(_arr(tree, "split_feature", np.intp))
+            cols["thr"].append(_arr(tree, "threshold", np.float64))
+            cols["dt"].append(_arr(tree, "decision_type", np.int64))
+            cols["tree"].append(np.full(len(values) - 1, t, np.intp))
+            cols["mask"].append(masks)
+        f, thr, dt, tree, mask = (np.concatenate(c) for c in cols.values())
+        default_left, missing = (dt & 2) > 0, (dt >> 2) & 3  # missing: 0 none, 1 zero, 2 NaN
+        # NaN is read as 0.0 when a split has no missing type; otherwise it takes the default side
+        nan_right = np.where(missing == 0, thr < 0.0, ~default_left)
+        zero_right = np.where(missing == 1, ~default_left, thr < 0.0)
+
+        # Per feature, row k of the table ANDs the masks of splits on its k smallest thresholds;
+        # the last two rows are where NaN and (zero_as_missing) zero go
+        self.thresholds, self.tables, self.zero_missing = [], [], []
+        for feat in range(len(manifest["features"])):
+            sel = f == feat
+            uniq, rank = np.unique(thr[sel], return_inverse=True)
+            table = np.full((len(uniq) + 3, n_trees, words), ALL_LEAVES)
+            np.bitwise_and.at(table, (rank + 1, tree[sel]), mask[sel])
+            table[1 : len(uniq) + 1] = np.bitwise_and.accumulate(table[1 : len(uniq) + 1], axis=0)
+            for row, goes_right in ((-2, nan_right), (-1, zero_right)):
+                np.bitwise_and.at(table, (row, tree[sel & goes_right]), mask[sel & goes_right])
+            self.thresholds.append(uniq)
+            self.tables.append(table)
+            self.zero_missing.append(bool((missing[sel] == 1).any()))
+        self.used = [feat for feat, u in enumerate(self.thresholds) if len(u)]
+        self.sigmoids = np.array(sigmoids)
+        self.starts = np.array(starts, dtype=np.intp)  # first tree of each booster
+        self.leaf_flat = self.leaf_value.ravel()
+        self.leaf_base = np.arange(n_trees, dtype=np.intp) * (words * 64)
+
+    @property
+    def features(self) -> list[str]:
+        return self.manifest["features"]
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    def _matrix(self, X) -> np.ndarray:
+        if hasattr(X, "columns"):
+            X = X[self.features]
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"expected {len(self.features)} feature columns {self.features}, got shape {X.shape}")
+        return X
+
+    def raw(self, X) -> np.ndarray:
+        """Raw score per row and booster, shape (rows, boosters)."""
+        X = self._matrix(X)
+        rows = max(1, CHUNK_CELLS // (len(self.leaf_value) * self.words))
+        if len(X) <= rows:
+            return self._raw_chunk(X)
+        return np.concatenate([self._raw_chunk(X[lo:lo + rows]) for lo in range(0, len(X), rows)])
+
+    def _raw_chunk(self, X: np.ndarray) -> np.ndarray:
+        mask = np.full((len(X), len(self.leaf_value), self.words), ALL_LEAVES) if not self.used else None
+        for f in self.used:
+            x, uniq = X[:, f], self.thresholds[f]
+            k = np.searchsorted(uniq, x, side="left")  # thresholds strictly below x: splits failed
+            k[np.isnan(x)] = len(uniq) + 1
+            if self.zero_missing[f]:
+                k[np.abs(x) <= ZERO_THRESHOLD] = len(uniq) + 2
+            mask = self.tables[f][k] if mask is None else np.bitwise_and(mask, self.tables[f][k], out=mask)
+        # Exit leaf: lowest set bit of the first non-empty word
+        if self.words == 1:
+            m, base = mask[..., 0], self.leaf_base
+        else:
+            word = np.argmax(mask != 0, axis=2)
+            m = np.take_along_axis(mask, word[..., None], axis=2)[..., 0]
+            base = self.leaf_base + word * 64
+        low = m & (~m + np.uint64(1))
+        values = self.leaf_flat[base + BIT_INDEX[low % np.uint64(67)]]
+        # per-booster sums, tree order as LightGBM adds them
+        return np.add.reduceat(values, self.starts, axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        """Mean P(label=1) over the boosters (registry.Model.predict)."""
+        return np.mean(1.0 / (1.0 + np.exp(-self.sigmoids * self.raw(X))), axis=1)
+
+    def calibrate(self, p_raw) -> np.ndarray:
+        return np.interp(np.asarray(p_raw, dtype=np.float64).ravel(), self.x_thresholds, self.y_thresholds)
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = self.calibrate(self.predict(X))
+        return np.column_stack([1.0 - p, p])
+
+
+def _split_masks(tree: dict, words: int) -> tuple[np.ndarray, list[int]]:
+    """Per internal node, all-ones bits except the leaves of its left subtree, with leaves numbered
+    left to right; and the LightGBM leaf index at each of those positions."""
+    left, right = _arr(tree, "left_child", np.int64), _arr(tree, "right_child", np.int64)
+    masks = np.full((len(left), words), ALL_LEAVES)
+    order: list[int] = []
+
+    def walk(node: int) -> None:
+        if node < 0:
+            order.append(~node)
+            return
+        first = len(order)
+        walk(int(left[node]))
+        for pos in range(first, len(order)):
+            masks[node, pos // 64] &= ~np.uint64(1 << (pos % 64))
+        walk(int(right[node]))
+
+    walk(0)
+    return masks, order
+
+
+@lru_cache(maxsize=8)
+def _load_cached(vdir: str, mtime_ns: int) -> CompiledModel:
+    manifest, texts, x, y = read_version(pathlib.Path(vdir))
+    return CompiledModel([texts[name].decode() for name in manifest["models"]], x, y, manifest)
+
+
+def load_fast(art_dir: str | pathlib.Path, version: str | None = None) -> CompiledModel:
+    """Registered model (default: LATEST) compiled for scoring; cached like registry.load_model."""
+    vdir = model_dir(art_dir, version)
+    return _load_cached(str(vdir), (vdir / MANIFEST).stat().st_mtime_ns)
@@ -0,0 +1,256 @@
+from __future__ import annotations
+import pathlib, threading, time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Hashable, Iterable
+import numpy as np, polars as pl
+from lib.common.settings import Settings
+from lib.featurization.devig import devig
+from lib.featurization.team_form import FORM_COLS, team_form
+from lib.utils.team_registry import team_ids
+
+# In-process feature cache in the scoring process. LiveFeatures.refresh (what
+# the ingest jobs wrote to the warehouse) and the streaming engine put feature
+# vectors under tuple keys such as ("team", league, team_id) or ("game",
+# game_id, runner); scoring only ever calls get(), so a lookup never touches
+# disk. Entries expire after features.ttl_seconds and the least recently used
+# entry goes once features.store_max_entries is reached.
+DEFAULT_TTL_S = 120.0
+DEFAULT_MAX_ENTRIES = 4096
+TEAM_STATS_COLS = ["FG_PCT", "PLUS_MINUS"]
+MARKET_COLS = ["imp_prob_mean", "imp_prob_vigadj", "vig_spread", "home_away_ratio", "mins_to_start"]
+# Every column a serving row carries (HOME perspective, as in features.parquet);
+# a model picks its manifest features out of it by name (model_inputs)
+SERVING_COLS = [*MARKET_COLS, *FORM_COLS]
+
+
+class FeatureStore:
+    def __init__(self, ttl_s: float = DEFAULT_TTL_S, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_s = float(ttl_s)
+        self.max_entries = int(max_entries)
+        self.clock = clock
+        self._data: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.expired = self.evictions = 0
+
+    @classmethod
+    def from_settings(cls, s: Settings | None = None) -> "FeatureStore":
+        feats = (s or Settings.load()).features or {}
+        return cls(feats.get("ttl_seconds", DEFAULT_TTL_S), feats.get("store_max_entries", DEFAULT_MAX_ENTRIES))
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] <= self.clock():
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value, ttl_s: float | None = None) -> None:
+        self.put_many([(key, value)], ttl_s)
+
+    def put_many(self, items: Iterable[tuple[Hashable, object]], ttl_s: float | None = None) -> None:
+        with self._lock:
+            expires = self.clock() + (self.ttl_s if ttl_s is None else ttl_s)
+            for key, value in items:
+                self._data[key] = (expires, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_fill(self, key: Hashable, fill: Callable[[], object]):
+        """get(), falling back to `fill()` (the ingest side: may read disk) on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = fill()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses, "expired": self.expired,
+                "evictions": self.evictions, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+@lru_cache(maxsize=1)
+def default_store() -> FeatureStore:
+    """The process-wide store shared by ingest hooks and scoring entry points."""
+    return FeatureStore.from_settings()
+
+
+# --- ingest: frames → store ---
+
+def team_key(league: str, tid: int) -> tuple:
+    return ("team", league, int(tid))
+
+
+def form_key(league: str, tid: int) -> tuple:
+    return ("form", league, int(tid))
+
+
+def market_rows(home_prices, away_prices, mins_to_start: float = 30,
+                devig_method: str = "multiplicative") -> np.ndarray:
+    """Pregame rows (MARKET_COLS) from paired decimal prices (mins_to_start is static for now).
+
+    imp_prob_vigadj is de-vigged with `devig_method`; pass features.devig_method so it
+    matches what build_features trained on.
+    """
+    home_imp = 1 / np.asarray(home_prices, dtype=np.float64)
+    away_imp = 1 / np.asarray(away_prices, dtype=np.float64)
+    vig_spread = (home_imp + away_imp) - 1
+    home_away_ratio = home_imp / away_imp - 1
+    home_fair = devig(np.column_stack([home_imp, away_imp]), devig_method)[:, 0]
+    return np.column_stack([home_imp, home_fair, vig_spread, home_away_ratio,
+                            np.full(len(home_imp), float(mins_to_start))])
+
+
+def market_features(home_price: float, away_price: float, mins_to_start: float = 30,
+                    devig_method: str = "multiplicative") -> np.ndarray:
+    """One market_rows row, shape (1, len(MARKET_COLS))."""
+    return market_rows([home_price], [away_price], mins_to_start, devig_method)
+
+
+def model_inputs(rows: np.ndarray, features: list[str]) -> np.ndarray:
+    """SERVING_COLS rows → a model's manifest features, in its order."""
+    return rows[:, [SERVING_COLS.index(c) for c in features]]
+
+
+def put_team_stats(store: FeatureStore, stats: pl.DataFrame, league: str = "NBA") -> int:
+    """current_team_stats rows → one float vector (TEAM_STATS_COLS) per team id."""
+    stats = stats.with_columns(team_ids(stats["TEAM_NAME"], league).alias("team_id"))
+    stats = stats.drop_nulls("team_id").unique("team_id", keep="first", maintain_order=True)
+    X = stats.select(pl.col(c).cast(pl.Float64).fill_null(0.0) for c in TEAM_STATS_COLS).to_numpy()
+    store.put_many((team_key(league, tid), x) for tid, x in zip(stats["team_id"].to_list(), X))
+    store.put(("team_stats", league), True)
+    return stats.height
+
+
+def put_team_form(store: FeatureStore, form: pl.DataFrame, league: str = "NBA") -> int:
+    """team_form rows → each team's form vector (FORM_COLS) as of now: its latest row."""
+    latest = form.sort("asof_date").unique("team_id", keep="last", maintain_order=True)
+    X = latest.select(pl.col(c).cast(pl.Float64) for c in FORM_COLS).to_numpy()
+    store.put_many((form_key(league, tid), x) for tid, x in zip(latest["team_id"].to_list(), X))
+    return latest.height
+
+
+def put_odds(store: FeatureStore, odds: pl.DataFrame, league: str = "NBA") -> pl.DataFrame:
+    """Live moneyline snapshot → one row per matchup (DraftKings preferred), keyed by team ids."""
+    if "home_team_id" not in odds.columns:
+        # snapshots written before the parser emitted IDs
+        odds = odds.with_columns(
+            team_ids(odds["home_team"], league).alias("home_team_id"),
+            team_ids(odds["away_team"], league).alias("away_team_id"),
+        )
+    games = (
+        odds.sort(pl.col("book") != "draftkings")
+        .unique(subset=["home_team_id", "away_team_id"], keep="first", maintain_order=True)
+    )
+    store.put(("odds", league), games)
+    return games
+
+
+class LiveFeatures:
+    """Scoring-side view over a FeatureStore. refresh() is the ingest step that loads the
+    warehouse parquet into the store; every lookup after that is a store get()."""
+
+    def __init__(self, wh_root: str | pathlib.Path = "data/warehouse", league: str = "NBA",
+                 store: FeatureStore | None = None, devig_method: str = "multiplicative"):
+        self.dir = pathlib.Path(wh_root) / league
+        self.league = league
+        self.store = store if store is not None else default_store()
+        self.devig_method = devig_method  # features.devig_method, as build_features used
+
+    def refresh(self) -> dict[str, int]:
+        """Put current team stats and form, the live odds snapshot and Elo ratings in the store.
+
+        The only disk reads; a one-shot entry point calls it once, a long-lived
+        one (lib.modeling.serve) off the scoring path more often than the TTL.
+        """
+        from lib.modeling.ratings import load_ratings
+
+        loaded = {}
+        if (path := self.dir / "current_team_stats.parquet").exists():
+            loaded["teams"] = put_team_stats(self.store, pl.read_parquet(path), self.league)
+        # team_form.parquet (lib.featurization.team_form) if built, else derived from team_stats
+        if (path := self.dir / "team_form.parquet").exists():
+            loaded["form"] = put_team_form(self.store, pl.read_parquet(path), self.league)
+        elif (path := self.dir / "team_stats.parquet").exists():
+            loaded["form"] = put_team_form(self.store, team_form(pl.scan_parquet(path)).collect(), self.league)
+        if (path := self.dir / "live_odds.parquet").exists():
+            loaded["odds"] = put_odds(self.store, pl.read_parquet(path), self.league).height
+        if (self.dir / "ratings.npz").exists():
+            # parsed again only when ratings.npz is rewritten
+            self.store.put(("ratings", self.league), load_ratings(self.dir.parent, self.league))
+            loaded["ratings"] = 1
+        return loaded
+
+    def odds(self) -> pl.DataFrame | None:
+        """Latest moneyline row per matchup, or None if no snapshot is in the store."""
+        return self.store.get(("odds", self.league))
+
+    def team(self, tid: int) -> np.ndarray | None:
+        return self.store.get(team_key(self.league, tid))
+
+    def teams(self, tids: Iterable[int]) -> np.ndarray:
+        """(n, len(TEAM_STATS_COLS)) matrix; NaN rows for teams without stats."""
+        rows = [self.team(t) for t in tids]
+        out = np.full((len(rows), len(TEAM_STATS_COLS)), np.nan)
+        for i, x in enumerate(rows):
+            if x is not None:
+                out[i] = x
+        return out
+
+    def elo_prob(self, home_ids, away_ids) -> np.ndarray | None:
+        """Elo P(home win) per pair from the stored ratings (lib.modeling.ratings); None if never rated."""
+        ratings = self.store.get(("ratings", self.league))
+        return None if ratings is None else ratings.win_prob(home_ids, away_ids)
+
+    def form(self, tids: Iterable[int | None]) -> np.ndarray:
+        """(n, len(FORM_COLS)) current form; NaN rows for unknown teams or teams without games."""
+        rows = [None if t is None else self.store.get(form_key(self.league, t)) for t in tids]
+        out = np.full((len(rows), len(FORM_COLS)), np.nan)
+        for i, x in enumerate(rows):
+            if x is not None:
+                out[i] = x
+        return out
+
+    def game_rows(self, home_ids, away_ids, home_prices, away_prices, mins_to_start: float = 30) -> np.ndarray:
+        """Serving rows (SERVING_COLS) for home/away pairs at the given prices: the market
+        features plus home-minus-away form, as build_features computes them."""
+        market = market_rows(home_prices, away_prices, mins_to_start, self.devig_method)
+        return np.hstack([market, self.form(home_ids) - self.form(away_ids)])
+
+    def matchup(self, home_ids, away_ids) -> np.ndarray:
+        """game_rows at each pair's stored moneyline; NaN prices for pairs without an odds row."""
+        pairs = pl.DataFrame({"home_team_id": list(home_ids), "away_team_id": list(away_ids)},
+                             schema={"home_team_id": pl.Int64, "away_team_id": pl.Int64})
+        odds = self.odds()
+        if odds is None:
+            prices = np.full((pairs.height, 2), np.nan)
+        else:
+            prices = pairs.join(
+                odds.select(pl.col("home_team_id", "away_team_id").cast(pl.Int64),
+                            pl.col("home_odds", "away_odds").cast(pl.Float64)),
+                on=["home_team_id", "away_team_id"], how="left", maintain_order="left",
+            ).select("home_odds", "away_odds").to_numpy()
+        return self.game_rows(home_ids, away_ids, prices[:, 0], prices[:, 1])
@@ -1,75 +1,64 @@
-import os
+import time
 import polars as pl
-import joblib
 import numpy as np
-from difflib import get_close_matches
+from lib.common.settings import load_settings
 from lib.modeling.utils import prob_to_moneyline
-from lib.utils.team_name_map import normalize_name  # <— shared normalizer
-
-
-def normalize_team_name(team_name: str, valid_names: list[str]) -> str:
-    """Find the closest valid team name in the stats dataset."""
-    match = get_close_matches(team_name, valid_names, n=1, cutoff=0.6)
-    if not match:
-        raise ValueError(f"❌ '{team_name}' not found in dataset.\nAvailable: {valid_names}")
-    return match[0]
-
-
-def live_predict(team1: str, team2: str):
-    stats_path = "data/warehouse/NBA/current_team_stats.parquet"
-    odds_path = "data/warehouse/NBA/live_odds.parquet"
-    model_path = "artifacts/NBA/model.joblib"
-    cal_path = "artifacts/NBA/calibrator.joblib"
-
-    # --- Load datasets ---
-    stats = pl.read_parquet(stats_path)
-    odds = pl.read_parquet(odds_path)
-
-    # Normalize team names in odds using our shared alias map
-    odds = odds.with_columns([
-        pl.col("home_team").map_elements(normalize_name).alias("home_team"),
-        pl.col("away_team").map_elements(normalize_name).alias("away_team"),
-    ])
-
-    valid_names = stats["TEAM_NAME"].unique().to_list()
-    team1 = normalize_team_name(team1, valid_names)
-    team2 = normalize_team_name(team2, valid_names)
-
-    # --- Extract features safely ---
-    t1_list = stats.filter(pl.col("TEAM_NAME") == team1).to_dicts()
-    t2_list = stats.filter(pl.col("TEAM_NAME") == team2).to_dicts()
-    if not t1_list or not t2_list:
-        raise ValueError(f"Stats not found for {team1} or {team2}")
-    t1, t2 = t1_list[0], t2_list[0]
-
-    fg_diff = t1.get("FG_PCT", 0) - t2.get("FG_PCT", 0)
-    margin = t1.get("PLUS_MINUS", 0) - t2.get("PLUS_MINUS", 0)
-    home_away_ratio = 1.0
-
-    X = np.array([[home_away_ratio, fg_diff, margin]])
-
-    # --- Load model + calibrator ---
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Missing model at {model_path}")
-    if not os.path.exists(cal_path):
-        raise FileNotFoundError(f"Missing calibrator at {cal_path}")
-
-    model = joblib.load(model_path)
-    cal = joblib.load(cal_path)
-
-    # ✅ Correct usage — the calibrator handles model internally
-    model_prob = float(cal.predict_proba(X)[:, 1][0])
-
-    # --- Find matching odds row ---
-    row = odds.filter(
-        (pl.col("home_team") == team1) & (pl.col("away_team") == team2)
-    ).sort("book").head(1)
-
-    if row.height == 0:
+from lib.modeling.feature_store import LiveFeatures, model_inputs
+from lib.modeling.fast_predict import load_fast
+from lib.modeling.serve import request
+from lib.utils.team_registry import TEAM_NAMES, team_id
+
+
+def resolve_team(team_name: str) -> int:
+    """User-typed team name → compact team ID (exact alias hit, else cached fuzzy match)."""
+    tid = team_id(team_name, "NBA")
+    if tid is None:
+        raise ValueError(f"❌ '{team_name}' is not a known NBA team.")
+    return tid
+
+
+def matchup_inputs(team1: str, team2: str, live: LiveFeatures) -> tuple[dict, np.ndarray]:
+    """Resolved names/ids, the home price (None without an odds row), Elo and the serving row (SERVING_COLS)."""
+    id1, id2 = resolve_team(team1), resolve_team(team2)
+    X = live.matchup([id1], [id2])
+
+    odds = live.odds()
+    row = None if odds is None else odds.filter((pl.col("home_team_id") == id1) & (pl.col("away_team_id") == id2))
+    elo = live.elo_prob([id1], [id2])
+    info = {"home": TEAM_NAMES[id1], "away": TEAM_NAMES[id2], "home_id": id1, "away_id": id2,
+            "home_odds": float(row["home_odds"][0]) if row is not None and row.height else None,
+            "elo": float(elo[0]) if elo is not None else None}
+    return info, X
+
+
+def live_predict(team1: str, team2: str, live: LiveFeatures | None = None):
+    # --- Ask a running prediction server first (python -m lib.modeling.serve) ---
+    t0 = time.perf_counter()
+    resp = request({"op": "matchup", "league": "NBA", "home": team1, "away": team2}) if live is None else None
+    if resp is not None:
+        if not resp["ok"]:
+            raise ValueError(resp["error"])
+        info, model_prob = resp, resp["p"]
+        where = f"server, batch of {resp['batch']}"
+    else:
+        # --- In-process: features + odds from the store, model compiled to NumPy and loaded once ---
+        if live is None:
+            live = LiveFeatures("data/warehouse", "NBA",
+                                devig_method=(load_settings().features or {}).get("devig_method", "multiplicative"))
+            live.refresh()
+        info, X = matchup_inputs(team1, team2, live)
+        if info["home_odds"] is not None:
+            model = load_fast("artifacts/NBA")
+            model_prob = float(model.predict_proba(model_inputs(X, model.features))[:, 1][0])
+        where = "in-process"
+    ms = (time.perf_counter() - t0) * 1e3
+    team1, team2 = info["home"], info["away"]
+
+    if info["home_odds"] is None:
         print(f"No odds yet for {team1} vs {team2}")
         return
 
-    home_odds = float(row["home_odds"][0])
+    home_odds = info["home_odds"]
     implied = 1 / home_odds
     fair_moneyline = prob_to_moneyline(model_prob)
     edge = (model_prob - implied) * 100
@@ -78,9 +67,11 @@ def live_predict(team1: str, team2: str):
     print(f"DraftKings Odds: {home_odds}")
     print(f"Implied Prob: {implied:.3f}")
     print(f"Model Prob: {model_prob:.3f}")
+    if info["elo"] is not None:
+        print(f"Elo Prob: {info['elo']:.3f}")
     print(f"Fair Moneyline: {fair_moneyline:.0f}")
-    print(f"Edge: {edge:+.2f}%\n")
-
+    print(f"Edge: {edge:+.2f}%")
+    print(f"Scored {where} in {ms:.1f}ms\n")
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,177 @@
+from __future__ import annotations
+import argparse, io, pathlib, time
+from dataclasses import dataclass, field
+from functools import lru_cache
+import numpy as np, polars as pl
+from lib.common.settings import load_settings
+from lib.featurization.team_form import game_results
+from lib.utils.team_registry import TEAMS
+
+# Elo with a home-court bonus and a margin-of-victory multiplier (the
+# FiveThirtyEight NBA formulation). Ratings live in one float array indexed
+# by registry team ID, so a lookup is elo[team_id]. Games are applied one
+# date at a time: every game on a date is rated from the same pre-date
+# ratings and the deltas land together through np.add.at.
+MEAN = 1500.0
+K = 20.0
+HOME_ADV = 100.0
+SEASON_REVERT = 0.25  # share of each rating pulled back to MEAN between seasons
+N_TEAMS = int(TEAMS["team_id"].max()) + 1
+
+
+def expected_home(elo_home, elo_away, home_adv: float = HOME_ADV):
+    """P(home win) from ratings; works on scalars or arrays."""
+    return 1.0 / (1.0 + 10.0 ** ((np.asarray(elo_away) - np.asarray(elo_home) - home_adv) / 400.0))
+
+
+def mov_multiplier(margin: np.ndarray, winner_elo_diff: np.ndarray) -> np.ndarray:
+    # Bigger wins move ratings more, damped when the favourite wins (autocorrelation term)
+    return (np.abs(margin) + 3.0) ** 0.8 / (7.5 + 0.006 * winner_elo_diff)
+
+
+def season_of(dates: np.ndarray) -> np.ndarray:
+    """Season start year for datetime64[D] dates (seasons tip off in October)."""
+    ym = dates.astype("datetime64[M]").astype(int)
+    year, month = ym // 12 + 1970, ym % 12 + 1
+    return np.where(month >= 8, year, year - 1)
+
+
+@dataclass
+class Ratings:
+    elo: np.ndarray = field(default_factory=lambda: np.full(N_TEAMS, MEAN))
+    season: int = -1
+    last_date: np.datetime64 = np.datetime64("NaT", "D")
+    applied: set[str] = field(default_factory=set)  # game keys already rated ("YYYY-MM-DD:home:away")
+
+    def get(self, tid: int) -> float:
+        return float(self.elo[tid])
+
+    def win_prob(self, home_ids, away_ids) -> np.ndarray:
+        h, a = np.asarray(home_ids, dtype=np.intp), np.asarray(away_ids, dtype=np.intp)
+        return expected_home(self.elo[h], self.elo[a])
+
+    def apply(self, games: pl.DataFrame) -> pl.DataFrame:
+        """Rate `games` (game_date, home_team_id, away_team_id, margin) in date order, skipping
+        already-applied ones. Returns the new games with their pre-game ratings."""
+        games = games.select(["game_date", "home_team_id", "away_team_id", "margin"]).drop_nulls().with_columns(
+            pl.format("{}:{}:{}", "game_date", "home_team_id", "away_team_id").alias("key"))
+        games = games.filter(~pl.col("key").is_in(list(self.applied))).unique("key", keep="last").sort("game_date")
+        if games.is_empty():
+            return games.with_columns(pl.lit(None, pl.Float64).alias(c) for c in ("elo_home_pre", "elo_away_pre"))
+
+        day = games["game_date"].to_numpy().astype("datetime64[D]")
+        home = games["home_team_id"].to_numpy().astype(np.intp)
+        away = games["away_team_id"].to_numpy().astype(np.intp)
+        margin = games["margin"].to_numpy().astype(np.float64)
+        seasons = season_of(day)
+        pre_home, pre_away = np.empty(len(day)), np.empty(len(day))
+
+        starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+        for lo, hi in zip(starts, np.r_[starts[1:], len(day)]):
+            if seasons[lo] != self.season:
+                if self.season >= 0:
+                    self.elo += SEASON_REVERT * (MEAN - self.elo)
+                self.season = int(seasons[lo])
+            h, a, m = home[lo:hi], away[lo:hi], margin[lo:hi]
+            rh, ra = self.elo[h], self.elo[a]
+            pre_home[lo:hi], pre_away[lo:hi] = rh, ra
+            p = expected_home(rh, ra)
+            won = np.sign(m)
+            outcome = (won + 1.0) / 2.0  # 1 / 0.5 / 0
+            diff = np.where(won >= 0, rh + HOME_ADV - ra, ra - rh - HOME_ADV)
+            delta = K * mov_multiplier(m, diff) * (outcome - p)
+            np.add.at(self.elo, h, delta)
+            np.add.at(self.elo, a, -delta)
+
+        self.last_date = max(day[-1], self.last_date) if not np.isnat(self.last_date) else day[-1]
+        self.applied.update(games["key"].to_list())
+        return games.with_columns(pl.Series("elo_home_pre", pre_home), pl.Series("elo_away_pre", pre_away))
+
+    # --- persistence: one .npz per league ---
+    def save(self, path: str | pathlib.Path) -> None:
+        path = pathlib.Path(path)
+        buf = io.BytesIO()
+        np.savez(buf, elo=self.elo, season=self.season, last_date=self.last_date,
+                 applied=np.array(sorted(self.applied), dtype=str))
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(buf.getvalue())
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str | pathlib.Path) -> "Ratings":
+        with np.load(path) as z:
+            elo = np.full(N_TEAMS, MEAN)
+            elo[: len(z["elo"])] = z["elo"]  # the registry may have grown
+            return cls(elo, int(z["season"]), z["last_date"].astype("datetime64[D]"), set(z["applied"].tolist()))
+
+
+@lru_cache(maxsize=8)
+def _load_cached(path: str, mtime_ns: int) -> Ratings:
+    return Ratings.load(path)
+
+
+def load_ratings(wh_root: str | pathlib.Path = "data/warehouse", league: str = "NBA") -> Ratings:
+    """Persisted ratings, cached in-process until ratings.npz is rewritten."""
+    path = pathlib.Path(wh_root) / league / "ratings.npz"
+    return _load_cached(str(path), path.stat().st_mtime_ns)
+
+
+def results_games(results: pl.LazyFrame, schedule: pl.LazyFrame) -> pl.LazyFrame:
+    """results.parquet + schedule.parquet → (game_date, home_team_id, away_team_id, margin).
+
+    game_date is the US Eastern date of tip-off, which is how team_stats dates
+    games, so a game present in both sources gets the same key.
+    """
+    return (
+        results.select(["game_id", (pl.col("final_home_score") - pl.col("final_away_score")).cast(pl.Float64).alias("margin")])
+        .join(schedule.select(["game_id", "start_time_utc", "home_team_id", "away_team_id"]), on="game_id", how="inner")
+        .select([
+            pl.col("start_time_utc").dt.replace_time_zone("UTC").dt.convert_time_zone("America/New_York")
+            .dt.date().alias("game_date"),
+            pl.col("home_team_id").cast(pl.UInt16), pl.col("away_team_id").cast(pl.UInt16), "margin",
+        ])
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--league", default="NBA")
+    ap.add_argument("--full", action="store_true", help="Re-rate the whole history from scratch")
+    args = ap.parse_args()
+    s = load_settings()
+
+    wh = pathlib.Path(s.paths["warehouse"]) / args.league
+    out_path = wh / "ratings.npz"
+    stats_path, results_path, schedule_path = wh / "team_stats.parquet", wh / "results.parquet", wh / "schedule.parquet"
+
+    t0 = time.perf_counter()
+    ratings = Ratings() if args.full or not out_path.exists() else Ratings.load(out_path)
+    before = len(ratings.applied)
+
+    # Historical games, then finished games from results; keys skip anything already rated
+    sources = []
+    if stats_path.exists():
+        sources.append(game_results(pl.scan_parquet(stats_path)).select(["game_date", "home_team_id", "away_team_id", "margin"]))
+    if results_path.exists() and schedule_path.exists():
+        sources.append(results_games(pl.scan_parquet(results_path), pl.scan_parquet(schedule_path)))
+    if not sources:
+        raise FileNotFoundError(f"no team_stats.parquet or results.parquet + schedule.parquet under {wh}")
+    games = pl.concat(sources, how="vertical_relaxed").collect()
+    prev_last = ratings.last_date
+    new = ratings.apply(games)
+    late = 0 if np.isnat(prev_last) else int((new["game_date"].to_numpy() < prev_last).sum())
+    if late:
+        # rated now, after games dated later than them; a --full run restores strict date order
+        print(f"[ratings] ⚠️ {late} new games predate {prev_last}")
+    ratings.save(out_path)
+    _load_cached.cache_clear()
+
+    top = np.argsort(-ratings.elo)[:5]
+    names = dict(zip(TEAMS["team_id"].to_list(), TEAMS["abbr"].to_list()))
+    print(f"[ratings] ✅ rated {new.height} new games ({before} before) through {ratings.last_date} "
+          f"in {time.perf_counter() - t0:.2f}s → {out_path}")
+    print("[ratings] top: " + ", ".join(f"{names.get(int(t), t)} {ratings.elo[t]:.0f}" for t in top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+import datetime as dt, hashlib, io, json, pathlib, time
+from functools import lru_cache
+from typing import TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:  # sklearn is never needed to load; lightgbm only by load_model
+    import lightgbm as lgb
+    from sklearn.isotonic import IsotonicRegression
+
+# Versioned local model registry. A version is a directory under
+# artifacts/<league>/models/ holding the boosters as LightGBM text
+# (model.txt, or model-<k>.txt for a fold ensemble), the isotonic calibrator
+# as its two threshold arrays (calibrator.npz) and manifest.json: feature
+# names, file hashes, a content hash and whatever the trainer recorded.
+# models/LATEST names the current version. Nothing is pickled, so loading
+# needs neither the sklearn version that trained it nor joblib, and a
+# loaded model stays in memory until its manifest is rewritten.
+MANIFEST = "manifest.json"
+
+
+def new_version(root: pathlib.Path) -> str:
+    """Timestamped version name, unique under `root`."""
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    version, n = stamp, 1
+    while (root / version).exists():
+        version, n = f"{stamp}-{n}", n + 1
+    return version
+
+
+def read_latest(root: pathlib.Path) -> str | None:
+    latest = root / "LATEST"
+    return latest.read_text().strip() if latest.exists() else None
+
+
+def set_latest(root: pathlib.Path, version: str) -> None:
+    tmp = root / "LATEST.tmp"
+    tmp.write_text(version)
+    tmp.replace(root / "LATEST")
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class Model:
+    """Registry model: mean P(label=1) over LightGBM boosters, then the isotonic map.
+
+    `predict(X)` gives the raw probability, `calibrate(p_raw)` the calibrated one and
+    `predict_proba(X)` both steps. DataFrames are reordered to `features` by name.
+    """
+
+    def __init__(self, boosters: list[lgb.Booster], x_thresholds: np.ndarray, y_thresholds: np.ndarray,
+                 manifest: dict):
+        self.boosters = boosters
+        self.x_thresholds, self.y_thresholds = x_thresholds, y_thresholds
+        self.manifest = manifest
+
+    @property
+    def features(self) -> list[str]:
+        return self.manifest["features"]
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    def _matrix(self, X) -> np.ndarray:
+        if hasattr(X, "columns"):
+            X = X[self.features]
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"expected {len(self.features)} feature columns {self.features}, got shape {X.shape}")
+        return X
+
+    def predict(self, X) -> np.ndarray:
+        X = self._matrix(X)
+        return np.mean([b.predict(X) for b in self.boosters], axis=0)
+
+    def calibrate(self, p_raw) -> np.ndarray:
+        # IsotonicRegression(out_of_bounds="clip").predict is linear interpolation between thresholds
+        return np.interp(np.asarray(p_raw, dtype=np.float64).ravel(), self.x_thresholds, self.y_thresholds)
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = self.calibrate(self.predict(X))
+        return np.column_stack([1.0 - p, p])
+
+
+def save_model(art_dir: str | pathlib.Path, boosters: list[lgb.Booster], iso: IsotonicRegression,
+               features: list[str], **meta) -> pathlib.Path:
+    """Register a new version under <art_dir>/models/ and make it LATEST. Returns its directory."""
+    root = pathlib.Path(art_dir) / "models"
+    root.mkdir(parents=True, exist_ok=True)
+    version = new_version(root)
+    names = ["model.txt"] if len(boosters) == 1 else [f"model-{k}.txt" for k in range(len(boosters))]
+    files = {name: b.model_to_string().encode() for name, b in zip(names, boosters)}
+    files["calibrator.npz"] = _npz(iso)
+
+    hashes = {name: _sha256(data) for name, data in files.items()}
+    manifest = {
+        "version": version,
+        "created_utc": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        "features": list(features),
+        "models": names,
+        "files": hashes,
+        "content_hash": _sha256("".join(hashes[n] for n in sorted(hashes)).encode()),
+        **meta,
+    }
+    # Built beside the registry, then renamed in whole: readers never see a partial version
+    tmp = root / f".{version}.tmp"
+    tmp.mkdir()
+    for name, data in files.items():
+        (tmp / name).write_bytes(data)
+    (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2, default=str))
+    tmp.rename(root / version)
+    set_latest(root, version)
+    return root / version
+
+
+def _npz(iso: IsotonicRegression) -> bytes:
+    buf = io.BytesIO()
+    np.savez(buf, x=np.asarray(iso.X_thresholds_, dtype=np.float64), y=np.asarray(iso.y_thresholds_, dtype=np.float64))
+    return buf.getvalue()
+
+
+def read_version(vdir: pathlib.Path) -> tuple[dict, dict[str, bytes], np.ndarray, np.ndarray]:
+    """(manifest, model texts by file name, calibrator x, y) of a version, hash-checked."""
+    manifest = json.loads((vdir / MANIFEST).read_text())
+    data = {name: (vdir / name).read_bytes() for name in manifest["files"]}
+    bad = [name for name, blob in data.items() if _sha256(blob) != manifest["files"][name]]
+    if bad:
+        raise ValueError(f"{vdir}: {', '.join(bad)} do not match the manifest hashes")
+    with np.load(io.BytesIO(data.pop("calibrator.npz"))) as z:
+        x, y = z["x"], z["y"]
+    return manifest, data, x, y
+
+
+@lru_cache(maxsize=8)
+def _load_cached(vdir: str, mtime_ns: int) -> Model:
+    import lightgbm as lgb
+    manifest, texts, x, y = read_version(pathlib.Path(vdir))
+    boosters = [lgb.Booster(model_str=texts[name].decode()) for name in manifest["models"]]
+    return Model(boosters, x, y, manifest)
+
+
+def model_dir(art_dir: str | pathlib.Path, version: str | None = None) -> pathlib.Path:
+    """Directory of `version` (default: LATEST) under <art_dir>/models/."""
+    root = pathlib.Path(art_dir) / "models"
+    version = version or read_latest(root)
+    if version is None or not (root / version / MANIFEST).exists():
+        raise FileNotFoundError(f"No registered model in {root} — run make train first.")
+    return root / version
+
+
+def load_model(art_dir: str | pathlib.Path, version: str | None = None) -> Model:
+    """Registered model (default: LATEST), cached in-process until its manifest is rewritten."""
+    vdir = model_dir(art_dir, version)
+    return _load_cached(str(vdir), (vdir / MANIFEST).stat().st_mtime_ns)
+
+
+def list_versions(art_dir: str | pathlib.Path) -> list[str]:
+    root = pathlib.Path(art_dir) / "models"
+    return sorted(p.name for p in root.iterdir() if (p / MANIFEST).exists()) if root.exists() else []
+
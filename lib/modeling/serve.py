@@ -0,0 +1,294 @@
+from __future__ import annotations
+import argparse, asyncio, json, pathlib, socket, time
+from collections import deque
+import numpy as np
+from lib.common.settings import load_settings
+from lib.modeling.fast_predict import load_fast
+from lib.modeling.feature_store import LiveFeatures, model_inputs
+from lib.utils.team_registry import team_id
+
+# Long-lived scoring daemon. One process keeps every league's compiled model
+# (fast_predict; a background task swaps in newly registered versions), team stats
+# and latest odds (the shared FeatureStore) in memory and answers JSON-lines
+# requests on a Unix socket or 127.0.0.1:<port>. Requests for a league queue
+# into one micro-batcher: it takes whatever is waiting, lets max_wait_ms pass
+# for more to arrive, then scores the whole batch in one predict_proba call.
+#
+#   python -m lib.modeling.serve                        # serve every configured league
+#   python -m lib.modeling.serve --stats                # p50/p99 of a running server
+#   {"op": "matchup", "league": "NBA", "home": "Boston Celtics", "away": "New York Knicks"}
+#   {"op": "market", "league": "NBA", "home_price": 1.8, "away_price": 2.1}
+LATENCY_WINDOW = 10_000  # most recent requests kept for percentiles
+
+
+def serve_config(**overrides) -> dict:
+    cfg = {"socket": "artifacts/serve.sock", "port": None, "max_batch": 256, "max_wait_ms": 2, "timeout_s": 2.0,
+           **(load_settings().serve or {})}
+    cfg.update({k: v for k, v in overrides.items() if v is not None})
+    return cfg
+
+
+def request(payload: dict, cfg: dict | None = None) -> dict | None:
+    """One round trip to a running server; None when nothing answers (callers then score in-process)."""
+    cfg = cfg or serve_config()
+    try:
+        if cfg.get("port"):
+            sock = socket.create_connection(("127.0.0.1", int(cfg["port"])), timeout=cfg["timeout_s"])
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(cfg["timeout_s"])
+            sock.connect(str(cfg["socket"]))
+    except OSError:
+        return None
+    try:
+        with sock, sock.makefile("rb") as f:
+            sock.sendall(json.dumps(payload).encode() + b"\n")
+            line = f.readline()
+    except OSError:
+        return None
+    return json.loads(line) if line else None
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row requests for one league into one model call."""
+
+    def __init__(self, art_dir: str | pathlib.Path, max_batch: int = 256, max_wait_s: float = 0.002):
+        self.art_dir = pathlib.Path(art_dir)
+        self.max_batch, self.max_wait_s = max_batch, max_wait_s
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.sizes: deque[int] = deque(maxlen=LATENCY_WINDOW)
+        self.batches = 0
+        self.model = None
+        self._task: asyncio.Task | None = None
+
+    def reload(self) -> None:
+        """Resolve the registry's LATEST compiled model (disk reads: run off the event loop)."""
+        self.model = load_fast(self.art_dir)
+
+    def current(self):
+        """The model requests are scored with; swapped by reload(), never read from disk here."""
+        if self.model is None:
+            raise FileNotFoundError(f"no model loaded from {self.art_dir}")
+        return self.model
+
+    async def score(self, x: np.ndarray, model) -> tuple[float, int, str]:
+        """P(home) for one row of `model`'s features, plus the batch size it was scored in and the model version."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        fut = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((x, model, fut))
+        return await fut
+
+    def _drain(self, items: list) -> None:
+        while len(items) < self.max_batch and not self.queue.empty():
+            items.append(self.queue.get_nowait())
+
+    async def _run(self) -> None:
+        while True:
+            items = [await self.queue.get()]
+            self._drain(items)
+            if len(items) < self.max_batch and self.max_wait_s > 0:
+                await asyncio.sleep(self.max_wait_s)
+                self._drain(items)
+            # Rows are scored by the model their features were picked for; only a
+            # batch straddling a reload holds two
+            for model in {id(m): m for _, m, _ in items}.values():
+                group = [(x, fut) for x, m, fut in items if m is model]
+                try:
+                    p = model.predict_proba(np.vstack([x for x, _ in group]))[:, 1]
+                except Exception as e:
+                    for _, fut in group:
+                        if not fut.done():
+                            fut.set_exception(e)
+                    continue
+                for (_, fut), pi in zip(group, p):
+                    if not fut.done():
+                        fut.set_result((float(pi), len(items), model.version))
+            self.sizes.append(len(items))
+            self.batches += 1
+
+
+class PredictionServer:
+    def __init__(self, leagues: list[str], wh_root: str | pathlib.Path = "data/warehouse",
+                 art_root: str | pathlib.Path = "artifacts", max_batch: int = 256, max_wait_s: float = 0.002,
+                 devig_method: str = "multiplicative"):
+        self.leagues = leagues
+        self.devig_method = devig_method  # features.devig_method: market rows match the training features
+        self.art_root = pathlib.Path(art_root)
+        self.live = {lg: LiveFeatures(wh_root, lg, devig_method=devig_method) for lg in leagues}
+        self.batchers = {lg: MicroBatcher(self.art_root / lg, max_batch, max_wait_s) for lg in leagues}
+        self.latency_ms: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.requests = self.errors = 0
+
+    def warm(self) -> None:
+        """Compile each league's model and load its stats/odds/ratings now rather than on the first request."""
+        for lg in self.leagues:
+            try:
+                self.batchers[lg].reload()
+                print(f"[serve] {lg}: model {self.batchers[lg].model.version}")
+            except FileNotFoundError as e:
+                print(f"[serve] ⚠️ {lg}: {e}")
+            print(f"[serve] {lg}: loaded {self.live[lg].refresh() or 'nothing'} from the warehouse")
+
+    async def _reload(self) -> None:
+        # Everything that touches disk: the registry's LATEST model and the warehouse
+        # parquet, in a worker thread, never on the event loop
+        for lg in self.leagues:
+            for step in (self.batchers[lg].reload, self.live[lg].refresh):
+                try:
+                    await asyncio.to_thread(step)
+                except Exception as e:
+                    print(f"[serve] ⚠️ {lg}: {step.__qualname__} failed: {e!r}")
+
+    async def _refresh(self, every_s: float) -> None:
+        # Often enough that store entries are replaced before their TTL lapses, and a
+        # newly registered model is picked up within every_s
+        while True:
+            await asyncio.sleep(every_s)
+            await self._reload()
+
+    # --- request handling ---
+    async def _matchup(self, req: dict) -> dict:
+        from lib.modeling.live_predict import matchup_inputs  # live_predict imports this module's client
+
+        if req["league"] != "NBA":
+            raise ValueError("matchup resolves NBA team names; use op=market for other leagues")
+        info, X = matchup_inputs(req["home"], req["away"], self.live[req["league"]])
+        if info["home_odds"] is None:
+            return {**info, "p": None}  # no price to score against yet
+        batcher = self.batchers[req["league"]]
+        model = batcher.current()
+        p, batch, version = await batcher.score(model_inputs(X, model.features)[0], model)
+        return {**info, "p": p, "batch": batch, "model": version}
+
+    async def _market(self, req: dict) -> dict:
+        league = req["league"]
+        model = self.batchers[league].current()
+        # Team names are optional (no name: form features NaN), but a given name must resolve
+        ids = [self._team_id(req.get(side), league) for side in ("home", "away")]
+        row = self.live[league].game_rows([ids[0]], [ids[1]], [float(req["home_price"])], [float(req["away_price"])])
+        p, batch, version = await self.batchers[league].score(model_inputs(row, model.features)[0], model)
+        return {"p": p, "batch": batch, "model": version}
+
+    @staticmethod
+    def _team_id(name: str | None, league: str) -> int | None:
+        if not name:
+            return None
+        tid = team_id(name, league)
+        if tid is None:
+            raise ValueError(f"unknown {league} team {name!r}")
+        return tid
+
+    async def dispatch(self, req: dict) -> dict:
+        op = req.get("op")
+        if op == "stats":
+            return self.stats()
+        if op == "ping":
+            return {"leagues": self.leagues}
+        if op not in ("matchup", "market"):
+            raise ValueError(f"unknown op {op!r}; expected matchup, market, stats or ping")
+        if req.get("league") not in self.batchers:
+            raise ValueError(f"league {req.get('league')!r} is not served (serving {', '.join(self.leagues)})")
+        return await (self._matchup(req) if op == "matchup" else self._market(req))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                t0 = time.perf_counter()
+                try:
+                    req = json.loads(line)
+                    resp = {"ok": True, **await self.dispatch(req)}
+                except Exception as e:
+                    self.errors += 1
+                    resp = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                if resp.get("p") is not None:
+                    self.requests += 1
+                    self.latency_ms.append((time.perf_counter() - t0) * 1e3)
+                writer.write(json.dumps(resp).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def stats(self) -> dict:
+        lat = np.array(self.latency_ms) if self.latency_ms else np.full(1, np.nan)
+        sizes = [s for b in self.batchers.values() for s in b.sizes]
+        return {
+            "requests": self.requests, "errors": self.errors, "batches": sum(b.batches for b in self.batchers.values()),
+            "p50_ms": float(np.percentile(lat, 50)), "p99_ms": float(np.percentile(lat, 99)),
+            "mean_batch": float(np.mean(sizes)) if sizes else 0.0, "max_batch": max(sizes, default=0),
+        }
+
+    async def serve(self, socket_path: str | pathlib.Path | None = None, port: int | None = None,
+                    ready: asyncio.Event | None = None, report_s: float = 0) -> None:
+        if port:
+            server = await asyncio.start_server(self.handle, "127.0.0.1", port)
+            where = f"127.0.0.1:{port}"
+        else:
+            socket_path = pathlib.Path(socket_path)
+            socket_path.parent.mkdir(parents=True, exist_ok=True)
+            socket_path.unlink(missing_ok=True)  # left behind by a server that was killed
+            server = await asyncio.start_unix_server(self.handle, str(socket_path))
+            where = str(socket_path)
+        if any(b.model is None for b in self.batchers.values()):
+            await self._reload()  # not warmed: resolve models and features before the first request
+        print(f"[serve] ✅ Listening on {where} for {', '.join(self.leagues)}")
+        if ready is not None:
+            ready.set()
+        async with server:
+            stores = {id(live.store): live.store for live in self.live.values()}.values()
+            tasks = [asyncio.create_task(self._refresh(min(s.ttl_s for s in stores) / 2))]
+            if report_s > 0:
+                tasks.append(asyncio.create_task(self._report(report_s)))
+            try:
+                await server.serve_forever()
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def _report(self, every_s: float) -> None:
+        while True:
+            await asyncio.sleep(every_s)
+            s = self.stats()
+            print(f"[serve] {s['requests']:,} requests  p50={s['p50_ms']:.2f}ms  p99={s['p99_ms']:.2f}ms  "
+                  f"mean batch={s['mean_batch']:.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--leagues", default=None, help="Comma list; defaults to config leagues")
+    ap.add_argument("--socket", default=None, help="Unix socket path (serve.socket)")
+    ap.add_argument("--port", type=int, default=None, help="Listen on 127.0.0.1:<port> instead of a socket")
+    ap.add_argument("--max_batch", type=int, default=None)
+    ap.add_argument("--max_wait_ms", type=float, default=None)
+    ap.add_argument("--report_s", type=float, default=60.0, help="Seconds between latency reports (0 = off)")
+    ap.add_argument("--stats", action="store_true", help="Print a running server's latency stats and exit")
+    args = ap.parse_args()
+    s = load_settings()
+    cfg = serve_config(socket=args.socket, port=args.port, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+    if args.stats:
+        resp = request({"op": "stats"}, cfg)
+        if resp is None:
+            raise SystemExit(f"[serve] ❌ No server on {cfg['port'] or cfg['socket']}")
+        print(f"[serve] {resp['requests']:,} requests ({resp['errors']} errors)  p50={resp['p50_ms']:.2f}ms  "
+              f"p99={resp['p99_ms']:.2f}ms  mean batch={resp['mean_batch']:.1f} (max {resp['max_batch']})")
+        return
+
+    leagues = args.leagues.split(",") if args.leagues else list(s.leagues or ["NBA"])
+    server = PredictionServer(leagues, s.paths["warehouse"], s.paths["artifacts"],
+                              int(cfg["max_batch"]), float(cfg["max_wait_ms"]) / 1e3,
+                              (s.features or {}).get("devig_method", "multiplicative"))
+    server.warm()
+    try:
+        asyncio.run(server.serve(cfg["socket"], cfg["port"], report_s=args.report_s))
+    except KeyboardInterrupt:
+        print("\n[serve] stopped")
+    finally:
+        if not cfg["port"]:
+            pathlib.Path(cfg["socket"]).unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,32 @@
 from __future__ import annotations
-import argparse, pathlib, joblib, mlflow
-import numpy as np, pandas as pd, lightgbm as lgb
-from sklearn.model_selection import StratifiedKFold
-from sklearn.calibration import CalibratedClassifierCV
+import argparse, pathlib, time, mlflow
+import numpy as np, pandas as pd
 from sklearn.metrics import log_loss, brier_score_loss, roc_auc_score
 from lib.common.settings import load_settings
+from lib.modeling.calibration import fit_isotonic, refit, train_oof
+from lib.modeling.cv import FEATURE_COLS, base_params, cached_dataset, refit_dataset, train_walk_forward
+from lib.modeling.registry import save_model
+from lib.modeling.tune import load_best
+
+
+def scores(y: np.ndarray, p: np.ndarray) -> dict:
+    return {"brier": brier_score_loss(y, p), "logloss": log_loss(y, p), "auc": roc_auc_score(y, p)}
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--league", default="NBA")
+    ap.add_argument("--folds", type=int, default=None, help="CV folds; defaults to lgbm.n_splits")
+    ap.add_argument("--jobs", type=int, default=None, help="Folds trained concurrently (default: one per core)")
+    ap.add_argument("--refit", action="store_true",
+                    help="Ship one booster refit on all rows instead of the fold ensemble (always on for walk_forward)")
+    ap.add_argument("--cv", choices=["walk_forward", "kfold"], default=None,
+                    help="walk_forward: train on the past, validate on the next block (lgbm.cv); kfold: shuffled")
+    ap.add_argument("--by", choices=["season", "date"], default=None, help="walk_forward blocks (lgbm.walk_forward_by)")
+    ap.add_argument("--threads", type=int, default=None, help="Thread budget shared by concurrent folds")
+    ap.add_argument("--untuned", action="store_true", help="Ignore the latest tuned params (lib.modeling.tune)")
     args = ap.parse_args()
     s = load_settings()
-
     wh = pathlib.Path(s.paths["warehouse"]) / args.league
     out_dir = pathlib.Path("artifacts") / args.league
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -22,89 +36,88 @@ def main():
         raise FileNotFoundError(f"{features_path} missing — run make features first.")
 
     df = pd.read_parquet(features_path)
-    print(f"[train] Loaded {len(df):,} samples with labels (unique labels={df['label'].nunique()})")
+    # Upcoming and in-play games have feature rows but no label yet
+    unlabeled = int(df["label"].isna().sum())
+    df = df[df["label"].notna()]
+    print(f"[train] Loaded {len(df):,} samples with labels (unique labels={df['label'].nunique()}, "
+          f"{unlabeled:,} unlabeled skipped)")
 
-    feature_cols = ["imp_prob_mean", "vig_spread", "home_away_ratio"]
+    feature_cols = FEATURE_COLS
     X = df[feature_cols].to_numpy()
     y = df["label"].astype(int).to_numpy()
 
     print(f"[train] X shape={X.shape}, y shape={y.shape}")
     print(f"[train] Label distribution: {dict(zip(*np.unique(y, return_counts=True)))}")
 
-    params = dict(
-        objective="binary",
-        metric="binary_logloss",
-        boosting_type="gbdt",
-        learning_rate=0.05,
-        num_leaves=64,
-        min_data_in_leaf=50,
-        feature_fraction=0.9,
-        bagging_fraction=0.8,
-        bagging_freq=5,
-        verbose=-1,
-        n_jobs=-1,
-        random_state=42,
-    )
+    lgbm_cfg = s.lgbm or {}
+    params = base_params(lgbm_cfg)
+    tuned = None if args.untuned else load_best(out_dir)
+    if tuned:
+        params = {**params, **tuned["params"]}
+        print(f"[train] Using tuned params {tuned['version']} (walk-forward logloss={tuned['score']:.4f})")
+    n_splits = args.folds or lgbm_cfg.get("n_splits", 5)
+    cv = args.cv or lgbm_cfg.get("cv", "walk_forward")
+    if cv == "walk_forward" and "game_date" not in df.columns:
+        print("[train] ⚠️ features.parquet has no game_date (rebuild features); falling back to kfold")
+        cv = "kfold"
 
     # ------------------------------
-    # Cross-validation
+    # Out-of-fold training: folds in parallel, each early-stopped on its held-out part
     # ------------------------------
-    n_splits = 2
-    skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
-    briers, loglosses, aucs = [], [], []
-
-    for fold, (train_idx, val_idx) in enumerate(skf.split(X, y), 1):
-        Xtr, Xval, ytr, yval = X[train_idx], X[val_idx], y[train_idx], y[val_idx]
-
-        model = lgb.LGBMClassifier(**params, n_estimators=300)
-
-        # ✅ Use callbacks instead of early_stopping_rounds
-        callbacks = [lgb.early_stopping(stopping_rounds=30, verbose=False)]
-
-        model.fit(
-            Xtr, ytr,
-            eval_set=[(Xval, yval)],
-            eval_metric="binary_logloss",
-            callbacks=callbacks,
-        )
-
-        p_raw = model.predict_proba(Xval)[:, 1]
-        brier = brier_score_loss(yval, p_raw)
-        ll = log_loss(yval, p_raw)
-        auc = roc_auc_score(yval, p_raw)
-        briers.append(brier)
-        loglosses.append(ll)
-        aucs.append(auc)
-        print(f"  fold {fold}: Brier={brier:.4f}, LogLoss={ll:.4f}, AUC={auc:.4f}")
-
-    print(f"[train] Mean metrics → Brier={np.mean(briers):.4f}, LogLoss={np.mean(loglosses):.4f}, AUC={np.mean(aucs):.4f}")
+    t0 = time.perf_counter()
+    if cv == "walk_forward":
+        # Binned once (cached across runs under artifacts/<league>/datasets); folds and refit are subsets
+        by = args.by or lgbm_cfg.get("walk_forward_by", "season")
+        dataset, hit = cached_dataset(X, y, feature_cols, params, out_dir / "datasets")
+        print(f"[train] {'Loaded cached' if hit else 'Binned'} LightGBM dataset in {time.perf_counter() - t0:.2f}s")
+        res = train_walk_forward(X, y, df["game_date"].to_numpy(), params, dataset,
+                                 n_splits=n_splits, by=by, jobs=args.jobs, threads=args.threads)
+    else:
+        res = train_oof(X, y, params, n_splits=n_splits, n_jobs=args.jobs)
+    for fold, (it, sec) in enumerate(zip(res.best_iters, res.fold_seconds), 1):
+        in_fold = res.fold_of == fold - 1
+        m = scores(y[in_fold], res.oof[in_fold])
+        print(f"  fold {fold}: Brier={m['brier']:.4f}, LogLoss={m['logloss']:.4f}, AUC={m['auc']:.4f} "
+              f"(best_iter={it}, {sec:.1f}s)")
+
+    held = res.held
+    raw = scores(y[held], res.oof[held])
+    cal = scores(y[held], res.cross_calibrated(y, forward=cv == "walk_forward")[held])
+    print(f"[train] OOF raw        → Brier={raw['brier']:.4f}, LogLoss={raw['logloss']:.4f}, AUC={raw['auc']:.4f}")
+    print(f"[train] OOF calibrated → Brier={cal['brier']:.4f}, LogLoss={cal['logloss']:.4f}, AUC={cal['auc']:.4f}")
 
     # ------------------------------
-    # Final training on all data
+    # Artifact: fold ensemble (no further boosting) or one refit; isotonic on the OOF predictions
     # ------------------------------
-    print("[train] Training final LightGBMClassifier on all data...")
-    model = lgb.LGBMClassifier(**params, n_estimators=300)
-    model.fit(X, y)
-
-    print("[train] Calibrating probability outputs...")
-    cal = CalibratedClassifierCV(model, method="isotonic", cv=3)
-    cal.fit(X, y)
-
-    joblib.dump(model, out_dir / "model.joblib")
-    joblib.dump(cal, out_dir / "calibrator.joblib")
-    print(f"[train] ✅ Saved model + calibrator → {out_dir}")
+    # Walk-forward folds saw different amounts of history, so they're never averaged
+    shipped = "refit" if args.refit or cv == "walk_forward" else f"{n_splits}-fold"
+    if shipped == "refit":
+        rounds = int(np.mean(res.best_iters))
+        print(f"[train] Refitting one booster on all data for {rounds} rounds...")
+        model = (refit_dataset(dataset, params, rounds, args.threads) if cv == "walk_forward"
+                 else refit(X, y, params, rounds))
+    else:
+        model = res.ensemble()
+    iso = fit_isotonic(res.oof[held], y[held])
+
+    vdir = save_model(out_dir, model.boosters, iso, feature_cols, league=args.league, cv=cv, shipped=shipped,
+                      n_rows=len(y), params=params, tuned=tuned["version"] if tuned else None,
+                      metrics={"oof": raw, "oof_cal": cal})
+    print(f"[train] ✅ Registered {shipped} model ({cv}) + calibrator → {vdir} "
+          f"in {time.perf_counter() - t0:.1f}s")
 
     # ------------------------------
     # MLflow logging
     # ------------------------------
     mlflow.set_experiment(args.league)
     with mlflow.start_run(run_name=f"{args.league}_train"):
-        mlflow.log_params(params)
-        mlflow.log_metrics(
-            {"brier_mean": np.mean(briers), "logloss_mean": np.mean(loglosses), "auc_mean": np.mean(aucs)}
-        )
-        mlflow.log_artifact(out_dir / "model.joblib")
-        mlflow.log_artifact(out_dir / "calibrator.joblib")
+        mlflow.log_params({**params, "n_splits": n_splits, "cv": cv, "model": shipped,
+                           "tuned": tuned["version"] if tuned else "none"})
+        mlflow.log_metrics({
+            **{f"oof_{k}": v for k, v in raw.items()},
+            **{f"oof_cal_{k}": v for k, v in cal.items()},
+        })
+        mlflow.log_artifacts(str(vdir), artifact_path="model")
         print("[train] ✅ MLflow logging complete")
 
 
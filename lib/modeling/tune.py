@@ -0,0 +1,210 @@
+from __future__ import annotations
+import argparse, json, math, os, pathlib, time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+import numpy as np, pandas as pd, lightgbm as lgb
+from lib.common.settings import load_settings
+from lib.modeling.cv import (DATASET_PARAMS, FEATURE_COLS, base_params, cached_dataset, dataset_params,
+                             dataset_path, walk_forward_folds)
+from lib.modeling.registry import new_version, read_latest, set_latest
+
+# Hyperparameter search with asynchronous successive halving (ASHA). Each
+# trial samples a config from `tuning.space` and is scored by the validation
+# logloss of the most recent walk-forward folds, trained on subsets of the
+# cached binned Dataset. Trials start at `min_rounds` boosting rounds; as
+# soon as a rung has eta results, its best 1/eta move up to eta x the rounds,
+# so most of the budget goes to the few configs that keep winning. Workers
+# are processes that each load the cached .bin once. The best config is
+# written to artifacts/<league>/tuning/<version>/ and LATEST points at it;
+# train layers it over lgbm.params.
+METRIC = "binary_logloss"
+
+_SUBSETS: list[tuple[lgb.Dataset, lgb.Dataset]] = []
+
+
+def rung_budgets(min_rounds: int, max_rounds: int, eta: int) -> list[int]:
+    """Boosting rounds per rung: min_rounds * eta^k, capped by a final max_rounds rung."""
+    budgets = [min_rounds]
+    while budgets[-1] * eta < max_rounds:
+        budgets.append(budgets[-1] * eta)
+    return budgets + [max_rounds] if budgets[-1] < max_rounds else budgets
+
+
+def sample(space: dict, rng: np.random.Generator) -> dict:
+    """One config from a space of {low, high[, log][, int]} ranges and {choices: [...]} lists."""
+    out = {}
+    for name, spec in space.items():
+        if name in DATASET_PARAMS:
+            raise ValueError(f"tuning.space: {name} shapes the binned dataset and can't vary per trial")
+        if "choices" in spec:
+            out[name] = spec["choices"][rng.integers(len(spec["choices"]))]
+            continue
+        lo, hi = float(spec["low"]), float(spec["high"])
+        v = math.exp(rng.uniform(math.log(lo), math.log(hi))) if spec.get("log") else rng.uniform(lo, hi)
+        out[name] = int(round(v)) if spec.get("int") else float(v)
+    return out
+
+
+def _init_worker(bin_path: str, folds: list[tuple[np.ndarray, np.ndarray]], dparams: dict) -> None:
+    # One load of the cached bins per worker; every trial reuses the fold subsets
+    global _SUBSETS
+    dataset = lgb.Dataset(bin_path, params=dparams).construct()
+    _SUBSETS = [(dataset.subset(tr).construct(), dataset.subset(va).construct()) for tr, va in folds]
+
+
+def _run_trial(params: dict, rounds: int, early_stopping: int) -> tuple:
+    t0 = time.perf_counter()
+    losses, sizes, iters, stopped = [], [], [], True
+    for dtrain, dval in _SUBSETS:
+        booster = lgb.train(params, dtrain, rounds, valid_sets=[dval],
+                            callbacks=[lgb.early_stopping(early_stopping, verbose=False)])
+        losses.append(booster.best_score["valid_0"][METRIC])
+        sizes.append(dval.num_data())
+        iters.append(booster.best_iteration)
+        stopped &= booster.current_iteration() < rounds
+    return float(np.average(losses, weights=sizes)), int(np.mean(iters)), stopped, time.perf_counter() - t0
+
+
+@dataclass
+class TuneResult:
+    params: dict            # sampled values of the best trial (the tuning.space keys)
+    score: float            # its mean walk-forward logloss at the highest rung it reached
+    rounds: int             # mean best iteration across folds
+    base: dict              # params the samples were layered over
+    trials: list[dict] = field(default_factory=list)  # one record per (trial, rung) run
+    seconds: float = 0.0
+
+    def save(self, out_dir: str | pathlib.Path, **meta) -> pathlib.Path:
+        """Write tuning/<version>/{best_params.json,trials.jsonl} and point tuning/LATEST at it."""
+        root = pathlib.Path(out_dir) / "tuning"
+        version = new_version(root)
+        vdir = root / version
+        vdir.mkdir(parents=True)
+        best = {"version": version, "metric": METRIC, "score": self.score, "rounds": self.rounds,
+                "params": self.params, "base": self.base, "n_trials": len({t["trial"] for t in self.trials}),
+                "seconds": round(self.seconds, 2), **meta}
+        (vdir / "best_params.json").write_text(json.dumps(best, indent=2, default=str))
+        (vdir / "trials.jsonl").write_text("".join(json.dumps(t, default=str) + "\n" for t in self.trials))
+        set_latest(root, version)
+        return vdir
+
+
+def load_best(out_dir: str | pathlib.Path, version: str | None = None) -> dict | None:
+    """best_params.json of `version` (default: tuning/LATEST), or None if never tuned."""
+    root = pathlib.Path(out_dir) / "tuning"
+    version = version or read_latest(root)
+    if version is None:
+        return None
+    return json.loads((root / version / "best_params.json").read_text())
+
+
+def asha(bin_path: str | pathlib.Path, folds: list[tuple[np.ndarray, np.ndarray]], base: dict, space: dict,
+         trials: int = 48, eta: int = 3, min_rounds: int = 50, max_rounds: int = 1000, early_stopping: int = 30,
+         jobs: int | None = None, threads: int | None = None, seed: int = 42, log=print) -> TuneResult:
+    """Search `space` over the cached Dataset at `bin_path`, `jobs` trials at a time (jobs=1 runs inline)."""
+    t0 = time.perf_counter()
+    budgets = rung_budgets(min_rounds, max_rounds, eta)
+    rng = np.random.default_rng(seed)
+    threads = threads or os.cpu_count() or 1
+    jobs = max(1, min(trials, jobs or threads))
+    run_params = {**base, "metric": METRIC, "n_jobs": max(1, threads // jobs), "verbose": -1}
+
+    configs: list[dict] = []
+    results: list[dict[int, tuple]] = [{} for _ in budgets]  # per rung: trial -> (score, best_iter, stopped)
+    promoted: list[set[int]] = [set() for _ in budgets]
+    records: list[dict] = []
+
+    def next_job() -> tuple[int, int] | None:
+        # Promotions first, top rung down; otherwise a fresh config at rung 0
+        for r in range(len(budgets) - 2, -1, -1):
+            done = results[r]
+            for t in sorted(done, key=lambda t: done[t][0])[: len(done) // eta]:
+                if t not in promoted[r]:
+                    promoted[r].add(t)
+                    return t, r + 1
+        if len(configs) < trials:
+            configs.append(sample(space, rng))
+            return len(configs) - 1, 0
+        return None
+
+    initargs = (str(bin_path), folds, dataset_params(base))
+    if jobs == 1:
+        _init_worker(*initargs)
+        executor = ThreadPoolExecutor(1)
+    else:
+        executor = ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=initargs)
+
+    running = {}
+    with executor as ex:
+        while True:
+            while len(running) < jobs and (job := next_job()) is not None:
+                t, r = job
+                prev = results[r - 1].get(t) if r else None
+                if prev is not None and prev[2]:
+                    # Early-stopped short of the last budget: more rounds would give the same score
+                    results[r][t] = prev
+                    continue
+                running[ex.submit(_run_trial, {**run_params, **configs[t]}, budgets[r], early_stopping)] = (t, r)
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                t, r = running.pop(fut)
+                score, best_iter, stopped, sec = fut.result()
+                results[r][t] = (score, best_iter, stopped)
+                records.append({"trial": t, "rung": r, "rounds": budgets[r], "score": score,
+                                "best_iter": best_iter, "seconds": round(sec, 3), "params": configs[t]})
+                log(f"  trial {t:>3} rung {r} ({budgets[r]:>4} rounds): {METRIC}={score:.5f} "
+                    f"best_iter={best_iter} ({sec:.1f}s)")
+
+    # Best config at the highest rung anything reached
+    top = next(rung for rung in reversed(results) if rung)
+    t = min(top, key=lambda t: top[t][0])
+    return TuneResult(configs[t], top[t][0], top[t][1], base, records, time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--league", default="NBA", help="League, comma list, or 'all' (config leagues)")
+    ap.add_argument("--trials", type=int, default=None, help="Configs sampled per league (tuning.trials)")
+    ap.add_argument("--jobs", type=int, default=None, help="Trials run concurrently (tuning.jobs; 0 = one per core)")
+    ap.add_argument("--threads", type=int, default=None, help="Thread budget shared by concurrent trials")
+    args = ap.parse_args()
+    s = load_settings()
+    cfg, lgbm_cfg = s.tuning or {}, s.lgbm or {}
+    leagues = s.leagues if args.league == "all" else args.league.split(",")
+    jobs = args.jobs if args.jobs is not None else cfg.get("jobs", 0)
+
+    for league in leagues:
+        features_path = pathlib.Path(s.paths["warehouse"]) / league / "features.parquet"
+        if not features_path.exists():
+            print(f"[tune] ⚠️ {features_path} missing — skipping {league} (run make features first)")
+            continue
+        df = pd.read_parquet(features_path)
+        df = df[df["label"].notna()]  # games without a result yet
+        if "game_date" not in df.columns:
+            print(f"[tune] ⚠️ {league} features have no game_date (rebuild features) — skipping")
+            continue
+        X, y = df[FEATURE_COLS].to_numpy(), df["label"].astype(int).to_numpy()
+        out_dir = pathlib.Path("artifacts") / league
+        base = base_params(lgbm_cfg)
+
+        t0 = time.perf_counter()
+        _, hit = cached_dataset(X, y, FEATURE_COLS, base, out_dir / "datasets")
+        bin_path = dataset_path(out_dir / "datasets", X, y, FEATURE_COLS, base)
+        folds = walk_forward_folds(df["game_date"].to_numpy(), cfg.get("n_splits", 3), lgbm_cfg.get("walk_forward_by", "season"))
+        print(f"[tune] {league}: {len(y):,} rows, {len(folds)} walk-forward folds, "
+              f"{'cached' if hit else 'binned'} dataset in {time.perf_counter() - t0:.2f}s")
+
+        res = asha(bin_path, folds, base, cfg.get("space", {}), trials=args.trials or cfg.get("trials", 48),
+                   eta=cfg.get("eta", 3), min_rounds=cfg.get("min_rounds", 50), max_rounds=cfg.get("max_rounds", 1000),
+                   early_stopping=cfg.get("early_stopping", 30), jobs=jobs or None, threads=args.threads,
+                   seed=cfg.get("seed", 42))
+        vdir = res.save(out_dir, league=league, dataset=bin_path.stem, n_splits=len(folds))
+        print(f"[tune] ✅ {league}: best {METRIC}={res.score:.5f} at {res.rounds} rounds "
+              f"({len(res.trials)} runs, {res.seconds:.1f}s) → {vdir}")
+        print(f"       {json.dumps(res.params)}")
+
+
+if __name__ == "__main__":
+    main()
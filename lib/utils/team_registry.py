@@ -0,0 +1,161 @@
+from __future__ import annotations
+import re
+from difflib import get_close_matches
+from functools import lru_cache
+import polars as pl
+from lib.utils.team_name_map import NBA_TEAM_ALIASES
+
+# (canonical name, abbreviation, nba_api TEAM_ID, extra vendor spellings)
+NBA = [
+    ("Atlanta Hawks", "ATL", 1610612737, []),
+    ("Boston Celtics", "BOS", 1610612738, []),
+    ("Brooklyn Nets", "BKN", 1610612751, ["New Jersey Nets", "BRK", "NJN"]),
+    ("Charlotte Hornets", "CHA", 1610612766, ["Charlotte Bobcats", "CHO"]),
+    ("Chicago Bulls", "CHI", 1610612741, []),
+    ("Cleveland Cavaliers", "CLE", 1610612739, ["Cleveland Cavs"]),
+    ("Dallas Mavericks", "DAL", 1610612742, ["Dallas Mavs"]),
+    ("Denver Nuggets", "DEN", 1610612743, []),
+    ("Detroit Pistons", "DET", 1610612765, []),
+    ("Golden State Warriors", "GSW", 1610612744, ["GS"]),
+    ("Houston Rockets", "HOU", 1610612745, []),
+    ("Indiana Pacers", "IND", 1610612754, []),
+    ("Los Angeles Clippers", "LAC", 1610612746, []),
+    ("Los Angeles Lakers", "LAL", 1610612747, ["LA Lakers"]),
+    ("Memphis Grizzlies", "MEM", 1610612763, ["Vancouver Grizzlies"]),
+    ("Miami Heat", "MIA", 1610612748, []),
+    ("Milwaukee Bucks", "MIL", 1610612749, []),
+    ("Minnesota Timberwolves", "MIN", 1610612750, ["Minnesota Wolves"]),
+    ("New Orleans Pelicans", "NOP", 1610612740, ["New Orleans Hornets", "NO"]),
+    ("New York Knicks", "NYK", 1610612752, ["NY"]),
+    ("Oklahoma City Thunder", "OKC", 1610612760, ["Seattle SuperSonics"]),
+    ("Orlando Magic", "ORL", 1610612753, []),
+    ("Philadelphia 76ers", "PHI", 1610612755, ["Philadelphia Sixers", "Sixers"]),
+    ("Phoenix Suns", "PHX", 1610612756, ["PHO"]),
+    ("Portland Trail Blazers", "POR", 1610612757, ["Portland Blazers", "Blazers"]),
+    ("Sacramento Kings", "SAC", 1610612758, []),
+    ("San Antonio Spurs", "SAS", 1610612759, ["SA"]),
+    ("Toronto Raptors", "TOR", 1610612761, []),
+    ("Utah Jazz", "UTA", 1610612762, ["UTAH"]),
+    ("Washington Wizards", "WAS", 1610612764, ["WSH"]),
+]
+NFL = [
+    ("Arizona Cardinals", "ARI", None, []),
+    ("Atlanta Falcons", "ATL", None, []),
+    ("Baltimore Ravens", "BAL", None, []),
+    ("Buffalo Bills", "BUF", None, []),
+    ("Carolina Panthers", "CAR", None, []),
+    ("Chicago Bears", "CHI", None, []),
+    ("Cincinnati Bengals", "CIN", None, []),
+    ("Cleveland Browns", "CLE", None, []),
+    ("Dallas Cowboys", "DAL", None, []),
+    ("Denver Broncos", "DEN", None, []),
+    ("Detroit Lions", "DET", None, []),
+    ("Green Bay Packers", "GB", None, ["GNB"]),
+    ("Houston Texans", "HOU", None, []),
+    ("Indianapolis Colts", "IND", None, []),
+    ("Jacksonville Jaguars", "JAX", None, ["JAC"]),
+    ("Kansas City Chiefs", "KC", None, ["KAN"]),
+    ("Las Vegas Raiders", "LV", None, ["Oakland Raiders", "LVR", "OAK"]),
+    ("Los Angeles Chargers", "LAC", None, ["San Diego Chargers", "LA Chargers", "SD"]),
+    ("Los Angeles Rams", "LAR", None, ["St. Louis Rams", "LA Rams", "STL"]),
+    ("Miami Dolphins", "MIA", None, []),
+    ("Minnesota Vikings", "MIN", None, []),
+    ("New England Patriots", "NE", None, ["NWE"]),
+    ("New Orleans Saints", "NO", None, ["NOR"]),
+    ("New York Giants", "NYG", None, []),
+    ("New York Jets", "NYJ", None, []),
+    ("Philadelphia Eagles", "PHI", None, []),
+    ("Pittsburgh Steelers", "PIT", None, []),
+    ("San Francisco 49ers", "SF", None, ["SFO"]),
+    ("Seattle Seahawks", "SEA", None, []),
+    ("Tampa Bay Buccaneers", "TB", None, ["TAM"]),
+    ("Tennessee Titans", "TEN", None, []),
+    ("Washington Commanders", "WAS", None, ["Washington Football Team", "Washington Redskins", "WSH"]),
+]
+LEAGUES = {"NBA": NBA, "NFL": NFL}
+
+# Compact, contiguous integer IDs: NBA 1..30, NFL 31..62. Append new
+# leagues/teams at the end so existing IDs never move.
+TEAMS = pl.DataFrame(
+    [
+        (tid, league, name, abbr, nba_id)
+        for tid, (league, (name, abbr, nba_id, _)) in enumerate(
+            ((lg, t) for lg, teams in LEAGUES.items() for t in teams), start=1
+        )
+    ],
+    schema={"team_id": pl.UInt16, "league": pl.Utf8, "name": pl.Utf8, "abbr": pl.Utf8, "nba_stats_id": pl.Int64},
+    orient="row",
+)
+TEAM_NAMES: dict[int, str] = dict(zip(TEAMS["team_id"].to_list(), TEAMS["name"].to_list()))
+NBA_STATS_TO_TEAM: dict[int, int] = {
+    r["nba_stats_id"]: r["team_id"] for r in TEAMS.filter(pl.col("nba_stats_id").is_not_null()).iter_rows(named=True)
+}
+
+
+def _key(name: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[.'’]", "", name)).strip().lower()
+
+
+def _build_index() -> dict[str | None, dict[str, int]]:
+    by_league: dict[str | None, dict[str, int]] = {}
+    canonical_id = dict(zip(TEAMS["name"].to_list(), TEAMS["team_id"].to_list()))
+    for r in TEAMS.iter_rows(named=True):
+        league, tid = r["league"], r["team_id"]
+        extra = next(t[3] for t in LEAGUES[league] if t[0] == r["name"])
+        aliases = [r["name"], r["abbr"], r["name"].split()[-1], *extra]
+        if r["nba_stats_id"] is not None:
+            aliases.append(str(r["nba_stats_id"]))
+        idx = by_league.setdefault(league, {})
+        for a in aliases:
+            idx.setdefault(_key(a), tid)
+    for alias, canonical in NBA_TEAM_ALIASES.items():
+        by_league["NBA"].setdefault(_key(alias), canonical_id[canonical])
+
+    # League-less lookups only see keys that are unambiguous across leagues
+    # (abbreviations like DAL/MIA and some nicknames collide).
+    seen: dict[str, set[int]] = {}
+    for idx in by_league.values():
+        for k, tid in idx.items():
+            seen.setdefault(k, set()).add(tid)
+    by_league[None] = {k: ids.pop() for k, ids in seen.items() if len(ids) == 1}
+    return by_league
+
+
+ALIAS_INDEX = _build_index()
+
+
+@lru_cache(maxsize=None)
+def team_id(name: str, league: str | None = None, fuzzy: bool = True) -> int | None:
+    """Alias/vendor spelling → compact team ID. Fuzzy matches are cached per spelling.
+
+    None for spellings nothing matches, and for leagues the registry doesn't cover (e.g. MLB).
+    """
+    idx = ALIAS_INDEX.get(league)
+    if idx is None:
+        return None
+    key = _key(name)
+    if key in idx:
+        return idx[key]
+    if not fuzzy or len(key) < 4:
+        # abbreviations are too short to fuzzy-match safely
+        return None
+    match = get_close_matches(key, list(idx), n=1, cutoff=0.6)
+    return idx[match[0]] if match else None
+
+
+def team_ids(names: pl.Series, league: str | None = None, fuzzy: bool = False) -> pl.Series:
+    """Vectorized: resolves each distinct spelling once, then one replace over the column."""
+    mapping = {raw: team_id(raw, league, fuzzy) for raw in names.drop_nulls().unique().to_list()}
+    return names.replace_strict(mapping, default=None, return_dtype=pl.UInt16)
+
+
+def canonical_names(names: pl.Series, league: str | None = None) -> pl.Series:
+    """Canonical team names; spellings the registry doesn't know pass through unchanged."""
+    ids = team_ids(names, league)
+    return ids.replace_strict(TEAM_NAMES, default=None, return_dtype=pl.Utf8).fill_null(names)
+
+
+def from_nba_stats_id(col: str | pl.Expr) -> pl.Expr:
+    """nba_api TEAM_ID (1610612xxx) → compact team ID, as a Polars expression."""
+    col = pl.col(col) if isinstance(col, str) else col
+    return col.replace_strict(NBA_STATS_TO_TEAM, default=None, return_dtype=pl.UInt16)
@@ -0,0 +1,61 @@
+"""
+Throughput of the batch de-vig kernels on synthetic multi-book quotes:
+every method on 2-way (moneyline) and 3-way (with draw) markets, then the
+long-frame path (one row per outcome tick) and the cross-book consensus.
+
+    poetry run python -m scripts.bench_devig --quotes 1000000 --books 6
+"""
+import argparse, datetime as dt, time
+import numpy as np, polars as pl
+from lib.featurization.devig import METHODS, consensus, devig, fair_probs
+
+
+def synth_quotes(rng: np.random.Generator, n: int, k: int) -> np.ndarray:
+    """(n, k) raw implied probabilities: fair probabilities plus a 2-8% margin."""
+    fair = rng.dirichlet(np.full(k, 4.0), n)
+    return fair * (1.0 + rng.uniform(0.02, 0.08, (n, 1)))
+
+
+def synth_ticks(rng: np.random.Generator, n_games: int, n_ts: int, books: int) -> pl.DataFrame:
+    p = synth_quotes(rng, n_games * n_ts * books, 2)
+    q = np.arange(len(p))
+    t0 = dt.datetime(2025, 1, 1)
+    return pl.DataFrame({
+        "game_id": np.repeat(q // (n_ts * books), 2).astype(str),
+        "ts_utc": pl.Series(np.repeat(q // books % n_ts, 2) * 1000).cast(pl.Duration("ms")) + t0,
+        "book": np.repeat(q % books, 2).astype(str),
+        "runner": np.tile(["HOME", "AWAY"], len(p)),
+        "price_decimal": 1.0 / p.ravel(),
+    })
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--quotes", type=int, default=1_000_000)
+    ap.add_argument("--books", type=int, default=6)
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+
+    for k in (2, 3):
+        p = synth_quotes(rng, args.quotes, k)
+        for m in METHODS:
+            t0 = time.perf_counter()
+            fair = devig(p, m)
+            dt_ = time.perf_counter() - t0
+            err = np.abs(fair.sum(axis=1) - 1).max()
+            print(f"[bench_devig] {k}-way {m:<15} {args.quotes / dt_:12,.0f} quotes/s  max |sum-1|={err:.1e}")
+
+    n_ts = 100
+    ticks = synth_ticks(rng, max(1, args.quotes // (n_ts * args.books)), n_ts, args.books)
+    for m in METHODS:
+        t0 = time.perf_counter()
+        fair_probs(ticks, m)
+        t1 = time.perf_counter()
+        consensus(ticks.lazy(), m).collect()
+        t2 = time.perf_counter()
+        print(f"[bench_devig] frame {m:<15} {ticks.height / (t1 - t0):12,.0f} ticks/s  "
+              f"consensus {ticks.height / (t2 - t1):10,.0f} ticks/s ({ticks.height:,} ticks)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Scoring cost of a registered model through lightgbm (registry.load_model)
+versus the compiled NumPy predictor (fast_predict.load_fast): cold start in
+a fresh process, then µs/row at a few batch sizes, plus the max difference.
+
+    poetry run python -m scripts.bench_fast_predict --trees 300 --leaves 64
+"""
+import argparse, subprocess, sys, tempfile, time
+import numpy as np, lightgbm as lgb
+from lib.modeling.calibration import fit_isotonic
+from lib.modeling.fast_predict import load_fast
+from lib.modeling.registry import load_model, save_model
+
+FEATURES = ["imp_prob_mean", "vig_spread", "home_away_ratio"]
+
+
+def per_row_us(model, X: np.ndarray, min_s: float = 0.5) -> float:
+    model.predict_proba(X)
+    reps, t0 = 0, time.perf_counter()
+    while time.perf_counter() - t0 < min_s:
+        model.predict_proba(X)
+        reps += 1
+    return (time.perf_counter() - t0) / reps / len(X) * 1e6
+
+
+def cold_start(module: str, fn: str, art: str) -> float:
+    code = (f"import time; t = time.perf_counter(); from {module} import {fn}; "
+            f"{fn}({art!r}).predict_proba([[0.5, 0.04, 0.1]]); print(time.perf_counter() - t)")
+    return min(float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+               for _ in range(3))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trees", type=int, default=300)
+    ap.add_argument("--leaves", type=int, default=64)
+    ap.add_argument("--folds", type=int, default=1, help="Boosters averaged (a fold ensemble)")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(50_000, 3))
+    X[::37, 1] = np.nan
+    y = (rng.random(len(X)) < 1 / (1 + np.exp(-(X[:, 0] - np.nan_to_num(X[:, 1]))))).astype(int)
+    params = {"objective": "binary", "num_leaves": args.leaves, "verbose": -1}
+    boosters = [lgb.train({**params, "seed": k}, lgb.Dataset(X, y), args.trees) for k in range(args.folds)]
+    iso = fit_isotonic(np.mean([b.predict(X) for b in boosters], axis=0), y)
+
+    with tempfile.TemporaryDirectory() as art:
+        save_model(art, boosters, iso, FEATURES)
+        ref, fast = load_model(art), load_fast(art)
+        Xt = rng.normal(size=(10_000, 3))
+        diff = np.abs(ref.predict_proba(Xt) - fast.predict_proba(Xt)).max()
+        print(f"[bench_fast_predict] {args.folds} x {args.trees} trees, {args.leaves} leaves; max |Δp| = {diff:.1e}")
+        print(f"  cold start   lightgbm {cold_start('lib.modeling.registry', 'load_model', art):.2f}s   "
+              f"numpy {cold_start('lib.modeling.fast_predict', 'load_fast', art):.2f}s")
+        for rows in (1, 100, 10_000):
+            a, b = per_row_us(ref, Xt[:rows]), per_row_us(fast, Xt[:rows])
+            print(f"  {rows:>6} rows   lightgbm {a:8.2f} µs/row   numpy {b:8.2f} µs/row ({a / b:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
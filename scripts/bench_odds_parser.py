@@ -0,0 +1,84 @@
+"""
+Benchmarks Odds API payload parsing: the old dict-per-row loop vs the
+columnar parser in lib.ingest.odds_parser, on synthetic payloads.
+
+    poetry run python -m scripts.bench_odds_parser --events 10000 --books 20
+"""
+import argparse, json, random, time
+import polars as pl
+from lib.constants.nba_teams import NBA_TEAMS
+from lib.ingest.odds_parser import moneyline_wide, parse_events
+from lib.utils.team_name_map import normalize_name
+
+
+def synthetic_payload(n_events: int, n_books: int, seed: int = 7) -> bytes:
+    rng = random.Random(seed)
+    books = [f"book{i:02d}" for i in range(n_books)]
+    events = []
+    for i in range(n_events):
+        home, away = rng.sample(NBA_TEAMS, 2)
+        bms = []
+        for b in books:
+            p = rng.uniform(0.2, 0.8)
+            ts = f"2025-10-22T18:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}Z"
+            outcomes = [
+                {"name": home, "price": round(1 / p * 0.97, 2)},
+                {"name": away, "price": round(1 / (1 - p) * 0.97, 2)},
+            ]
+            rng.shuffle(outcomes)
+            bms.append({"key": b, "title": b.title(), "last_update": ts,
+                        "markets": [{"key": "h2h", "last_update": ts, "outcomes": outcomes}]})
+        events.append({"id": f"{i:032x}", "sport_key": "basketball_nba", "sport_title": "NBA",
+                       "commence_time": "2025-10-23T00:10:00Z", "home_team": home,
+                       "away_team": away, "bookmakers": bms})
+    return json.dumps(events).encode()
+
+
+def legacy_parse(payload: bytes) -> pl.DataFrame:
+    # The loop the live_odds fetchers used before the columnar parser
+    rows = []
+    for g in json.loads(payload):
+        home, away = normalize_name(g["home_team"]), normalize_name(g["away_team"])
+        for book in g.get("bookmakers", []):
+            outcomes = book["markets"][0].get("outcomes", [])
+            home_price = next((o["price"] for o in outcomes if o["name"] == home), None)
+            away_price = next((o["price"] for o in outcomes if o["name"] == away), None)
+            if home_price is None or away_price is None:
+                continue
+            rows.append({"home_team": home, "away_team": away, "book": book["key"],
+                         "home_odds": float(home_price), "away_odds": float(away_price)})
+    return pl.DataFrame(rows)
+
+
+def bench(fn, payload: bytes, repeat: int) -> tuple[float, pl.DataFrame]:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(payload)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=10_000)
+    ap.add_argument("--books", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    payload = synthetic_payload(args.events, args.books)
+    print(f"[bench_odds_parser] payload {len(payload) / 1e6:.1f} MB, "
+          f"{args.events:,} events × {args.books} books")
+
+    t_old, old = bench(legacy_parse, payload, args.repeat)
+    t_long, long = bench(parse_events, payload, args.repeat)
+    t_wide, wide = bench(lambda p: moneyline_wide(parse_events(p)), payload, args.repeat)
+
+    assert wide.height == old.height, (wide.height, old.height)
+    print(f"  legacy loop       {t_old * 1e3:8.1f} ms  rows={old.height:,}")
+    print(f"  columnar (long)   {t_long * 1e3:8.1f} ms  rows={long.height:,}")
+    print(f"  columnar (wide)   {t_wide * 1e3:8.1f} ms  rows={wide.height:,}  speedup={t_old / t_wide:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
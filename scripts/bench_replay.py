@@ -0,0 +1,77 @@
+"""
+End-to-end load test of the live odds path against the tick replay server:
+replay ticks at a speed-up, hit the Odds API stand-in with N polling clients
+through the real poller + parser, and report throughput and latency.
+
+    poetry run python -m scripts.bench_replay --source data/raw/toy_ticks.parquet --speed 60 --clients 4
+"""
+import argparse, asyncio, threading, time
+import numpy as np
+from lib.ingest.odds_parser import odds_frame
+from lib.ingest.odds_poller import PollerConfig, RateLimiter, fetch_league, make_client
+from lib.ingest.replay import TickReplay, load_ticks, serve
+
+
+def pct(xs: list[float], q: float) -> float:
+    return float(np.percentile(xs, q)) * 1e3 if xs else float("nan")
+
+
+async def client_loop(cfg: PollerConfig, replay: TickReplay, interval: float, deadline: float,
+                      lat: list[float], rows: list[int]) -> None:
+    limiter = RateLimiter(1e6, 1_000_000)
+    async with make_client(cfg) as client:
+        while not replay.done and time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            payload = await fetch_league(client, limiter, cfg, "NBA")
+            rows.append(odds_frame(payload).height)
+            lat.append(time.perf_counter() - t0)
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - t0)))
+
+
+async def run_clients(cfg, replay, n, interval, seconds):
+    lat, rows = [], []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(client_loop(cfg, replay, interval, deadline, lat, rows) for _ in range(n)))
+    return lat, rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--league", default="NBA")
+    ap.add_argument("--source", default=None, help="ticks parquet file/dir; defaults to the tick store")
+    ap.add_argument("--speed", type=float, default=60.0)
+    ap.add_argument("--clients", type=int, default=4)
+    ap.add_argument("--interval", type=float, default=0.1, help="Seconds between polls per client")
+    ap.add_argument("--seconds", type=float, default=10.0, help="Cap on the HTTP phase")
+    args = ap.parse_args()
+
+    ticks = load_ticks(args.source, args.league)
+    replay = TickReplay(ticks)
+    print(f"[bench_replay] {ticks.height:,} ticks, {replay.n_batches:,} timestamps, {replay.slots.height} game×book slots")
+
+    # 1) in-process iterator, as fast as possible
+    t0 = time.perf_counter()
+    asyncio.run(replay.run(0))
+    dt = time.perf_counter() - t0
+    print(f"  iterator (max speed)   {ticks.height / dt:12,.0f} ticks/s  {replay.n_batches / dt:10,.0f} batches/s")
+
+    # 2) HTTP: replay on its own thread/loop, pollers on this one
+    replay.reset()
+    srv = serve(replay)
+    cfg = PollerConfig(leagues=[args.league], books=[], markets=["moneyline"], api_key="bench",
+                       base_url=f"http://127.0.0.1:{srv.server_port}")
+    feeder = threading.Thread(target=asyncio.run, args=(replay.run(args.speed),), daemon=True)
+    t0 = time.perf_counter()
+    feeder.start()
+    lat, rows = asyncio.run(run_clients(cfg, replay, args.clients, args.interval, args.seconds))
+    dt = time.perf_counter() - t0
+    srv.shutdown()
+
+    print(f"  replay @ {args.speed:g}x            {replay.emitted / dt:12,.0f} ticks/s  "
+          f"({replay.emitted:,}/{ticks.height:,} emitted in {dt:.1f}s)")
+    print(f"  poll+parse x{args.clients} clients  {len(lat) / dt:12,.1f} polls/s  {sum(rows) / dt:10,.0f} rows/s")
+    print(f"  latency                p50={pct(lat, 50):.2f} ms  p99={pct(lat, 99):.2f} ms  max={pct(lat, 100):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Memory and scan-time cost of the warehouse tick schema (lib.common.schema):
+the same synthetic multi-book ticks stored as free strings + Float64 versus
+conformed (Enum/Categorical + Float32), in memory and as parquet.
+
+    poetry run python -m scripts.bench_schema --games 200 --books 8 --ticks 2000
+"""
+import argparse, datetime as dt, pathlib, tempfile, time
+import numpy as np, polars as pl
+from lib.common.schema import TICKS, conform
+
+BOOKS = ["pinnacle", "draftkings", "fanduel", "betmgm", "caesars", "pointsbet", "bet365", "unibet",
+         "betrivers", "wynnbet", "circa", "bovada"]
+
+
+def synth_ticks(games: int, books: int, ticks: int, rng: np.random.Generator) -> pl.DataFrame:
+    """`ticks` HOME/AWAY price pairs per game × book, legacy types (strings, Float64)."""
+    n = games * books * ticks
+    p_home = np.clip(0.5 + rng.normal(0, 0.15, games)[:, None] + np.cumsum(rng.normal(0, 0.002, (games, ticks)), 1), 0.05, 0.95)
+    p_home = np.repeat(p_home[:, None, :], books, 1).ravel()
+    margin = 1.0 + rng.uniform(0.02, 0.06, n)
+    t0 = dt.datetime(2025, 1, 1)
+    step = np.tile(np.arange(ticks), games * books)
+    return pl.DataFrame({
+        "ts_utc": pl.Series(np.repeat(step, 2) * 1_000_000, dtype=pl.Int64).cast(pl.Duration("us")) + t0,
+        "game_id": np.repeat(np.repeat([f"G{g:05d}" for g in range(games)], books * ticks), 2),
+        "book": np.repeat(np.tile(np.repeat(np.array(BOOKS[:books]), ticks), games), 2),
+        "market": np.full(2 * n, "moneyline"),
+        "runner": np.tile(["HOME", "AWAY"], n),
+        "price_decimal": np.round(1.0 / np.column_stack([p_home * margin, (1 - p_home) * margin]).ravel(), 3),
+    })
+
+
+def scan_time(path: pathlib.Path, reps: int = 3) -> float:
+    best = np.inf
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        (pl.scan_parquet(path)
+         .group_by(["game_id", "book", "runner"])
+         .agg((1.0 / pl.col("price_decimal").cast(pl.Float64)).mean())
+         .collect())
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--games", type=int, default=200)
+    ap.add_argument("--books", type=int, default=8)
+    ap.add_argument("--ticks", type=int, default=2000, help="Price updates per game × book")
+    args = ap.parse_args()
+
+    books = min(args.books, len(BOOKS))
+    legacy = synth_ticks(args.games, books, args.ticks, np.random.default_rng(0))
+    compact = conform(legacy, TICKS)
+    print(f"[bench_schema] {legacy.height:,} ticks ({args.games} games × {books} books × {args.ticks} updates × 2 runners)")
+
+    with tempfile.TemporaryDirectory() as d:
+        rows = []
+        for name, df in (("legacy", legacy), ("schema", compact)):
+            path = pathlib.Path(d) / f"{name}.parquet"
+            df.write_parquet(path)
+            t0 = time.perf_counter()
+            pl.read_parquet(path)
+            read_s = time.perf_counter() - t0
+            rows.append((name, df.estimated_size(), path.stat().st_size, read_s, scan_time(path)))
+
+    base = rows[0]
+    for name, mem, disk, read_s, scan_s in rows:
+        print(f"  {name:<7} memory {mem / 2**20:8.1f} MiB ({mem / base[1]:.2f}x)  parquet {disk / 2**20:7.1f} MiB  "
+              f"read {read_s:.3f}s  scan+agg {scan_s:.3f}s ({base[4] / scan_s:.2f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Round-trip latency through the prediction server (lib.modeling.serve) with
+C concurrent clients, against a fresh process scoring one row itself: client
+p50/p99 per request, requests/s and the server's mean micro-batch.
+
+    poetry run python -m scripts.bench_serve --clients 1,8,32 --requests 2000
+"""
+import argparse, pathlib, subprocess, sys, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np, lightgbm as lgb
+from lib.modeling.calibration import fit_isotonic
+from lib.modeling.feature_store import MARKET_COLS, market_features
+from lib.modeling.registry import save_model
+from lib.modeling.serve import request
+
+FEATURES = ["imp_prob_mean", "vig_spread", "home_away_ratio"]
+
+
+def register(art: pathlib.Path, trees: int) -> None:
+    rng = np.random.default_rng(0)
+    X = np.vstack([market_features(h, a) for h, a in rng.uniform(1.3, 4.0, size=(20_000, 2))])
+    X = X[:, [MARKET_COLS.index(c) for c in FEATURES]]
+    y = (rng.random(len(X)) < X[:, 0]).astype(int)
+    booster = lgb.train({"objective": "binary", "num_leaves": 64, "verbose": -1}, lgb.Dataset(X, y), trees)
+    save_model(art / "NBA", [booster], fit_isotonic(booster.predict(X), y), FEATURES)
+
+
+def one_shot(art: pathlib.Path) -> float:
+    cols = [MARKET_COLS.index(c) for c in FEATURES]
+    code = ("import time; t = time.perf_counter(); from lib.modeling.fast_predict import load_fast; "
+            "from lib.modeling.feature_store import market_features; "
+            f"load_fast({str(art / 'NBA')!r}).predict_proba(market_features(1.8, 2.1)[:, {cols}]); "
+            "print(time.perf_counter() - t)")
+    return min(float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+               for _ in range(3))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", default="1,8,32", help="Comma list of concurrent client counts")
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--trees", type=int, default=300)
+    ap.add_argument("--max_wait_ms", type=float, default=2.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        art, sock = pathlib.Path(tmp) / "art", pathlib.Path(tmp) / "serve.sock"
+        register(art, args.trees)
+        code = ("import asyncio; from lib.modeling.serve import PredictionServer; "
+                f"s = PredictionServer(['NBA'], {tmp!r}, {str(art)!r}, max_wait_s={args.max_wait_ms / 1e3}); "
+                f"asyncio.run(s.serve({str(sock)!r}))")
+        proc = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.DEVNULL)
+        cfg = {"socket": sock, "port": None, "timeout_s": 5.0}
+        try:
+            while request({"op": "ping"}, cfg) is None:
+                time.sleep(0.05)
+            print(f"[bench_serve] {args.trees} trees; fresh process, one row: {one_shot(art) * 1e3:.0f}ms")
+            rng = np.random.default_rng(1)
+            for clients in map(int, args.clients.split(",")):
+                prices = rng.uniform(1.3, 4.0, size=(args.requests, 2))
+
+                def call(hp):
+                    t0 = time.perf_counter()
+                    request({"op": "market", "league": "NBA", "home_price": hp[0], "away_price": hp[1]}, cfg)
+                    return (time.perf_counter() - t0) * 1e3
+
+                before = request({"op": "stats"}, cfg)
+                t0 = time.perf_counter()
+                with ThreadPoolExecutor(clients) as ex:
+                    lat = np.array(list(ex.map(call, prices)))
+                wall = time.perf_counter() - t0
+                after = request({"op": "stats"}, cfg)
+                print(f"  {clients:>3} clients   p50 {np.percentile(lat, 50):6.2f}ms   p99 {np.percentile(lat, 99):6.2f}ms   "
+                      f"{args.requests / wall:7.0f} req/s   mean batch "
+                      f"{(after['requests'] - before['requests']) / (after['batches'] - before['batches']):.1f}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,70 +3,62 @@ warnings.filterwarnings("ignore")  # 🚫 suppress sklearn/lightgbm warnings
 
 import polars as pl
 import numpy as np
-import joblib
 from rich.console import Console
 from rich.table import Table
 from rich import box
 from lib.modeling.utils import prob_to_moneyline
+from lib.common.settings import load_settings
+from lib.modeling.feature_store import LiveFeatures, model_inputs
+from lib.modeling.fast_predict import load_fast
 
 console = Console()
 
-def calc_implied_prob(decimal_odds: float) -> float:
-    """Convert decimal odds to implied probability."""
-    return 1 / decimal_odds if decimal_odds > 0 else np.nan
+def calc_implied_prob(decimal_odds):
+    """Convert decimal odds (scalar or array) to implied probability."""
+    odds = np.asarray(decimal_odds, dtype=float)
+    with np.errstate(divide="ignore"):
+        return np.where(odds > 0, 1 / odds, np.nan)
 
 def main(stake: float = 100):
     console.print("\n🏀 [bold bright_white]In-Play Edge Engine — Top Value Bets (Live)[/bold bright_white]")
     console.print("─" * 65)
 
-    # Load model + data
-    stats = pl.read_parquet("data/warehouse/NBA/current_team_stats.parquet")
-    odds = pl.read_parquet("data/warehouse/NBA/live_odds.parquet")
-    model = joblib.load("artifacts/NBA/model.joblib")
-    cal = joblib.load("artifacts/NBA/calibrator.joblib")
+    # Load model; features + odds come from the in-process store
+    live = LiveFeatures("data/warehouse", "NBA",
+                        devig_method=(load_settings().features or {}).get("devig_method", "multiplicative"))
+    live.refresh()
+    model = load_fast("artifacts/NBA")
 
-    rows = []
-    matchups = odds.unique(subset=["home_team", "away_team"])
-
-    for g in matchups.iter_rows(named=True):
-        home, away = g["home_team"], g["away_team"]
-
-        t1 = stats.filter(pl.col("TEAM_NAME") == home)
-        t2 = stats.filter(pl.col("TEAM_NAME") == away)
-        if t1.is_empty() or t2.is_empty():
-            continue
-
-        fg_diff = float(t1["FG_PCT"][0] - t2["FG_PCT"][0])
-        margin = float(t1["PLUS_MINUS"][0] - t2["PLUS_MINUS"][0])
-        X = np.array([[1.0, fg_diff, margin]])
-
-        model_prob = float(cal.predict_proba(X)[:, 1][0])
-
-        dk = odds.filter(
-            (pl.col("home_team") == home)
-            & (pl.col("away_team") == away)
-            & (pl.col("book") == "draftkings")
-        )
-        if dk.is_empty():
-            dk = odds.filter(
-                (pl.col("home_team") == home)
-                & (pl.col("away_team") == away)
-            )
-        if dk.is_empty():
-            continue
+    # One row per matchup (DraftKings preferred), market features at its prices
+    # plus both teams' form by integer ID, and every matchup scored in one predict call.
+    if live.odds() is None:
+        console.print("[red]No live odds snapshot — run make odds first.[/red]")
+        return
+    games = live.odds().drop_nulls(["home_team_id", "away_team_id"])
+    games = games.drop_nulls(["home_odds", "away_odds"])
+    X = model_inputs(live.matchup(games["home_team_id"].to_list(), games["away_team_id"].to_list()), model.features)
 
-        home_odds = float(dk["home_odds"][0])
+    rows = []
+    if games.height:
+        model_prob = model.predict_proba(X)[:, 1]
+        home_odds = games["home_odds"].cast(pl.Float64).to_numpy()
         implied = calc_implied_prob(home_odds)
-        edge = (model_prob - implied) * 100
-        expected_value = (model_prob * home_odds - 1) * stake
-
-        rows.append({
-            "matchup": f"{home} vs {away}",
-            "model": model_prob,
-            "implied": implied,
-            "edge": edge,
-            "ev": expected_value,
-        })
+        # Elo strength check beside the model, when ratings have been built
+        elo = live.elo_prob(games["home_team_id"].to_numpy(), games["away_team_id"].to_numpy())
+        elo = np.full(games.height, np.nan) if elo is None else elo
+        rows = [
+            {
+                "matchup": f"{home} vs {away}",
+                "model": float(p),
+                "implied": float(imp),
+                "elo": float(e),
+                "edge": float((p - imp) * 100),
+                "ev": float((p * o - 1) * stake),
+            }
+            for home, away, p, imp, o, e in zip(
+                games["home_team"], games["away_team"], model_prob, implied, home_odds, elo
+            )
+        ]
 
     if not rows:
         console.print("[red]No valid matchups found.[/red]")
@@ -86,6 +78,7 @@ def main(stake: float = 100):
     table.add_column("Matchup", justify="left", no_wrap=True)
     table.add_column("Model", justify="right")
     table.add_column("Impl.", justify="right")
+    table.add_column("Elo", justify="right")
     table.add_column("Edge%", justify="right")
     table.add_column("EV($)", justify="right")
 
@@ -97,6 +90,7 @@ def main(stake: float = 100):
             row["matchup"],
             f"{row['model']:.3f}",
             f"{row['implied']:.3f}",
+            "—" if np.isnan(row["elo"]) else f"{row['elo']:.3f}",
             f"[{edge_color}]{row['edge']:+.1f}[/{edge_color}]",
             f"[{ev_color}]{row['ev']:+.2f}[/{ev_color}]",
         )
@@ -3,11 +3,11 @@ warnings.filterwarnings("ignore")  # suppress sklearn/lightgbm warnings
 
 import polars as pl
 import numpy as np
-import joblib
 from rich.console import Console
 from rich.table import Table
 from rich import box
 from lib.modeling.utils import prob_to_moneyline
+from lib.modeling.fast_predict import load_fast
 
 console = Console()
 
@@ -22,8 +22,7 @@ def main(stake: float = 100):
     # 🏈 Load NFL-specific model and data
     stats = pl.read_parquet("data/warehouse/NFL/current_team_stats.parquet")
     odds = pl.read_parquet("data/warehouse/NFL/live_odds.parquet")
-    model = joblib.load("artifacts/NFL/model.joblib")
-    cal = joblib.load("artifacts/NFL/calibrator.joblib")
+    model = load_fast("artifacts/NFL")
 
     # Unique game matchups (home vs away)
     matchups = odds.unique(subset=["home_team", "away_team"])
@@ -45,7 +44,7 @@ def main(stake: float = 100):
         X = np.array([[1.0, net_ypp_diff, margin_diff]])
 
         # Predict calibrated probability of home team winning
-        model_prob = float(cal.predict_proba(X)[:, 1][0])
+        model_prob = float(model.predict_proba(X)[:, 1][0])
 
         # Pick DraftKings odds (fallback to any available)
         dk = odds.filter(
@@ -1,9 +1,16 @@
 import polars as pl
 import numpy as np
-import joblib
+import lightgbm as lgb
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.calibration import CalibratedClassifierCV
+from lib.modeling.calibration import fit_isotonic
+from lib.modeling.registry import save_model
+
+FEATURES = ["NET_YPP", "PLUS_MINUS", "YPP"]
+
+# One row per team, so leaves stay small and shallow
+PARAMS = dict(objective="binary", learning_rate=0.05, num_leaves=7, min_data_in_leaf=5,
+              random_state=42, verbose=-1)
+
 
 def main():
     print("[train_nfl_model] 🏈 Training simple NFL model...")
@@ -12,7 +19,7 @@ def main():
     df = pl.read_parquet("data/warehouse/NFL/current_team_stats.parquet")
 
     # Features & target
-    X = df.select(["NET_YPP", "PLUS_MINUS", "YPP"]).to_numpy()
+    X = df.select(FEATURES).to_numpy().astype(np.float64)
     y = df["WIN"].to_numpy()
 
     # Split
@@ -20,20 +27,15 @@ def main():
         X, y, test_size=0.25, random_state=42, stratify=y
     )
 
-    # Base model
-    model = GradientBoostingClassifier(random_state=42)
-    model.fit(X_train, y_train)
-
-    # Calibrator
-    cal = CalibratedClassifierCV(model, cv="prefit")
-    cal.fit(X_test, y_test)
+    # Base model (LightGBM, so it can live in the model registry as text)
+    booster = lgb.train(PARAMS, lgb.Dataset(X_train, y_train, feature_name=FEATURES), num_boost_round=100)
 
-    # ✅ Save both models correctly
-    joblib.dump(model, "artifacts/NFL/model.joblib")
-    joblib.dump(cal, "artifacts/NFL/calibrator.joblib")
+    # Calibrator on the held-out quarter
+    iso = fit_isotonic(booster.predict(X_test), y_test)
 
-    print("✅ Saved model → artifacts/NFL/model.joblib")
-    print("✅ Saved calibrator → artifacts/NFL/calibrator.joblib")
+    vdir = save_model("artifacts/NFL", [booster], iso, FEATURES, league="NFL", source="scripts.train_nfl_model",
+                      n_rows=len(y), params=PARAMS)
+    print(f"✅ Registered model + calibrator → {vdir}")
 
 if __name__ == "__main__":
     main()
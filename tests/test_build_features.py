@@ -0,0 +1,56 @@
+import datetime as dt
+import shutil
+
+import polars as pl
+
+from lib.featurization.build_features import update_features
+from lib.ingest.tick_store import append_ticks, partitions
+
+BOS, NYK = 1610612738, 1610612752  # nba_api TEAM_IDs, as team_stats carries them
+
+
+def _ticks(game_id: str, ts: dt.datetime, home: float, away: float) -> pl.DataFrame:
+    return pl.DataFrame({
+        "ts_utc": [ts, ts], "game_id": [game_id] * 2, "book": ["pinnacle"] * 2, "market": ["moneyline"] * 2,
+        "runner": ["HOME", "AWAY"], "price_decimal": [home, away], "home_team_id": [BOS] * 2, "away_team_id": [NYK] * 2,
+    })
+
+
+def _home_prob(features: pl.DataFrame, game_id: str) -> float:
+    return features.filter((pl.col("game_id") == game_id) & (pl.col("runner") == "HOME"))["imp_prob_mean"].item()
+
+
+def test_incremental_build_recomputes_whole_games_across_partitions(tmp_path):
+    (tmp_path / "NBA").mkdir()
+    pl.DataFrame({
+        "game_id": [1, 3], "date": ["2024-11-01", "2024-11-09"], "season": ["22024"] * 2,
+        "home_team_id": [BOS] * 2, "away_team_id": [NYK] * 2,
+        "margin": [10.0, -5.0], "fg_diff": [0.01, -0.02], "home_win": [1, 0],
+    }).write_parquet(tmp_path / "NBA" / "team_stats.parquet")
+    # G1 is quoted either side of midnight UTC, so its ticks sit in two date partitions
+    append_ticks(pl.concat([
+        _ticks("G1", dt.datetime(2024, 11, 1, 23), 1.6, 2.4),
+        _ticks("G1", dt.datetime(2024, 11, 2, 1), 1.5, 2.6),
+        _ticks("G3", dt.datetime(2024, 11, 9, 23), 2.2, 1.7),
+    ]), tmp_path, "NBA")
+    assert len(partitions(tmp_path, "NBA")) == 3
+
+    features, todo, gone = update_features(tmp_path, "NBA")
+    assert (todo, gone) == (["G1", "G3"], [])
+    assert update_features(tmp_path, "NBA") is None
+    g3 = features.filter(pl.col("game_id") == "G3")
+
+    # A late G1 quote lands in the Nov 2 partition; a run bounded to Nov 1 still rereads all of G1
+    append_ticks(_ticks("G1", dt.datetime(2024, 11, 2, 1, 30), 1.4, 3.0), tmp_path, "NBA")
+    features, todo, gone = update_features(tmp_path, "NBA", dates=(dt.date(2024, 11, 1), dt.date(2024, 11, 1)))
+    assert (todo, gone) == (["G1"], [])
+    assert abs(_home_prob(features, "G1") - (1 / 1.6 + 1 / 1.5 + 1 / 1.4) / 3) < 1e-6
+    assert features.filter(pl.col("game_id") == "G3").equals(g3)
+    assert update_features(tmp_path, "NBA", dates=(dt.date(2024, 11, 2), None)) is None
+
+    # G3's ticks vanish: an unbounded run drops its rows and keeps G1's
+    shutil.rmtree(next(p for p in partitions(tmp_path, "NBA") if p.name == "game_id=G3"))
+    features, todo, gone = update_features(tmp_path, "NBA")
+    assert (todo, gone) == ([], ["G3"])
+    assert features["game_id"].unique().to_list() == ["G1"] and features.height == 2
+    assert pl.read_parquet(tmp_path / "NBA" / "features.parquet").equals(features)
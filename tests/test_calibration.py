@@ -0,0 +1,43 @@
+import pickle
+
+import numpy as np
+
+from lib.modeling.calibration import Calibrator, fit_isotonic, train_oof
+
+PARAMS = {"objective": "binary", "learning_rate": 0.1, "num_leaves": 15, "min_data_in_leaf": 20, "seed": 7}
+
+
+def _data(n: int = 3000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 3))
+    y = (rng.random(n) < 1 / (1 + np.exp(-(1.5 * X[:, 0] - X[:, 1])))).astype(int)
+    return X, y
+
+
+def test_oof_covers_every_row_once_and_folds_run_in_processes():
+    X, y = _data()
+    res = train_oof(X, y, PARAMS, n_splits=3, n_jobs=2, num_boost_round=60, early_stopping=10)
+    assert len(res.models) == 3
+    assert np.bincount(res.fold_of).tolist() == [1000, 1000, 1000]
+    assert ((res.oof > 0) & (res.oof < 1)).all()
+    # every held-out prediction came from the booster that never saw the row
+    ens = res.ensemble()
+    for f, b in enumerate(ens.boosters):
+        held = res.fold_of == f
+        assert np.allclose(b.predict(X[held]), res.oof[held])
+
+
+def test_artifacts_pickle_and_calibrate_both_ways():
+    X, y = _data()
+    res = train_oof(X, y, PARAMS, n_splits=3, n_jobs=1, num_boost_round=60, early_stopping=10)
+    cal = Calibrator(fit_isotonic(res.oof, y), res.ensemble())
+    cal2 = pickle.loads(pickle.dumps(cal))
+
+    p_raw = cal2.model.predict(X[:200])
+    assert np.allclose(p_raw, cal.model.predict(X[:200]))
+    # predict(p_raw) and predict_proba(X) are the same map
+    assert np.allclose(cal2.predict(p_raw), cal2.predict_proba(X[:200])[:, 1])
+    assert (np.diff(cal2.predict(np.sort(p_raw))) >= 0).all()
+
+    cross = res.cross_calibrated(y)
+    assert np.mean((cross - y) ** 2) < np.mean((np.full(len(y), y.mean()) - y) ** 2)
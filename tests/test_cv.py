@@ -0,0 +1,45 @@
+import numpy as np
+
+from lib.modeling.cv import cached_dataset, train_walk_forward, walk_forward_folds
+
+PARAMS = {"objective": "binary", "learning_rate": 0.1, "num_leaves": 15, "min_data_in_leaf": 20, "seed": 7}
+
+
+def _data(n: int = 4000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    # four seasons of games, tip-offs October through April
+    start = np.array([np.datetime64(f"{y}-10-20") for y in (2020, 2021, 2022, 2023)])
+    dates = start[rng.integers(0, 4, n)] + rng.integers(0, 180, n).astype("timedelta64[D]")
+    X = rng.normal(size=(n, 3))
+    y = (rng.random(n) < 1 / (1 + np.exp(-(1.5 * X[:, 0] - X[:, 1])))).astype(int)
+    return X, y, dates
+
+
+def test_walk_forward_folds_only_train_on_the_past():
+    _, _, dates = _data()
+    folds = walk_forward_folds(dates, n_splits=3, by="season")
+    assert len(folds) == 3
+    for tr, va in folds:
+        assert dates[tr].max() < dates[va].min()
+    # expanding window: each fold trains on everything its predecessor saw, plus the next season
+    assert [len(tr) for tr, _ in folds] == sorted(len(tr) for tr, _ in folds)
+    by_date = walk_forward_folds(dates, n_splits=4, by="date")
+    assert all(dates[tr].max() < dates[va].min() for tr, va in by_date)
+
+
+def test_cached_dataset_is_reused_and_folds_match_across_thread_budgets(tmp_path):
+    X, y, dates = _data()
+    ds, hit = cached_dataset(X, y, ["a", "b", "c"], PARAMS, tmp_path)
+    assert not hit and len(list(tmp_path.glob("*.bin"))) == 1
+    ds2, hit = cached_dataset(X, y, ["a", "b", "c"], PARAMS, tmp_path)
+    assert hit and ds2.num_data() == len(y)
+
+    kw = dict(n_splits=3, num_boost_round=40, early_stopping=10)
+    serial = train_walk_forward(X, y, dates, PARAMS, ds, jobs=1, threads=1, **kw)
+    threaded = train_walk_forward(X, y, dates, PARAMS, ds2, jobs=3, threads=3, **kw)
+    # the first season is training-only
+    first = dates < np.datetime64("2021-08-01")
+    assert np.isnan(serial.oof[first]).all() and (serial.fold_of[first] == -1).all()
+    assert not np.isnan(serial.oof[~first]).any()
+    assert np.allclose(serial.oof[~first], threaded.oof[~first])
+    assert serial.best_iters == threaded.best_iters
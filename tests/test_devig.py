@@ -0,0 +1,71 @@
+import datetime as dt
+
+import numpy as np
+import polars as pl
+
+from lib.featurization.devig import METHODS, consensus, devig, fair_prob_expr, fair_probs, shin_z
+from lib.modeling.feature_store import MARKET_COLS, market_features
+
+
+def _quotes(rng, n: int, k: int) -> np.ndarray:
+    fair = rng.dirichlet(np.full(k, 4.0), n)
+    return fair * (1.0 + rng.uniform(0.02, 0.08, (n, 1)))
+
+
+def test_kernels_sum_to_one_and_keep_order():
+    rng = np.random.default_rng(0)
+    for k in (2, 3):
+        p = _quotes(rng, 2000, k)
+        for m in METHODS:
+            fair = devig(p, m)
+            assert np.abs(fair.sum(axis=1) - 1).max() < 1e-12, (m, k)
+            # de-vig never reorders favourite vs. longshot
+            assert (np.argsort(fair, axis=1) == np.argsort(p, axis=1)).all(), (m, k)
+
+
+def test_shin_two_way_closed_form_and_wide_solver_agree():
+    p = np.array([[1 / 1.5, 1 / 2.6]])
+    z = shin_z(p)[0, 0]
+    s, d = p.sum(), p[0, 0] - p[0, 1]
+    assert abs(z - (s - 1) * (d * d - s) / (s * (d * d - 1))) < 1e-15
+    # a third outcome at (almost) zero leaves the same market; the Newton branch must land there too
+    wide = shin_z(np.array([[p[0, 0], p[0, 1], 1e-12]]))[0, 0]
+    assert abs(wide - z) < 1e-6
+
+
+def test_missing_outcomes_and_two_way_rows_in_a_three_way_matrix():
+    p = np.array([[1 / 2.1, 1 / 3.4, 1 / 3.6], [np.nan, 1 / 1.5, 1 / 2.6]])
+    for m in METHODS:
+        fair = devig(p, m)
+        assert np.isnan(fair[1, 0])
+        assert np.allclose(np.nansum(fair, axis=1), 1.0)
+        assert np.allclose(fair[1, 1:], devig(p[1:, 1:], m)[0])
+
+
+def test_frame_matches_kernel_and_consensus():
+    ts = dt.datetime(2025, 1, 1, 12)
+    df = pl.DataFrame({
+        "game_id": ["G1"] * 5, "ts_utc": [ts] * 5,
+        "book": ["a", "a", "b", "b", "c"], "runner": ["AWAY", "HOME", "AWAY", "HOME", "HOME"],
+        "price_decimal": [2.6, 1.5, 2.5, 1.55, 1.6],
+    })
+    for m in METHODS:
+        fair = fair_probs(df, m)
+        assert np.allclose(fair[:2].to_numpy(), devig([[1 / 2.6, 1 / 1.5]], m)[0])
+        assert fair[4] is None  # book c only quotes one side
+        lazy = df.lazy().with_columns(fair_prob_expr(m)).collect()["fair_prob"]
+        assert np.allclose(lazy.fill_null(np.nan).to_numpy(), fair.fill_null(np.nan).to_numpy(), equal_nan=True)
+
+    cons = consensus(df, "multiplicative")
+    assert cons["n_books"].to_list() == [2, 2]  # c's lone HOME quote has no fair prob
+    assert abs(cons["consensus_prob"].sum() - 1) < 1e-12
+    assert cons.filter(pl.col("runner") == "HOME")["best_price"].item() == 1.6
+
+
+def test_serving_row_devigs_like_the_training_features():
+    ts = dt.datetime(2025, 1, 1, 12)
+    df = pl.DataFrame({"game_id": ["G1"] * 2, "ts_utc": [ts] * 2, "book": ["a"] * 2,
+                       "runner": ["HOME", "AWAY"], "price_decimal": [1.45, 2.9]})
+    for m in METHODS:
+        row = market_features(1.45, 2.9, devig_method=m)
+        assert abs(row[0, MARKET_COLS.index("imp_prob_vigadj")] - fair_probs(df, m)[0]) < 1e-12, m
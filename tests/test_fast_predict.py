@@ -0,0 +1,41 @@
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+from lib.modeling.calibration import fit_isotonic
+from lib.modeling.fast_predict import load_fast
+from lib.modeling.registry import load_model, save_model
+
+FEATURES = ["imp_prob_mean", "vig_spread", "home_away_ratio"]
+
+
+def _data(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 3))
+    X[::37, 1] = np.nan
+    X[::41, 2] = 0.0
+    y = (rng.random(n) < 1 / (1 + np.exp(-(1.5 * X[:, 0] - np.nan_to_num(X[:, 1]))))).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("params, n_boosters", [
+    ({"num_leaves": 31}, 3),                                  # fold ensemble
+    ({"num_leaves": 150, "min_data_in_leaf": 5}, 1),          # more leaves than one 64-bit word
+    ({"num_leaves": 15, "zero_as_missing": True}, 1),         # zero-as-missing splits
+    ({"num_leaves": 15, "min_data_in_leaf": 10_000}, 1),      # single-leaf trees
+])
+def test_compiled_model_matches_lightgbm(tmp_path, params, n_boosters):
+    X, y = _data(4000)
+    boosters = [lgb.train({"objective": "binary", "verbose": -1, "seed": k, **params}, lgb.Dataset(X, y), 60)
+                for k in range(n_boosters)]
+    iso = fit_isotonic(np.mean([b.predict(X) for b in boosters], axis=0), y)
+    save_model(tmp_path, boosters, iso, FEATURES)
+
+    Xt, _ = _data(3000, seed=1)
+    Xt[::13, 0] = np.nan
+    Xt[:50] = X[:50]  # values sitting exactly on split thresholds
+    ref, fast = load_model(tmp_path), load_fast(tmp_path)
+    assert np.abs(fast.predict(Xt) - ref.predict(Xt)).max() < 1e-9
+    assert np.abs(fast.predict_proba(Xt) - ref.predict_proba(Xt)).max() < 1e-9
+    assert np.abs(fast.predict_proba(Xt[:1]) - ref.predict_proba(Xt[:1])).max() < 1e-9
+    assert load_fast(tmp_path) is fast
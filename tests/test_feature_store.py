@@ -0,0 +1,81 @@
+import datetime as dt
+
+import numpy as np
+import polars as pl
+
+from lib.featurization.team_form import FORM_COLS
+from lib.modeling.feature_store import MARKET_COLS, SERVING_COLS, FeatureStore, LiveFeatures
+from lib.modeling.ratings import Ratings
+from lib.utils.team_registry import team_id
+
+
+class Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_ttl_lru_and_counters():
+    clock = Clock()
+    store = FeatureStore(ttl_s=120, max_entries=2, clock=clock)
+    store.put(("game", "G1", "home"), [1.0])
+    store.put(("game", "G2", "home"), [2.0])
+    assert store.get(("game", "G1", "home")) == [1.0]  # G1 is now most recent
+    store.put(("game", "G3", "home"), [3.0])  # evicts G2
+    assert store.get(("game", "G2", "home")) is None
+    clock.t = 121
+    assert store.get(("game", "G1", "home")) is None
+    assert store.stats() | {"hit_rate": None} == {
+        "size": 1, "hits": 1, "misses": 2, "expired": 1, "evictions": 1, "hit_rate": None}
+
+
+def test_only_refresh_reads_disk(tmp_path, monkeypatch):
+    bos, nyk = team_id("Boston Celtics", "NBA"), team_id("New York Knicks", "NBA")
+    (tmp_path / "NBA").mkdir()
+    # Each team's latest form row is its form now
+    pl.DataFrame({"team_id": [bos, bos, nyk], "asof_date": [dt.date(2024, 11, d) for d in (2, 6, 4)],
+                  "form_margin": [1.0, 4.0, -2.0], "form_fg_diff": [0.0, 0.02, -0.01],
+                  "form_win_rate": [0.0, 0.5, 0.25]}).write_parquet(tmp_path / "NBA" / "team_form.parquet")
+    pl.DataFrame({"home_team_id": [bos], "away_team_id": [nyk], "book": ["draftkings"],
+                  "home_odds": [1.6], "away_odds": [2.5]}).write_parquet(tmp_path / "NBA" / "live_odds.parquet")
+    reads = []
+    real_read = pl.read_parquet
+    monkeypatch.setattr(pl, "read_parquet", lambda p, *a, **k: reads.append(p) or real_read(p, *a, **k))
+
+    clock = Clock()
+    live = LiveFeatures(tmp_path, "NBA", FeatureStore(ttl_s=120, clock=clock))
+    assert np.isnan(live.form([bos])).all() and live.odds() is None and not reads
+    assert live.refresh() == {"form": 2, "odds": 1} and len(reads) == 2
+    for _ in range(3):
+        X = live.matchup([bos, nyk], [nyk, bos])
+    assert len(reads) == 2
+    home = dict(zip(SERVING_COLS, X[0]))
+    assert home["imp_prob_mean"] == 1 / 1.6 and abs(home["imp_prob_vigadj"] - (1 / 1.6) / (1 / 1.6 + 1 / 2.5)) < 1e-12
+    assert [home[c] for c in FORM_COLS] == [6.0, 0.03, 0.25]
+    assert np.isnan(X[1, :len(MARKET_COLS) - 1]).all()  # no odds row for the reverse pairing
+    # Lapsed entries are not refilled by a lookup; the next refresh() replaces them
+    clock.t = 200
+    assert live.odds() is None and len(reads) == 2
+    live.refresh()
+    assert np.array_equal(live.matchup([bos, nyk], [nyk, bos]), X, equal_nan=True) and len(reads) == 4
+
+
+def test_refresh_reparses_ratings_only_when_rewritten(tmp_path):
+    (tmp_path / "NBA").mkdir()
+    path = tmp_path / "NBA" / "ratings.npz"
+    Ratings().save(path)
+    live = LiveFeatures(tmp_path, "NBA", store=FeatureStore(ttl_s=60))
+    assert live.elo_prob([1], [2]) is None
+    live.refresh()
+    first = live.store.get(("ratings", "NBA"))
+    live.refresh()
+    assert live.store.get(("ratings", "NBA")) is first
+
+    ratings = Ratings()
+    ratings.elo[1] += 100
+    ratings.save(path)
+    live.refresh()
+    assert live.store.get(("ratings", "NBA")) is not first
+    assert live.elo_prob([1], [2])[0] > first.win_prob([1], [2])[0]
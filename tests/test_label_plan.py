@@ -0,0 +1,91 @@
+import datetime as dt
+
+import numpy as np
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from lib.featurization.build_features import feature_plan
+from lib.ingest.tick_store import append_ticks, scan_ticks
+from lib.labeling.build_labels import attach_labels, decision_snapshots, label_plan, snapshot_ticks
+
+
+def test_lazy_plan_matches_staged_build(tmp_path):
+    rng = np.random.default_rng(0)
+    t0 = dt.datetime(2024, 11, 1)
+    rows, sched = [], []
+    for g in range(6):
+        start = t0 + dt.timedelta(hours=3 * g)
+        sched.append((f"G{g}", start, 1 + g, 16 + g))
+        # 3 of the games have no quote 120 minutes out → fallback rows
+        mins = rng.integers(-20, 90 if g % 2 else 180, 40)
+        for book in ("pinnacle", "fanduel"):
+            for runner in ("HOME", "AWAY"):
+                rows += [(start - dt.timedelta(minutes=int(m)), f"G{g}", book, runner, 1.5 + rng.random())
+                         for m in mins]
+    append_ticks(pl.DataFrame(rows, schema=["ts_utc", "game_id", "book", "runner", "price_decimal"], orient="row"),
+                 tmp_path, "NBA")
+    schedule = pl.DataFrame(sched, schema=["game_id", "start_time_utc", "home_team_id", "away_team_id"], orient="row")
+    stats = schedule.select(pl.col("start_time_utc").dt.strftime("%Y-%m-%d").alias("date"),
+                            "home_team_id", "away_team_id", pl.lit("2024").alias("season"),
+                            pl.lit(3.0).alias("margin"), pl.lit(0.01).alias("fg_diff"), pl.lit(1).alias("home_win"))
+    results = pl.DataFrame({"game_id": [f"G{g}" for g in range(5)], "winner": ["HOME", "AWAY"] * 2 + ["HOME"]})
+
+    _, lazy = label_plan(scan_ticks(tmp_path, "NBA"), schedule.lazy(), stats.lazy(), results.lazy(), [5, 30, 120])
+    lazy = lazy.collect(engine="streaming")
+
+    # Same stages, materialized one at a time
+    ticks = snapshot_ticks(scan_ticks(tmp_path, "NBA"), schedule.lazy()).collect()
+    feats = feature_plan(ticks.lazy(), stats.lazy(), ["ts_utc", "mins_to_start"]).collect()
+    feats = feats.join(results.select("game_id"), on="game_id", how="semi")
+    staged = attach_labels(decision_snapshots(feats, [5, 30, 120]), results)
+
+    assert lazy.height == staged.height == 5 * 2 * 3
+    assert (lazy["source"] == "fallback").any()
+    # book averages may sum in another order: floats to 1e-12
+    assert_frame_equal(lazy, staged, rel_tol=0, abs_tol=1e-12)
+
+
+def _quotes() -> pl.DataFrame:
+    # mins_to_start per (game, runner), deliberately unsorted; `quote` names each row
+    rows = [("G1", "HOME", m) for m in (40, 2, 95, 12)] + [("G1", "AWAY", m) for m in (12, 40)] \
+        + [("G2", "HOME", m) for m in (7, 3)]
+    return pl.DataFrame(rows, schema=["game_id", "runner", "mins_to_start"], orient="row").with_columns(
+        (pl.col("game_id") + "/" + pl.col("runner") + "@" + pl.col("mins_to_start").cast(pl.Utf8)).alias("quote"))
+
+
+def _picks(snaps: pl.DataFrame) -> dict:
+    return {(g, r): (q, s) for g, r, q, s in snaps.select("game_id", "runner", "quote", "source").iter_rows()}
+
+
+def test_snapshot_is_the_last_quote_at_least_offset_before_start():
+    for feats in (_quotes(), _quotes().lazy()):
+        snaps = decision_snapshots(feats, 30)
+        snaps = snaps.collect() if isinstance(snaps, pl.LazyFrame) else snaps
+        assert "decision_offset_min" not in snaps.columns
+        # G2 has nothing 30 minutes out: its earliest quote, flagged
+        assert _picks(snaps) == {
+            ("G1", "HOME"): ("G1/HOME@40", "primary"),
+            ("G1", "AWAY"): ("G1/AWAY@40", "primary"),
+            ("G2", "HOME"): ("G2/HOME@7", "fallback"),
+        }
+
+
+def test_offset_grid_picks_each_offset_in_one_pass():
+    expected = {
+        # offset: G1 HOME, G1 AWAY, G2 HOME ("*" = fallback to the earliest quote)
+        2: ("G1/HOME@2", "G1/AWAY@12", "G2/HOME@3"),
+        5: ("G1/HOME@12", "G1/AWAY@12", "G2/HOME@7"),
+        10: ("G1/HOME@12", "G1/AWAY@12", "G2/HOME@7*"),
+        120: ("G1/HOME@95*", "G1/AWAY@40*", "G2/HOME@7*"),
+    }
+    for feats in (_quotes(), _quotes().lazy()):
+        grid = decision_snapshots(feats, list(expected))
+        grid = grid.collect() if isinstance(grid, pl.LazyFrame) else grid
+        assert grid.height == 3 * len(expected)
+        for offset, quotes in expected.items():
+            picks = _picks(grid.filter(pl.col("decision_offset_min") == offset))
+            got = tuple(q + ("*" if s == "fallback" else "") for q, s in
+                        (picks[k] for k in (("G1", "HOME"), ("G1", "AWAY"), ("G2", "HOME"))))
+            assert got == quotes, offset
+        # each offset alone gives the same rows as its block of the grid
+        assert _picks(decision_snapshots(_quotes(), 10)) == _picks(grid.filter(pl.col("decision_offset_min") == 10))
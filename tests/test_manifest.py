@@ -0,0 +1,66 @@
+import datetime as dt
+import os
+
+import polars as pl
+
+from lib.common.schema import TEAM_ID, TEAM_STATS
+from lib.ingest.manifest import SourceManifest, upsert_parquet
+
+
+def test_manifest_reports_new_modified_and_restored_sources(tmp_path):
+    a, b = tmp_path / "a.csv", tmp_path / "b.csv"
+    a.write_text("x\n1\n")
+    b.write_text("x\n2\n")
+    m = SourceManifest(tmp_path, "stage")
+    assert m.changed([a, b]) == [a, b]
+    m.mark([a, b])
+    m.save()
+
+    # Unchanged, and touched with the same content: both skipped without re-marking
+    m = SourceManifest(tmp_path, "stage")
+    assert m.changed([a, b]) == []
+    st = b.stat()
+    os.utime(b, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert m.changed([a, b]) == []
+    assert m.entries["b.csv"]["mtime_ns"] == b.stat().st_mtime_ns
+
+    # Modified content is reported; a removed source is forgotten
+    a.write_text("x\n1\n3\n")
+    b.unlink()
+    m = SourceManifest(tmp_path, "stage")
+    assert m.changed([a]) == [a]
+    assert "b.csv" not in m.entries
+    m.mark([a])
+    m.save()
+
+    # Restoring the removed file makes it new again; other stages are untouched
+    b.write_text("x\n2\n")
+    m = SourceManifest(tmp_path, "stage")
+    assert m.changed([a, b]) == [b]
+    assert SourceManifest(tmp_path, "other").changed([a]) == [a]
+
+
+def test_upsert_replaces_keys_and_migrates_old_files(tmp_path):
+    out = tmp_path / "team_stats.parquet"
+    # Written before the compact schema: Int64 nba_api team IDs, string dates, Float64 points
+    pl.DataFrame({
+        "game_id": [1, 2, 3], "date": ["2024-01-01", "2024-01-02", "2024-01-03"],
+        "home_team_id": [1610612738] * 3, "away_team_id": [1610612747] * 3,
+        "PTS_home": [100.0, 101.0, 102.0],
+    }).write_parquet(out)
+
+    new = pl.DataFrame({
+        "game_id": [2, 4, 4], "date": [dt.date(2024, 1, 2), dt.date(2024, 1, 4), dt.date(2024, 1, 4)],
+        "home_team_id": [1610612738] * 3, "away_team_id": [1610612747] * 3,
+        "PTS_home": [111.0, 90.0, 120.0],
+    })
+    merged = upsert_parquet(out, new, key=["game_id"], schema=TEAM_STATS)
+
+    on_disk = pl.read_parquet(out)
+    assert on_disk.equals(merged)
+    # Key 2 replaced, key 4 appended once (last duplicate wins), the rest kept
+    assert dict(zip(on_disk["game_id"], on_disk["PTS_home"])) == {1: 100.0, 3: 102.0, 2: 111.0, 4: 120.0}
+    assert on_disk.schema["game_id"] == TEAM_STATS["game_id"] and on_disk.schema["date"] == pl.Date
+    assert on_disk.schema["home_team_id"] == TEAM_ID and on_disk["home_team_id"].max() <= 65535
+    assert on_disk.schema["PTS_home"] == pl.Float32
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,57 @@
+import polars as pl
+
+from lib.ingest.nba_api_fetch import KEEP_COLS, ResponseCache, fetch_history, to_modern
+
+
+def _season_frame(season: str) -> pl.DataFrame:
+    # Two team rows each for a regular-season and a playoff game, plus preseason
+    # and All-Star rows to be dropped
+    year = int(season[:4])
+    rows = [
+        (f"{year}-11-01", f"2{year}", f"002{year}0001", 1610612738, "BOS", "Boston Celtics", "BOS vs. NYK", "W", 110),
+        (f"{year}-11-01", f"2{year}", f"002{year}0001", 1610612752, "NYK", "New York Knicks", "NYK @ BOS", "L", 101),
+        (f"{year + 1}-04-25", f"4{year}", f"004{year}0101", 1610612752, "NYK", "New York Knicks", "NYK vs. BOS", "W", 104),
+        (f"{year + 1}-04-25", f"4{year}", f"004{year}0101", 1610612738, "BOS", "Boston Celtics", "BOS @ NYK", "L", 98),
+        (f"{year}-10-05", f"1{year}", f"001{year}0001", 1610612738, "BOS", "Boston Celtics", "BOS vs. PHI", "W", 99),
+        (f"{year + 1}-02-16", f"3{year}", f"003{year}0001", 1610616833, "EST", "Team East", "EST vs. WST", "W", 211),
+    ]
+    df = pl.DataFrame(rows, schema=KEEP_COLS[:9], orient="row")
+    return df.with_columns([pl.lit(0.45).alias(c) for c in ("FG_PCT", "FG3_PCT", "FT_PCT")]
+                           + [pl.lit(40).alias("REB"), pl.lit(25).alias("AST")])
+
+
+class FakeEndpoint:
+    def __init__(self, fail: set[str] = frozenset()):
+        self.calls: list[str] = []
+        self.fail = set(fail)
+
+    def __call__(self, endpoint: str, params: dict) -> pl.DataFrame:
+        season = params["season_nullable"]
+        self.calls.append(season)
+        if season in self.fail:
+            raise TimeoutError(season)
+        return _season_frame(season)
+
+
+def test_per_season_cache_resume_and_refresh(tmp_path):
+    cache = ResponseCache(tmp_path)
+
+    # First run: 2022-23 times out; the other seasons are cached anyway
+    first = FakeEndpoint(fail={"2022-23"})
+    done, failed = fetch_history([2020, 2021, 2022, 2023], cache, first, workers=2, retries=1, backoff_s=0)
+    assert sorted(done) == [2020, 2021, 2023] and list(failed) == [2022]
+    assert first.calls.count("2022-23") == 2
+
+    # Resume: only the missing season goes to the endpoint
+    resume = FakeEndpoint()
+    done, failed = fetch_history([2020, 2021, 2022, 2023], cache, resume, workers=2)
+    assert resume.calls == ["2022-23"] and not failed and len(done) == 4
+
+    # Refresh run: finished seasons come from disk, only the current one is requested
+    refresh = FakeEndpoint()
+    done, _ = fetch_history([2020, 2021, 2022, 2023], cache, refresh, refresh=[2023])
+    assert refresh.calls == ["2023-24"]
+
+    modern = to_modern(done[x] for x in sorted(done))
+    assert modern.height == 16 and sorted(modern["SEASON_ID"].str.head(1).unique()) == ["2", "4"]
+    assert modern["team_win"].sum() == 8
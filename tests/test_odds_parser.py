@@ -0,0 +1,49 @@
+import datetime as dt
+import pathlib
+
+import polars as pl
+
+from lib.ingest.odds_parser import LONG_SCHEMA, WIDE_SCHEMA, moneyline_wide, parse_events
+
+PAYLOAD = (pathlib.Path(__file__).parent / "fixtures" / "odds_api" / "parser_edge_cases.json").read_bytes()
+
+
+def test_parse_events_keeps_every_book_market_and_outcome():
+    long = parse_events(PAYLOAD)
+    assert long.schema == pl.Schema(LONG_SCHEMA)
+    assert long.select("book", "market", "runner", "price", "point").rows() == [
+        ("pinnacle", "h2h", "AWAY", 2.1, None),
+        ("pinnacle", "h2h", "HOME", 1.8, None),
+        ("pinnacle", "totals", "Over", 1.91, 220.5),
+        ("pinnacle", "totals", "Under", 1.91, 220.5),
+        # fanduel quotes no h2h market for the game
+        ("fanduel", "totals", "Over", 1.87, 221.0),
+        ("fanduel", "totals", "Under", 1.95, 221.0),
+        # 3-way h2h: "New York Knicks" and the event's "NY Knicks" are one team
+        ("draftkings", "h2h", "HOME", 1.9, None),
+        ("draftkings", "h2h", "AWAY", 2.4, None),
+        ("draftkings", "h2h", "DRAW", 15.0, None),
+        ("pinnacle", "h2h", "HOME", 1.5, None),
+        ("pinnacle", "h2h", "AWAY", 2.7, None),
+    ]
+    first = long.row(0, named=True)
+    assert (first["home_team"], first["away_team"], first["home_team_id"], first["away_team_id"]) == \
+        ("Boston Celtics", "New York Knicks", 2, 20)
+    assert first["commence_time"] == dt.datetime(2025, 10, 22, 23, 10, tzinfo=dt.timezone.utc)
+    # Names the registry doesn't know pass through with null team IDs
+    unknown = long.filter(pl.col("event_id") == "evt-unknown")
+    assert unknown["home_team"].unique().to_list() == ["Springfield Isotopes"]
+    assert unknown["home_team_id"].is_null().all() and unknown["away_team_id"].is_null().all()
+
+
+def test_moneyline_wide_pivots_home_away_per_book():
+    wide = moneyline_wide(parse_events(PAYLOAD))
+    assert wide.schema == pl.Schema(WIDE_SCHEMA)
+    # No row for the book without h2h; the draw price is dropped; unknown teams keep null IDs
+    assert wide.rows() == [
+        ("Boston Celtics", "New York Knicks", 2, 20, "pinnacle", 1.8, 2.1),
+        ("Boston Celtics", "New York Knicks", 2, 20, "draftkings", 1.9, 2.4),
+        ("Springfield Isotopes", "Shelbyville Shelbyvillians", None, None, "pinnacle", 1.5, 2.7),
+    ]
+    assert moneyline_wide(parse_events(PAYLOAD), books=["draftkings"])["book"].to_list() == ["draftkings"]
+    assert parse_events(b"[]").schema == pl.Schema(LONG_SCHEMA)
@@ -0,0 +1,64 @@
+import asyncio, pathlib, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from lib.ingest.odds_parser import odds_frame
+from lib.ingest.odds_poller import PollerConfig, poll_once
+
+FIXTURES = pathlib.Path(__file__).parent / "fixtures" / "odds_api"
+
+
+def _stub_server(fail_first: set[str]):
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            sport = url.path.split("/")[3]
+            hits.append((sport, parse_qs(url.query)))
+            if sport in fail_first:
+                fail_first.discard(sport)
+                body, status = b"busy", 503
+            else:
+                body, status = (FIXTURES / f"{sport}.json").read_bytes(), 200
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, hits
+
+
+def test_poll_once_against_stub_server():
+    srv, hits = _stub_server(fail_first={"americanfootball_nfl"})
+    try:
+        cfg = PollerConfig(
+            leagues=["NBA", "NFL"], books=["draftkings", "fanduel"], markets=["moneyline"],
+            api_key="test", base_url=f"http://127.0.0.1:{srv.server_port}",
+            backoff_base_s=0.01, rate_per_s=100.0, burst=10,
+        )
+        snap = asyncio.run(poll_once(cfg))
+    finally:
+        srv.shutdown()
+
+    assert set(snap) == {"NBA", "NFL"}
+    nba = odds_frame(snap["NBA"], cfg.books)
+    nfl = odds_frame(snap["NFL"], cfg.books)
+    assert nba.height == 3 and nfl.height == 1
+
+    # aliases normalized and outcomes matched by name, not position
+    fd = nba.filter(book="fanduel").row(0, named=True)
+    assert fd["away_team"] == "New York Knicks"
+    assert (fd["home_odds"], fd["away_odds"]) == (1.55, 2.54)
+
+    # NFL was retried once after the 503; every request carried the market/book params
+    assert [h[0] for h in hits].count("americanfootball_nfl") == 2
+    assert all(q["markets"] == ["h2h"] and q["bookmakers"] == ["draftkings,fanduel"] for _, q in hits)
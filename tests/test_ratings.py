@@ -0,0 +1,33 @@
+import datetime as dt
+
+import numpy as np
+import polars as pl
+
+from lib.modeling.ratings import MEAN, Ratings, expected_home
+
+
+def _games(days, home, away, margin):
+    return pl.DataFrame({"game_date": [dt.date(2024, 11, d) for d in days], "home_team_id": home,
+                         "away_team_id": away, "margin": [float(m) for m in margin]})
+
+
+def test_incremental_matches_full_pass_and_persists(tmp_path):
+    games = _games([1, 1, 2, 3, 3, 4], [1, 3, 2, 1, 4, 3], [2, 4, 3, 4, 2, 1], [12, -3, 5, 20, -7, 1])
+
+    full = Ratings()
+    pre = full.apply(games)
+    # Same-date games are rated from the same pre-date ratings
+    assert pre["elo_home_pre"][:2].to_list() == [MEAN, MEAN]
+    assert abs(full.elo.sum() - MEAN * len(full.elo)) < 1e-9  # zero-sum
+
+    # Two batches through save/load give the same ratings; re-sent games are skipped
+    inc = Ratings()
+    inc.apply(games.head(3))
+    inc.save(tmp_path / "ratings.npz")
+    inc = Ratings.load(tmp_path / "ratings.npz")
+    assert inc.apply(games).height == 3
+    np.testing.assert_allclose(inc.elo, full.elo, rtol=0, atol=1e-9)
+
+    p = full.win_prob([1, 2], [2, 1])
+    np.testing.assert_allclose(p, expected_home(full.elo[[1, 2]], full.elo[[2, 1]]))
+    assert full.elo[1] > MEAN  # won by 12 and 20, lost by 1
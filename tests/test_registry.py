@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lib.modeling.calibration import Calibrator, fit_isotonic, train_oof
+from lib.modeling.registry import list_versions, load_model, save_model
+
+PARAMS = {"objective": "binary", "learning_rate": 0.1, "num_leaves": 15, "min_data_in_leaf": 20, "seed": 7}
+FEATURES = ["imp_prob_mean", "vig_spread", "home_away_ratio"]
+
+
+def _fit(n: int = 2000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 3))
+    y = (rng.random(n) < 1 / (1 + np.exp(-(1.5 * X[:, 0] - X[:, 1])))).astype(int)
+    res = train_oof(X, y, PARAMS, n_splits=3, n_jobs=1, num_boost_round=40, early_stopping=10)
+    return X, Calibrator(fit_isotonic(res.oof, y), res.ensemble())
+
+
+def test_registered_model_matches_the_trained_one(tmp_path):
+    X, cal = _fit()
+    vdir = save_model(tmp_path, cal.model.boosters, cal.iso, FEATURES, league="NBA")
+    assert sorted(p.name for p in vdir.iterdir()) == [
+        "calibrator.npz", "manifest.json", "model-0.txt", "model-1.txt", "model-2.txt"]
+
+    model = load_model(tmp_path)
+    assert model.version == vdir.name and model.features == FEATURES
+    assert np.allclose(model.predict(X), cal.model.predict(X))
+    # np.interp over the thresholds is the isotonic map
+    assert np.allclose(model.predict_proba(X), cal.predict_proba(X))
+    # DataFrames are matched to the manifest by column name, in any order
+    df = pd.DataFrame(X, columns=FEATURES)[FEATURES[::-1]]
+    assert np.allclose(model.predict(df), cal.model.predict(X))
+    with pytest.raises(ValueError, match="feature columns"):
+        model.predict(X[:, :2])
+    # memoized until the manifest changes
+    assert load_model(tmp_path) is model
+
+
+def test_versions_latest_and_hash_check(tmp_path):
+    _, cal = _fit()
+    first = save_model(tmp_path, cal.model.boosters[:1], cal.iso, FEATURES)
+    second = save_model(tmp_path, cal.model.boosters[:1], cal.iso, FEATURES)
+    assert list_versions(tmp_path) == [first.name, second.name]
+    assert load_model(tmp_path).version == second.name
+    assert load_model(tmp_path, first.name).version == first.name
+    assert json.loads((first / "manifest.json").read_text())["content_hash"] == \
+        json.loads((second / "manifest.json").read_text())["content_hash"]
+
+    (second / "model.txt").write_text((second / "model.txt").read_text().replace("Tree=0", "Tree=0 "))
+    (second / "manifest.json").touch()
+    with pytest.raises(ValueError, match="model.txt"):
+        load_model(tmp_path)
+    with pytest.raises(FileNotFoundError):
+        load_model(tmp_path / "nowhere")
@@ -0,0 +1,57 @@
+import asyncio
+import datetime as dt
+import json
+import time
+
+import polars as pl
+
+from lib.ingest.replay import TickReplay, load_ticks
+
+T0 = dt.datetime(2025, 1, 1, 18)
+
+
+def _raw(tmp_path):
+    # Written out of time order, with a DRAW row the replay ignores
+    rows = [
+        (T0 + dt.timedelta(seconds=2), "G1", "pinnacle", "HOME", 1.80),
+        (T0, "G1", "pinnacle", "HOME", 1.90),
+        (T0 + dt.timedelta(seconds=1), "G2", "pinnacle", "AWAY", 2.50),
+        (T0, "G1", "pinnacle", "AWAY", 2.00),
+        (T0 + dt.timedelta(seconds=1), "G1", "pinnacle", "DRAW", 9.00),
+        (T0 + dt.timedelta(seconds=1), "G2", "pinnacle", "HOME", 1.55),
+    ]
+    path = tmp_path / "ticks.parquet"
+    pl.DataFrame(rows, schema=["ts_utc", "game_id", "book", "runner", "price_decimal"], orient="row").write_parquet(path)
+    return path
+
+
+def test_replay_emits_timestamp_batches_in_order_at_speed(tmp_path):
+    replay = TickReplay(load_ticks(_raw(tmp_path)))
+    assert replay.n_batches == 3
+
+    async def collect(speed):
+        t0, out = time.perf_counter(), []
+        async for batch in replay.stream(speed):
+            out.append((time.perf_counter() - t0, batch["ts_utc"].unique().to_list(), batch.height))
+        return out
+
+    # 10x: the 1s and 2s batches are due 0.1s and 0.2s after the first
+    batches = asyncio.run(collect(10.0))
+    assert [b[2] for b in batches] == [2, 2, 1]
+    assert [len(b[1]) for b in batches] == [1, 1, 1]
+    assert [b[1][0] for b in batches] == sorted(b[1][0] for b in batches)
+    for (elapsed, _, _), due in zip(batches, (0.0, 0.1, 0.2)):
+        assert due - 0.005 <= elapsed < due + 0.08
+    assert replay.done and replay.emitted == 5
+
+    # Latest price per (game, book) as of the clock; the HOME 1.90 was replaced by 1.80
+    quotes = {e["id"]: [o["price"] for o in e["bookmakers"][0]["markets"][0]["outcomes"]]
+              for e in json.loads(replay.payload("basketball_nba"))}
+    assert quotes == {"G1": [1.8, 2.0], "G2": [1.55, 2.5]}
+
+    # Rewound, a fast replay doesn't wait on the data clock
+    replay.reset()
+    assert json.loads(replay.payload("basketball_nba")) == []
+    t0 = time.perf_counter()
+    assert [b[2] for b in asyncio.run(collect(0))] == [2, 2, 1]
+    assert time.perf_counter() - t0 < 0.05
@@ -0,0 +1,56 @@
+import datetime as dt
+
+import polars as pl
+
+from lib.common.schema import CURRENT_TEAM_STATS, RUNNER, TEAM_STATS, TICKS, conform, conforms, game_keys
+from lib.ingest.tick_store import append_ticks, compact, scan_ticks
+
+
+def _ticks(n: int, t0: dt.datetime) -> pl.DataFrame:
+    return pl.DataFrame({
+        "ts_utc": [t0 + dt.timedelta(seconds=i) for i in range(n)],
+        "game_id": ["G1"] * n, "book": ["pinnacle", "draftkings"] * (n // 2), "market": ["moneyline"] * n,
+        "runner": ["HOME", "AWAY"] * (n // 2), "price_decimal": [1.91, 2.05] * (n // 2),
+    })
+
+
+def test_legacy_parts_are_migrated_by_compaction(tmp_path):
+    t0 = dt.datetime(2025, 1, 1, 18)
+    # A part file from before the compact schema, then a conformed append
+    part_dir = tmp_path / "ticks" / "league=NBA" / "date=2025-01-01" / "game_id=G1"
+    part_dir.mkdir(parents=True)
+    _ticks(4, t0).drop("game_id").write_parquet(part_dir / "part-00000000000000000001-legacy.parquet")
+    append_ticks(_ticks(4, t0 + dt.timedelta(minutes=1)), tmp_path, "NBA")
+
+    assert compact(tmp_path, "NBA") == 2
+    ticks = scan_ticks(tmp_path, "NBA").collect()
+    assert conforms(ticks.schema, TICKS) and ticks.schema["runner"] == RUNNER
+    assert ticks.height == 8
+    assert ticks["price_decimal"].cast(pl.Float64).round(6).to_list() == [1.91, 2.05] * 4
+    # already conformed single parts are left alone
+    assert compact(tmp_path, "NBA") == 0
+
+
+def test_team_stats_get_registry_ids_and_dates():
+    stats = pl.DataFrame({
+        "game_id": [22400001], "date": ["2024-10-22 00:00:00"], "season": ["22024"],
+        "home_team_id": [1610612738], "away_team_id": [1610612752], "margin": [10.0],
+    })
+    out = conform(stats, TEAM_STATS)
+    assert out.row(0) == (22400001, dt.date(2024, 10, 22), "22024", 2, 20, 10.0)
+    assert out.schema["home_team_id"] == pl.UInt16 and out.schema["margin"] == pl.Float32
+
+
+def test_current_team_stats_keep_names_and_get_registry_ids():
+    stats = pl.DataFrame({"TEAM_ID": [1610612738], "TEAM_NAME": ["Boston Celtics"], "GP": [12],
+                          "FG_PCT": [0.482], "REB": [45.1], "AST": [26.3], "PLUS_MINUS": [9.5]})
+    out = conform(stats, CURRENT_TEAM_STATS)
+    assert conforms(out.schema, CURRENT_TEAM_STATS) and out.schema["TEAM_NAME"] == pl.Categorical
+    assert out["TEAM_ID"].to_list() == [2] and out["GP"].to_list() == [12]
+
+
+def test_game_keys_are_dense_and_stable(tmp_path):
+    first = game_keys(tmp_path, pl.Series(["G2", "G1", "G2"]))
+    assert first.rows() == [("G2", 0), ("G1", 1)]
+    again = game_keys(tmp_path, pl.Series(["G3", "G1"]))
+    assert again.rows() == [("G3", 2), ("G1", 1)]
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import lightgbm as lgb
+import numpy as np
+
+from lib.modeling.calibration import fit_isotonic
+from lib.modeling.fast_predict import load_fast
+from lib.modeling.feature_store import MARKET_COLS, market_features
+from lib.modeling.registry import save_model
+from lib.modeling.serve import PredictionServer, request
+
+FEATURES = ["imp_prob_mean", "vig_spread", "home_away_ratio"]
+
+
+def _register(art_dir):
+    rng = np.random.default_rng(0)
+    prices = rng.uniform(1.3, 4.0, size=(2000, 2))
+    X = np.vstack([market_features(h, a) for h, a in prices])[:, [MARKET_COLS.index(c) for c in FEATURES]]
+    y = (rng.random(len(X)) < X[:, 0]).astype(int)
+    booster = lgb.train({"objective": "binary", "verbose": -1, "num_leaves": 15}, lgb.Dataset(X, y), 40)
+    save_model(art_dir, [booster], fit_isotonic(booster.predict(X), y), FEATURES)
+
+
+def _start(server, sock):
+    loop, ready = asyncio.new_event_loop(), threading.Event()
+
+    async def run():
+        up = asyncio.Event()
+        task = asyncio.create_task(server.serve(sock, ready=up))
+        await up.wait()
+        ready.set()
+        await task
+
+    threading.Thread(target=lambda: loop.run_until_complete(run()), daemon=True).start()
+    assert ready.wait(5)
+    return {"socket": sock, "port": None, "timeout_s": 5.0}
+
+
+def test_concurrent_requests_are_batched_and_match_local_scoring(tmp_path):
+    _register(tmp_path / "art" / "NBA")
+    server = PredictionServer(["NBA"], tmp_path / "wh", tmp_path / "art", max_batch=64, max_wait_s=0.02)
+    cfg = _start(server, tmp_path / "serve.sock")
+
+    prices = np.random.default_rng(1).uniform(1.3, 4.0, size=(64, 2))
+    with ThreadPoolExecutor(16) as ex:
+        resps = list(ex.map(lambda hp: request({"op": "market", "league": "NBA", "home_price": hp[0],
+                                                "away_price": hp[1]}, cfg), prices))
+
+    model = load_fast(tmp_path / "art" / "NBA")
+    X = np.vstack([market_features(h, a) for h, a in prices])[:, [MARKET_COLS.index(c) for c in FEATURES]]
+    assert all(r["ok"] and r["model"] == model.version for r in resps)
+    assert np.abs(np.array([r["p"] for r in resps]) - model.predict_proba(X)[:, 1]).max() < 1e-12
+
+    stats = request({"op": "stats"}, cfg)
+    assert stats["requests"] == 64 and stats["errors"] == 0
+    assert stats["mean_batch"] > 1 and stats["max_batch"] <= 64
+    assert stats["p99_ms"] >= stats["p50_ms"] > 0
+
+    bad = request({"op": "market", "league": "NFL", "home_price": 2.0, "away_price": 2.0}, cfg)
+    assert not bad["ok"] and "not served" in bad["error"]
+
+    # A name the registry cannot match (even fuzzily) is an error, not a probability scored without form
+    unknown = request({"op": "market", "league": "NBA", "home": "Springfield Isotopes", "away": "New York Knicks",
+                    "home_price": 1.8, "away_price": 2.1}, cfg)
+    assert not unknown["ok"] and unknown["error"] == "ValueError: unknown NBA team 'Springfield Isotopes'"
+    named = request({"op": "market", "league": "NBA", "home": "Boston Celtics", "away": "New York Knicks",
+                     "home_price": 1.8, "away_price": 2.1}, cfg)
+    assert named["ok"]
+
+
+def test_requests_use_the_resolved_model_until_a_reload(tmp_path, monkeypatch):
+    import lib.modeling.serve as serve
+
+    _register(tmp_path / "art" / "NBA")
+    server = PredictionServer(["NBA"], tmp_path / "wh", tmp_path / "art", max_wait_s=0)
+    cfg = _start(server, tmp_path / "serve.sock")
+    first = server.batchers["NBA"].model.version
+
+    # The hot path never goes back to the registry on disk
+    def no_disk(*_):
+        raise AssertionError("load_fast on the request path")
+
+    monkeypatch.setattr(serve, "load_fast", no_disk)
+    req = {"op": "market", "league": "NBA", "home_price": 1.8, "away_price": 2.1}
+    assert [request(req, cfg)["model"] for _ in range(3)] == [first] * 3
+    monkeypatch.undo()
+
+    # A newly registered version is served once the refresh task reloads
+    _register(tmp_path / "art" / "NBA")
+    assert request(req, cfg)["model"] == first
+    server.batchers["NBA"].reload()
+    assert request(req, cfg)["model"] == server.batchers["NBA"].model.version != first
+
+
+def test_request_without_server_returns_none(tmp_path):
+    assert request({"op": "ping"}, {"socket": tmp_path / "missing.sock", "port": None, "timeout_s": 0.5}) is None
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import polars as pl
+
+from lib.common.make_toy_raw import TOY_SCHEMA, simulate_games
+from lib.modeling.build_features import batch_features
+from lib.modeling.streaming_features import StreamingFeatures
+
+T0 = datetime(2025, 10, 22, 23, tzinfo=timezone.utc)
+
+
+def _assert_matches_batch(ticks, windows, vol_windows) -> StreamingFeatures:
+    batch = batch_features(ticks, windows, vol_windows)
+    engine = StreamingFeatures(windows, vol_windows)
+    # Ticks arrive interleaved across games/books/runners, in time order
+    online = engine.update_frame(ticks.sort("ts"))
+
+    keys = ["game_id", "runner", "book", "ts"]
+    cols = ["odds_diff", "implied_p", *engine.columns]
+    b = batch.sort(keys).select(cols)
+    o = online.sort(keys).select(cols)
+    assert b.height == o.height == ticks.height
+    for c in cols:
+        assert b[c].is_null().equals(o[c].is_null()), c
+        diff = (b[c] - o[c]).abs().max()
+        assert diff is None or diff < 1e-9, (c, diff)
+    return engine
+
+
+def test_streaming_matches_batch():
+    ticks = simulate_games(["G001", "G002"], [T0, T0], ["pinnacle", "fanduel"], ticks=1800,
+                           rng=np.random.default_rng(3))
+    _assert_matches_batch(ticks, [3, 5, 10, 20], [5, 10])
+
+
+def test_flat_prices_stay_o1_per_tick():
+    # Pre-game lines sit still: one series constant, one wobbling by 1e-7 (M2 ~ 1e-14)
+    n = 2000
+    odds = {"G001": [1.9] * n, "G002": [1.9 + 1e-7 * (i % 2) for i in range(n)]}
+    ticks = pl.DataFrame({
+        "ts": [T0 + timedelta(seconds=i) for _ in odds for i in range(n)], "market_id": "ML", "runner": "HOME",
+        "odds": [x for g in odds for x in odds[g]], "score_h": 0, "score_a": 0,
+        "game_id": [g for g in odds for _ in range(n)], "book": "pinnacle",
+    }, schema=TOY_SCHEMA)
+    engine = _assert_matches_batch(ticks, [5], [5, 10])
+
+    # Exact re-sums of a tiny M2 are capped at one per window length, not one per tick
+    assert engine.resums <= n // 5 + n // 10
+    assert engine.update(("G002", "HOME", "pinnacle"), 1.9)["odds_vol_5"] > 0
@@ -0,0 +1,57 @@
+import datetime as dt
+
+import polars as pl
+
+from lib.featurization.build_features import compute_features
+from lib.featurization.team_form import team_form
+
+BOS, NYK = 1610612738, 1610612752  # nba_api TEAM_IDs, as team_stats carries them
+
+
+def _stats() -> pl.DataFrame:
+    # The same pair meets four times; the home side wins by 10, 20, 30, 40
+    days = [dt.date(2024, 11, d) for d in (1, 5, 9, 13)]
+    return pl.DataFrame({
+        "game_id": [1, 2, 3, 4], "date": [d.isoformat() for d in days], "season": ["22024"] * 4,
+        "home_team_id": [BOS] * 4, "away_team_id": [NYK] * 4,
+        "margin": [10.0, 20.0, 30.0, 40.0], "fg_diff": [0.01, 0.02, 0.03, 0.04], "home_win": [1] * 4,
+    })
+
+
+def _ticks(day: int, game_id: str) -> pl.DataFrame:
+    ts = dt.datetime(2024, 11, day, 23)  # evening local date; still before tip
+    return pl.DataFrame({
+        "ts_utc": [ts, ts], "game_id": [game_id] * 2, "book": ["pinnacle"] * 2, "runner": ["HOME", "AWAY"],
+        "price_decimal": [1.6, 2.4], "home_team_id": [BOS] * 2, "away_team_id": [NYK] * 2,
+    })
+
+
+def test_form_is_point_in_time_and_one_row_per_game():
+    stats = _stats()
+    ticks = pl.concat([_ticks(1, "G1"), _ticks(9, "G3"), _ticks(13, "G4")])
+    feats = compute_features(ticks, stats, team_form(stats.lazy(), n=2).collect()).sort("game_id", "runner")
+
+    # One HOME + one AWAY row per game, however often the pair met
+    assert feats.height == 6
+    home = feats.filter(pl.col("runner") == "HOME")
+    # G1 has no earlier games; G3 sees G1+G2 only; G4 sees the last 2 before it (G2, G3)
+    assert home["form_margin"].to_list() == [None, 2 * (10 + 20) / 2, 2 * (20 + 30) / 2]
+    assert home["label"].to_list() == [1, 1, 1]
+    away = feats.filter(pl.col("runner") == "AWAY")
+    assert away["form_win_rate"].to_list() == [None, -1.0, -1.0]
+
+
+def test_games_without_a_result_keep_feature_rows():
+    stats = _stats()
+    form = team_form(stats.lazy(), n=2).collect()
+    # G4 quoted after midnight UTC (still Nov 13 in the US); G5 is upcoming, not in team_stats yet
+    late = _ticks(14, "G4").with_columns(pl.col("ts_utc") - dt.timedelta(hours=21))  # Nov 14 02:00 UTC
+    ticks = pl.concat([late, _ticks(17, "G5")])
+    schedule = pl.DataFrame({"game_id": ["G4", "G5"],
+                             "start_time_utc": [dt.datetime(2024, 11, 14, 0, 30), dt.datetime(2024, 11, 18, 0, 30)]})
+    feats = compute_features(ticks, stats, form, schedule=schedule).filter(pl.col("runner") == "HOME").sort("game_id")
+
+    assert feats["game_date"].to_list() == [dt.date(2024, 11, 13), dt.date(2024, 11, 17)]
+    assert feats["label"].to_list() == [1, None]
+    # G5's form is as of its own date: the last 2 games before it (G3, G4)
+    assert feats["form_margin"].to_list() == [2 * (20 + 30) / 2, 2 * (30 + 40) / 2]
@@ -0,0 +1,27 @@
+import polars as pl
+
+from lib.utils.team_registry import TEAM_NAMES, canonical_names, team_id, team_ids
+
+
+def test_aliases_resolve_per_league():
+    bos = team_id("Boston Celtics", "NBA")
+    assert TEAM_NAMES[bos] == "Boston Celtics"
+    assert team_id("BOS", "NBA") == team_id("celtics", "NBA") == team_id("1610612738", "NBA") == bos
+    # DAL is the Mavericks in the NBA and the Cowboys in the NFL; without a league it's ambiguous
+    assert TEAM_NAMES[team_id("DAL", "NBA")] == "Dallas Mavericks"
+    assert TEAM_NAMES[team_id("DAL", "NFL")] == "Dallas Cowboys"
+    assert team_id("DAL") is None
+    assert TEAM_NAMES[team_id("Seattle SuperSonics", "NBA")] == "Oklahoma City Thunder"
+
+
+def test_fuzzy_fallback_and_short_keys():
+    assert TEAM_NAMES[team_id("Golden St Warriors", "NBA")] == "Golden State Warriors"
+    assert team_id("Golden St Warriors", "NBA", fuzzy=False) is None
+    assert team_id("XYZ", "NBA") is None  # too short to fuzzy-match
+
+
+def test_unknown_league_gives_null_ids():
+    assert team_id("Yankees", "MLB") is None
+    ids = team_ids(pl.Series(["New York Yankees", "Boston Red Sox", None]), "MLB")
+    assert ids.dtype == pl.UInt16 and ids.null_count() == 3
+    assert canonical_names(pl.Series(["Yankees"]), "MLB").to_list() == ["Yankees"]
@@ -0,0 +1,54 @@
+import datetime as dt
+
+import polars as pl
+
+from lib.ingest.tick_store import append_ticks, compact, partitions, scan_ticks
+
+T0 = dt.datetime(2025, 1, 1, 18)
+
+
+def _ticks(prices: list[float], game_id: str = "G1") -> pl.DataFrame:
+    n = len(prices)
+    return pl.DataFrame({
+        "ts_utc": [T0 + dt.timedelta(seconds=i // 2) for i in range(n)], "game_id": [game_id] * n,
+        "book": ["pinnacle"] * n, "market": ["moneyline"] * n,
+        "runner": ["HOME", "AWAY"] * (n // 2), "price_decimal": prices,
+    })
+
+
+def _prices(tmp_path) -> list[float]:
+    return scan_ticks(tmp_path, "NBA").sort("ts_utc", "runner").collect()["price_decimal"].cast(pl.Float64).round(3).to_list()
+
+
+def test_append_publishes_whole_part_files(tmp_path):
+    written = append_ticks(pl.concat([_ticks([1.9, 2.0]), _ticks([1.5, 2.8], "G2")]), tmp_path, "NBA")
+
+    assert sorted(p.parent.name for p in written) == ["game_id=G1", "game_id=G2"]
+    assert all(p.name.startswith("part-") and p.suffix == ".parquet" for p in written)
+    assert not list((tmp_path / "ticks").rglob("*.tmp"))
+    assert scan_ticks(tmp_path, "NBA").collect().height == 4
+
+
+def test_compaction_keeps_the_last_tick_and_readers_keep_their_files(tmp_path):
+    append_ticks(_ticks([1.90, 2.00, 1.80, 2.10]), tmp_path, "NBA")
+    append_ticks(_ticks([1.95, 1.99]), tmp_path, "NBA")      # same keys as the first two ticks
+    part_dir = partitions(tmp_path, "NBA")[0]
+
+    listed = scan_ticks(tmp_path, "NBA")                      # a scan planned before the merge
+    assert compact(tmp_path, "NBA") == 2
+    assert _prices(tmp_path) == [1.95, 1.99, 1.8, 2.1]        # HOME, AWAY per second
+    # The merged inputs are hidden but still on disk for the scan that listed them
+    assert len(list(part_dir.glob("part-*.parquet"))) == 3
+    assert listed.collect().height == 6
+
+    # A later append stays live, wins over the merged file, and the next pass merges it
+    append_ticks(_ticks([1.97, 1.98]), tmp_path, "NBA")
+    assert scan_ticks(tmp_path, "NBA").collect().height == 6
+    assert compact(tmp_path, "NBA") == 2
+    assert _prices(tmp_path) == [1.97, 1.98, 1.8, 2.1]
+    assert compact(tmp_path, "NBA") == 0
+
+    # Past the grace period only the newest merged file is left
+    assert compact(tmp_path, "NBA", grace_s=0) == 0
+    assert [p.name.endswith("-compacted.parquet") for p in part_dir.glob("part-*.parquet")] == [True]
+    assert _prices(tmp_path) == [1.97, 1.98, 1.8, 2.1]
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from lib.modeling.cv import cached_dataset, dataset_path, walk_forward_folds
+from lib.modeling.tune import asha, load_best, rung_budgets, sample
+
+PARAMS = {"objective": "binary", "learning_rate": 0.1, "num_leaves": 15, "min_data_in_leaf": 20, "seed": 7}
+SPACE = {
+    "learning_rate": {"low": 0.02, "high": 0.3, "log": True},
+    "num_leaves": {"low": 4, "high": 64, "log": True, "int": True},
+    "bagging_fraction": {"choices": [0.7, 1.0]},
+}
+
+
+def test_rungs_and_sampling():
+    assert rung_budgets(10, 90, 3) == [10, 30, 90]
+    assert rung_budgets(50, 1000, 3) == [50, 150, 450, 1000]
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        c = sample(SPACE, rng)
+        assert 0.02 <= c["learning_rate"] <= 0.3 and isinstance(c["num_leaves"], int) and 4 <= c["num_leaves"] <= 64
+        assert c["bagging_fraction"] in (0.7, 1.0)
+    with pytest.raises(ValueError, match="max_bin"):
+        sample({"max_bin": {"low": 63, "high": 255}}, rng)
+
+
+def test_asha_promotes_the_best_and_versions_the_result(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 3000
+    start = np.array([np.datetime64(f"{y}-10-20") for y in (2021, 2022, 2023)])
+    dates = start[rng.integers(0, 3, n)] + rng.integers(0, 180, n).astype("timedelta64[D]")
+    X = rng.normal(size=(n, 3))
+    y = (rng.random(n) < 1 / (1 + np.exp(-(1.5 * X[:, 0] - X[:, 1])))).astype(int)
+    cached_dataset(X, y, ["a", "b", "c"], PARAMS, tmp_path / "datasets")
+    bin_path = dataset_path(tmp_path / "datasets", X, y, ["a", "b", "c"], PARAMS)
+
+    res = asha(bin_path, walk_forward_folds(dates, 2), PARAMS, SPACE, trials=9, eta=3, min_rounds=10,
+               max_rounds=90, early_stopping=5, jobs=2, threads=2, log=lambda _: None)
+    rung0 = {t["trial"]: t["score"] for t in res.trials if t["rung"] == 0}
+    assert len(rung0) == 9
+    # promotions are asynchronous (top third of the rung so far), but at most a third go up
+    # and the rung's overall winner always does
+    promoted = {t["trial"] for t in res.trials if t["rung"] == 1}
+    assert 0 < len(promoted) <= 3 and min(rung0, key=rung0.get) in promoted
+    assert set(res.params) == set(SPACE) and 0 < res.score < np.log(2)
+
+    res.save(tmp_path, league="NBA")
+    res.save(tmp_path, league="NBA")
+    best = load_best(tmp_path)
+    assert best["params"] == res.params and best["league"] == "NBA"
+    assert len(list((tmp_path / "tuning").glob("*/best_params.json"))) == 2
+    assert load_best(tmp_path / "nowhere") is None